@@ -0,0 +1,137 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Out-of-process app host RPC latency.
+
+Starts the engine in a stand-in session, checks that a client can make each
+host call against the stand-in host and that the child only runs a command
+registered by the requested app, then launches the app host child script
+in ping mode and reports the round-trip latency of its host calls whilst the
+Shotgun Qt event loop timer is pumped at --interval-ms, as Softimage would.
+
+Usage:
+    python benchmarks/app_host_rpc.py [--calls N] [--interval-ms N]
+"""
+
+import os
+import sys
+import imp
+import time
+import optparse
+import threading
+import subprocess
+
+import standins
+
+ENGINE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _pump_until(session, done, interval):
+    while not done():
+        session.pump()
+        time.sleep(interval)
+
+def _check_host_calls(session, server):
+    """
+    Make each host call from a background thread against the stand-in host
+
+    :returns: List of failure messages
+    """
+    child = imp.load_source("standin_app_host_child",
+                            os.path.join(ENGINE_ROOT, "python", "tk_softimage", "app_host_child.py"))
+    session.host.stand_in.select("cube", "sphere")
+    session.host.stand_in.scene.Name = "shot_010"
+    expected = {
+        "get_selection": ["cube", "sphere"],
+        "get_scene_name": "shot_010",
+    }
+    results = {}
+
+    def run():
+        client = child.HostRpcClient(server.address, server.authkey)
+        try:
+            for method in expected:
+                results[method] = client.call(method)
+            results["get_project_info"] = client.get_project_info()
+            client.log_message("hello from the app host")
+            try:
+                client.call("unload_plugin", "menu.py")
+            except child.HostRpcError:
+                results["rejected"] = True
+        finally:
+            client.close()
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    _pump_until(session, lambda: not thread.is_alive(), 0.001)
+
+    failures = []
+    for method, value in expected.items():
+        if results.get(method) != value:
+            failures.append("%s returned %r, expected %r" % (method, results.get(method), value))
+    if "context" not in (results.get("get_project_info") or {}):
+        failures.append("get_project_info returned %r" % results.get("get_project_info"))
+    if (session.host.stand_in.siInfo, "hello from the app host") not in session.host.stand_in.messages:
+        failures.append("log_message didn't reach the host")
+    if not results.get("rejected"):
+        failures.append("a host method that isn't exposed was allowed")
+
+    command = child._find_command(session.engine, "App 0 Command 0", "tk-multi-app0")
+    if command is not session.engine.commands["App 0 Command 0"]:
+        failures.append("the child didn't find the command registered by the app")
+    if child._find_command(session.engine, "App 0 Command 0", "tk-multi-app1"):
+        failures.append("the child found a command registered by another app")
+    return failures
+
+def main():
+    parser = optparse.OptionParser(usage=__doc__.strip().splitlines()[-1].strip())
+    parser.add_option("--calls", type="int", default=200, help="number of host calls")
+    parser.add_option("--interval-ms", type="float", default=1.0,
+                      help="interval between Shotgun Qt event loop timer events")
+    options, _ = parser.parse_args()
+
+    session = standins.StandInSession(settings={"warmup_enabled": False, "menu_snapshot_cache": False})
+    engine = session.start_engine()
+    try:
+        server = engine.app_host_server
+        failures = _check_host_calls(session, server)
+
+        # (the engine's copy of the tk_softimage.app_host module)
+        app_host = sys.modules[type(server).__module__]
+        process = app_host.AppHostProcess(server, sys.executable, {}, ["--ping", str(options.calls)],
+                                              stdout=subprocess.PIPE)
+        output = []
+        reader = threading.Thread(target=lambda: output.extend(process.process.stdout.readlines()))
+        reader.start()
+        _pump_until(session, lambda: not process.is_running(), options.interval_ms / 1000.0)
+        reader.join()
+        stats = engine.get_app_host_stats()
+    finally:
+        session.stop_engine()
+
+    latencies = sorted(float(line) for line in output if line.strip())
+    if len(latencies) != options.calls:
+        failures.append("expected %d round-trips, got %d" % (options.calls, len(latencies)))
+    if latencies:
+        print("host call round-trip over %d calls (timer every %.1fms): p50 %.2fms, p95 %.2fms, max %.2fms"
+              % (len(latencies), options.interval_ms, latencies[len(latencies) // 2],
+                 latencies[min(len(latencies) - 1, int(len(latencies) * 0.95))], latencies[-1]))
+    print("engine side: %s" % stats)
+
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread():
+            thread.join(1.0)
+
+    for failure in failures:
+        print("FAIL: %s" % failure)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Engine settings resolution with the bootstrap cache.
+
+Generates a synthetic large pipeline configuration: --includes environment
+include files, a templates file with --templates templates, and engine
+settings with --favourites menu favourites and --settings extra nested
+settings, all using {config} and {engine} tokens.  The engine is started
+and every setting read, as the engine and its apps would, with the
+bootstrap cache disabled, cold and warm, and after a configuration file
+has changed.  Reports the number of settings resolved and served from the
+cache and the time taken for the engine to start and the settings to be
+read.  Exits with a failure if a cached setting differs from the resolved
+one.
+
+Usage:
+    python benchmarks/bootstrap_cache.py [--includes N] [--templates N] [--favourites N] [--settings N]
+"""
+
+import os
+import sys
+import glob
+import time
+import shutil
+import optparse
+import tempfile
+import threading
+
+import standins
+
+def _make_config(config_path, num_includes, num_templates):
+    includes = os.path.join(config_path, "config", "env", "includes")
+    os.makedirs(includes)
+    for i in range(num_includes):
+        with open(os.path.join(includes, "include_%03d.yml" % i), "wt") as f:
+            f.write("".join("setting_%d: '{config}/value_%d'\n" % (j, j) for j in range(50)))
+    core = os.path.join(config_path, "config", "core")
+    os.makedirs(core)
+    with open(os.path.join(core, "templates.yml"), "wt") as f:
+        f.write("paths:\n")
+        f.write("".join("    template_%d: 'sequences/{Sequence}/{Shot}/{Step}/work/v{version}_%d.scn'\n" % (i, i)
+                        for i in range(num_templates)))
+
+def _make_settings(num_favourites, num_settings):
+    settings = {
+        "menu_favourites": [{"app_instance": "tk-multi-app%d" % (i % 5), "name": "App %d Command 0" % (i % 5),
+                             "icon": "{config}/icons/favourite_%d.png" % i} for i in range(num_favourites)],
+        "warmup_enabled": False,
+        "menu_snapshot_cache": False,
+    }
+    for i in range(num_settings):
+        settings["extra_setting_%d" % i] = {"path": "{engine}/resources/%d" % i,
+                                            "hooks": ["{config}/hooks/hook_%d_%d.py" % (i, j) for j in range(5)],
+                                            "enabled": bool(i % 2)}
+    return settings
+
+def measure(config_path, settings, enabled):
+    """
+    :returns: (dictionary of results, dictionary of setting values read)
+    """
+    settings = dict(settings, bootstrap_cache_enabled=enabled)
+    session = standins.StandInSession(config_path=config_path, settings=settings)
+    start = time.time()
+    engine = session.start_engine()
+    values = dict((key, engine.get_setting(key)) for key in sorted(settings) if key != "bootstrap_cache_enabled")
+    duration = time.time() - start
+    results = {"time": duration, "resolved": engine.settings_resolved,
+               "cache": engine.get_bootstrap_cache_stats()}
+    session.stop_engine()
+    return results, values
+
+def main():
+    parser = optparse.OptionParser(usage=__doc__.strip().splitlines()[-1].strip())
+    parser.add_option("--includes", type="int", default=200, help="number of environment include files")
+    parser.add_option("--templates", type="int", default=2000, help="number of templates")
+    parser.add_option("--favourites", type="int", default=500, help="number of menu favourites")
+    parser.add_option("--settings", type="int", default=500, help="number of extra engine settings")
+    options, _ = parser.parse_args()
+
+    config_path = tempfile.mkdtemp(prefix="tk-softimage-config-")
+    failures = []
+    try:
+        _make_config(config_path, options.includes, options.templates)
+        settings = _make_settings(options.favourites, options.settings)
+        cache_root = os.path.join(tempfile.gettempdir(), "tk-softimage-standins", "tk-softimage")
+        for cache_path in glob.glob(os.path.join(cache_root, "bootstrap_cache_*.json")):
+            os.remove(cache_path)
+
+        rows = []
+        disabled, expected = measure(config_path, settings, False)
+        rows.append(("disabled", disabled))
+        for name in ("cold", "warm", "config changed"):
+            if name == "config changed":
+                with open(os.path.join(config_path, "config", "core", "templates.yml"), "at") as f:
+                    f.write("    template_new: 'assets/{Asset}'\n")
+            results, values = measure(config_path, settings, True)
+            rows.append((name, results))
+            if values != expected:
+                failures.append("%s: settings differ from the resolved settings" % name)
+    finally:
+        shutil.rmtree(config_path)
+
+    print("%-16s %10s %10s %8s" % ("", "resolved", "from cache", "time"))
+    for name, results in rows:
+        cache = results["cache"] or {}
+        print("%-16s %10d %10d %6.1fms" % (name, results["resolved"], cache.get("hits", 0),
+                                            results["time"] * 1000.0))
+
+    # give the worker threads a moment to exit before the interpreter shuts down:
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread():
+            thread.join(1.0)
+
+    for failure in failures:
+        print("FAIL: %s" % failure)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
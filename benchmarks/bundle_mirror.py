@@ -0,0 +1,132 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Engine start-up I/O with the local bundle mirror.
+
+Copies the engine to a folder standing in for a network share, without
+compiled modules and where none can be written, as is usual for a shared
+software install.  The engine is then started in a fresh stand-in session
+process loading directly from the share, and with the bundle mirror enabled
+for a cold start (no mirror yet) and a warm start.  Reports the files
+opened, metadata lookups made and bytes read on the share, the start-up
+time measured locally, and that time plus the modelled cost of the share
+I/O for the given latency and bandwidth.
+
+Usage:
+    python benchmarks/bundle_mirror.py [--latency-ms N] [--stat-latency-ms N] [--bandwidth-mbps N]
+"""
+
+import os
+import sys
+import json
+import time
+import shutil
+import optparse
+import tempfile
+import subprocess
+
+import standins
+
+def _make_share(share_root):
+    """
+    Copy the engine to the share folder, leaving out compiled modules
+    """
+    os.makedirs(share_root)
+    for name in ("engine.py", "info.yml", "icon_256.png"):
+        shutil.copy2(os.path.join(standins.ENGINE_ROOT, name), share_root)
+    for folder in ("python", "plugins"):
+        shutil.copytree(os.path.join(standins.ENGINE_ROOT, folder), os.path.join(share_root, folder),
+                        ignore=shutil.ignore_patterns("*.pyc", "*.pyo"))
+
+def _child(share_root, mirror_root, use_mirror):
+    """
+    Start and stop the engine and print the share I/O as json
+    """
+    # (compiled modules can't be written to the share)
+    sys.dont_write_bytecode = True
+    session = standins.StandInSession(engine_root=share_root,
+                                      settings={"bundle_mirror_enabled": use_mirror,
+                                                "bundle_mirror_root": mirror_root,
+                                                "warmup_enabled": False, "menu_snapshot_cache": False,
+                                                "lookup_cache_ttl": 0})
+    start = time.time()
+    engine = session.start_engine()
+    duration = time.time() - start
+
+    on_share = lambda path: os.path.abspath(path).startswith(share_root + os.sep)
+    read_paths = set([os.path.join(share_root, "engine.py")])
+    for module in sys.modules.values():
+        path = getattr(module, "__file__", None)
+        if path and on_share(path):
+            read_paths.add(path[:-1] if path.endswith(".pyc") else path)
+    read_paths.update(path for path in session.plugins if on_share(path))
+
+    result = {
+        "duration": duration,
+        "files": len(read_paths),
+        "bytes": sum(os.path.getsize(path) for path in read_paths),
+        "stats": len(read_paths),
+    }
+    mirror_stats = engine.get_bundle_mirror_stats()
+    if mirror_stats:
+        result["files"] += 0 if mirror_stats["warm"] else mirror_stats["source_files"]
+        result["bytes"] += mirror_stats["source_bytes_read"]
+        result["stats"] += mirror_stats["source_files"]
+        result["warm"] = mirror_stats["warm"]
+    session.stop_engine()
+    print(json.dumps(result))
+
+def _run(share_root, mirror_root, use_mirror):
+    output = subprocess.check_output([sys.executable, os.path.abspath(__file__), "--child", share_root,
+                                      mirror_root, "1" if use_mirror else "0"])
+    return json.loads(output.strip().splitlines()[-1])
+
+def main():
+    if len(sys.argv) == 5 and sys.argv[1] == "--child":
+        _child(sys.argv[2], sys.argv[3], sys.argv[4] == "1")
+        return 0
+
+    parser = optparse.OptionParser(usage=__doc__.strip().splitlines()[-1].strip())
+    parser.add_option("--latency-ms", type="float", default=5.0, help="share latency to open and read a file")
+    parser.add_option("--stat-latency-ms", type="float", default=1.0, help="share latency for file metadata")
+    parser.add_option("--bandwidth-mbps", type="float", default=100.0, help="share bandwidth in megabits/s")
+    options, _ = parser.parse_args()
+
+    root = tempfile.mkdtemp(prefix="tk-softimage-mirror-")
+    try:
+        share_root = os.path.join(root, "share")
+        _make_share(share_root)
+        mirror_root = os.path.join(root, "local")
+        rows = [("direct from share", _run(share_root, mirror_root, False)),
+                ("mirror, cold", _run(share_root, mirror_root, True)),
+                ("mirror, warm", _run(share_root, mirror_root, True))]
+    finally:
+        shutil.rmtree(root)
+
+    print("%-18s %6s %6s %10s %10s %12s" % ("", "files", "stats", "bytes", "local", "with share"))
+    for name, result in rows:
+        share_cost = (result["files"] * options.latency_ms / 1000.0
+                      + result["stats"] * options.stat_latency_ms / 1000.0
+                      + result["bytes"] * 8 / (options.bandwidth_mbps * 1000000.0))
+        print("%-18s %6d %6d %10d %8.1fms %10.1fms" % (name, result["files"], result["stats"], result["bytes"],
+                                                       result["duration"] * 1000.0,
+                                                       (result["duration"] + share_cost) * 1000.0))
+
+    failures = []
+    if rows[1][1].get("warm") is not False or rows[2][1].get("warm") is not True:
+        failures.append("expected a cold then a warm mirror, got %s and %s"
+                        % (rows[1][1].get("warm"), rows[2][1].get("warm")))
+    for failure in failures:
+        print("FAIL: %s" % failure)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Time to first paint of pooled app dialogs.
+
+Opens and closes an app dialog whose widget takes --build-ms to construct,
+both modally (show_modal) and non-modally (show_dialog), in a stand-in
+session with the dialog pool disabled and then enabled.  Reports the mean
+time from the dialog being requested to its first paint, the pool hits and
+misses, and checks that the pooled dialogs are destroyed when the engine is
+and that reusing a dialog, including with show_modal_async, doesn't connect
+to its finished signal again.
+
+Usage:
+    python benchmarks/dialog_pool.py [--opens N] [--build-ms N]
+"""
+
+import sys
+import time
+import optparse
+import threading
+
+import standins
+
+class SlowWidget(standins.QWidget):
+    """
+    App widget that takes a while to construct, like a large app UI
+    """
+    build_cost = 0.0
+
+    def __init__(self, label, parent=None):
+        super(SlowWidget, self).__init__(parent)
+        time.sleep(SlowWidget.build_cost)
+        self.label = label
+        self.resets = 0
+
+    def prepare_for_reuse(self):
+        self.resets += 1
+
+def _first_paint_time(request):
+    """
+    :returns: Seconds from calling request to the dialog it shows being painted
+    """
+    painted = []
+    original = standins.QWidget.event
+    def event(widget, event):
+        if event.type() == standins.QEvent.Paint and isinstance(widget, standins.QDialog) and not painted:
+            painted.append(time.time())
+        return original(widget, event)
+
+    standins.QWidget.event = event
+    try:
+        start = time.time()
+        request()
+        standins.QApplication.sendPostedEvents()
+    finally:
+        standins.QWidget.event = original
+    return painted[0] - start
+
+def measure(pool_size, opens):
+    """
+    :returns: (dictionary of first paint times in seconds for each open, pool stats,
+               number of dialogs not destroyed after the engine is destroyed, the most
+               slots connected to a dialog's finished signal)
+    """
+    session = standins.StandInSession(settings={"dialog_pool_size": pool_size, "warmup_enabled": False,
+                                                "menu_snapshot_cache": False})
+    engine = session.start_engine()
+
+    dialogs = []
+    create_dialog = engine._create_dialog_with_widget
+    def create_and_track(*args, **kwargs):
+        dialog, widget = create_dialog(*args, **kwargs)
+        dialogs.append(dialog)
+        return dialog, widget
+    engine._create_dialog_with_widget = create_and_track
+
+    timings = {"show_modal": [], "show_dialog": []}
+    stats = None
+    try:
+        for _ in range(opens):
+            timings["show_modal"].append(_first_paint_time(
+                lambda: engine.show_modal("Loader", engine, SlowWidget, "shots")))
+
+            timings["show_dialog"].append(_first_paint_time(
+                lambda: engine.show_dialog("Loader", engine, SlowWidget, "shots")))
+            # the user closes the dialog:
+            for dialog in dialogs:
+                if dialog.isVisible():
+                    dialog.close()
+
+            engine.show_modal_async("Loader", engine, SlowWidget, "shots")
+            for dialog in dialogs:
+                if dialog.isVisible():
+                    dialog.done(standins.QDialog.Accepted)
+        stats = engine.get_dialog_pool_stats()
+        connections = max(len(dialog.finished._slots) for dialog in dialogs)
+    finally:
+        session.stop_engine()
+    remaining = len([dialog for dialog in dialogs if not dialog.isDeleted()])
+    return timings, stats, remaining, connections
+
+def main():
+    parser = optparse.OptionParser(usage=__doc__.strip().splitlines()[-1].strip())
+    parser.add_option("--opens", type="int", default=10, help="number of times each dialog is opened")
+    parser.add_option("--build-ms", type="float", default=200.0, help="time the widget takes to construct")
+    options, _ = parser.parse_args()
+    SlowWidget.build_cost = options.build_ms / 1000.0
+
+    fresh, _, _, _ = measure(0, options.opens)
+    pooled, stats, remaining, connections = measure(4, options.opens)
+
+    mean = lambda samples: sum(samples) * 1000.0 / len(samples)
+    # (show_modal and show_dialog share the pooled dialog, so only the first open is a miss)
+    print("%-12s %10s %14s %14s" % ("first paint", "fresh", "pooled (miss)", "pooled (hit)"))
+    print("%-12s %8.1fms %12.1fms %14s" % ("show_modal", mean(fresh["show_modal"]),
+                                           pooled["show_modal"][0] * 1000.0,
+                                           "%.1fms" % mean(pooled["show_modal"][1:]) if options.opens > 1 else "-"))
+    print("%-12s %8.1fms %14s %12.1fms" % ("show_dialog", mean(fresh["show_dialog"]), "-",
+                                           mean(pooled["show_dialog"])))
+    print("pool: %s" % stats)
+
+    # give the worker threads a moment to exit before the interpreter shuts down:
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread():
+            thread.join(1.0)
+
+    failures = []
+    if remaining:
+        failures.append("%d pooled dialogs were not destroyed with the engine" % remaining)
+    if connections > 1:
+        failures.append("a pooled dialog's finished signal has %d connections" % connections)
+    for failure in failures:
+        print("FAIL: %s" % failure)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,206 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+End-to-end engine lifecycle timings.
+
+Runs the whole life of the Softimage engine in a stand-in session
+--iterations times: loading the engine, init_engine, pre_app_init, app
+initialization, post_app_init, loading the Softimage plug-ins, opening and
+expanding the Shotgun menu for the first time, dispatching a command from
+the menu, destroy_engine and unloading the plug-ins.  The scale of the
+session is set with --apps, --commands, --favourites and --views, and
+engine settings can be overridden with --setting name=value (the value is
+parsed as json if possible).
+
+Reports the min, median, mean, 90th percentile and max of each stage and
+the time of the first, cold, iteration.  With --json the results, the
+parameters and the engine revision are written to a file ("-" for stdout)
+and with --compare the medians are compared to those of an earlier json
+file.  Exits with a failure if a dispatched command doesn't run.
+
+Usage:
+    python benchmarks/engine_lifecycle.py [--iterations N] [--apps N] [--commands N] [--favourites N] [--views N] [--setting NAME=VALUE] [--json PATH] [--compare PATH]
+"""
+
+import os
+import sys
+import json
+import time
+import optparse
+import platform
+import threading
+import subprocess
+
+import standins
+
+# the stages in the order they run:
+STAGES = ["load_engine", "init_engine", "pre_app_init", "init_apps", "post_app_init", "load_plugins",
+          "first_menu_open", "command_dispatch", "destroy_engine", "unload_plugins", "total"]
+
+# bump this if the json output format changes:
+RESULTS_VERSION = 1
+
+def _parse_settings(values):
+    settings = {}
+    for value in values:
+        name, _, value = value.partition("=")
+        try:
+            settings[name] = json.loads(value)
+        except ValueError:
+            settings[name] = value
+    return settings
+
+def _engine_revision():
+    """
+    :returns: The git revision of the engine, or None if it isn't known
+    """
+    try:
+        process = subprocess.Popen(["git", "describe", "--always", "--dirty"], cwd=standins.ENGINE_ROOT,
+                                   stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        output, _ = process.communicate()
+    except OSError:
+        return None
+    return output.strip() or None
+
+def _summarise(samples):
+    ordered = sorted(samples)
+    count = len(ordered)
+    return {
+        "first": samples[0],
+        "min": ordered[0],
+        "median": (ordered[(count - 1) // 2] + ordered[count // 2]) / 2.0,
+        "mean": sum(ordered) / count,
+        "p90": ordered[min(count - 1, int(count * 0.9))],
+        "max": ordered[-1],
+    }
+
+def run_once(session):
+    """
+    Run the engine through its whole life once
+
+    :returns: (dictionary of stage timings in seconds, whether the dispatched command ran)
+    """
+    start = time.time()
+    engine = session.start_engine()
+    try:
+        menu_start = time.time()
+        menu = session.open_menu()
+        session.expand(menu)
+        first_menu_open = time.time() - menu_start
+
+        # dispatch the first command of the first app and run it as Softimage
+        # would, once the menu has closed:
+        items = dict((item.Name, item) for item in menu.walk())
+        app = engine.apps.get("tk-multi-app0")
+        invocations = app.invocations if app else 0
+        dispatch_start = time.time()
+        session.click(items["App 0 Command 0"])
+        session.pump()
+        command_dispatch = time.time() - dispatch_start
+        app = engine.apps.get("tk-multi-app0")
+        ran = app is not None and app.invocations > invocations
+    finally:
+        session.stop_engine()
+
+    timings = dict(session.stage_times)
+    timings["first_menu_open"] = first_menu_open
+    timings["command_dispatch"] = command_dispatch
+    timings["total"] = time.time() - start
+    return timings, ran
+
+def measure(options, settings):
+    """
+    :returns: (dictionary of stage name to list of timings in seconds, number of commands that didn't run)
+    """
+    session = standins.StandInSession(num_apps=options.apps, commands_per_app=options.commands,
+                                      num_favourites=options.favourites, num_layout_views=options.views,
+                                      settings=settings)
+    samples = dict((stage, []) for stage in STAGES)
+    failed = 0
+    for _ in range(options.iterations):
+        timings, ran = run_once(session)
+        for stage in STAGES:
+            samples[stage].append(timings.get(stage, 0.0))
+        if not ran:
+            failed += 1
+    return samples, failed
+
+def main():
+    parser = optparse.OptionParser(usage=__doc__.strip().splitlines()[-1].strip())
+    parser.add_option("--iterations", type="int", default=20, help="number of engine lifecycles to run")
+    parser.add_option("--apps", type="int", default=20, help="number of stub apps")
+    parser.add_option("--commands", type="int", default=3, help="number of commands per app")
+    parser.add_option("--favourites", type="int", default=5, help="number of menu favourites")
+    parser.add_option("--views", type="int", default=10, help="number of views in the Softimage layout")
+    parser.add_option("--setting", action="append", default=[], metavar="NAME=VALUE",
+                      help="engine setting to override, can be given more than once")
+    parser.add_option("--json", metavar="PATH", help="write the results as json to PATH, '-' for stdout")
+    parser.add_option("--compare", metavar="PATH", help="compare the medians with an earlier json file")
+    options, _ = parser.parse_args()
+    options.iterations = max(options.iterations, 1)
+    options.apps = max(options.apps, 1)
+    options.commands = max(options.commands, 1)
+
+    settings = _parse_settings(options.setting)
+    samples, failed = measure(options, settings)
+    stages = dict((stage, _summarise(samples[stage])) for stage in STAGES)
+
+    baseline = None
+    if options.compare:
+        with open(options.compare, "rt") as f:
+            baseline = json.load(f)["stages"]
+
+    results = {
+        "version": RESULTS_VERSION,
+        "timestamp": time.time(),
+        "revision": _engine_revision(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "parameters": {"iterations": options.iterations, "apps": options.apps, "commands": options.commands,
+                       "favourites": options.favourites, "views": options.views},
+        "settings": settings,
+        "stages": dict((stage, dict(stats, samples=samples[stage])) for stage, stats in stages.items()),
+        "failed_commands": failed,
+    }
+
+    out = sys.stderr if options.json == "-" else sys.stdout
+    header = "%-18s %9s %9s %9s %9s %9s %9s" % ("ms", "first", "min", "median", "mean", "p90", "max")
+    if baseline:
+        header += " %16s" % "median vs base"
+    out.write(header + "\n")
+    for stage in STAGES:
+        stats = stages[stage]
+        line = "%-18s" % stage + "".join(" %9.2f" % (stats[name] * 1000.0)
+                                         for name in ("first", "min", "median", "mean", "p90", "max"))
+        if baseline and stage in baseline and baseline[stage]["median"]:
+            change = (stats["median"] - baseline[stage]["median"]) / baseline[stage]["median"]
+            line += " %15.1f%%" % (change * 100.0)
+        out.write(line + "\n")
+
+    if options.json == "-":
+        json.dump(results, sys.stdout, indent=2, sort_keys=True)
+        sys.stdout.write("\n")
+    elif options.json:
+        with open(options.json, "wt") as f:
+            json.dump(results, f, indent=2, sort_keys=True)
+
+    # give the worker threads a moment to exit before the interpreter shuts down:
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread():
+            thread.join(1.0)
+
+    if failed:
+        out.write("FAIL: the dispatched command didn't run in %d of %d iterations\n" % (failed, options.iterations))
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
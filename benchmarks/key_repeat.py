@@ -0,0 +1,118 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Key auto-repeat throughput in a Toolkit dialog.
+
+A fake focus widget that re-filters a list on every key press, taking
+--cost milliseconds each time, is given the Qt focus.  Holding a key down
+is simulated by sending --repeats key down events for the same key
+through the Qt events plug-in, running the Shotgun Qt event loop timer
+every --per-pump events, followed by a key up.  This is done in a
+stand-in session with key repeat coalescing disabled and then enabled.
+Reports the key events delivered to the widget and the time taken.  Exits
+with a failure if the key presses delivered (including repeat counts)
+don't add up to the key down events sent or auto-repeats aren't marked.
+
+Usage:
+    python benchmarks/key_repeat.py [--repeats N] [--per-pump N] [--cost MS]
+"""
+
+import sys
+import time
+import optparse
+import threading
+
+import standins
+
+# Softimage key code for 'A':
+_KEY_CODE = 65
+
+class FilterWidget(standins.QWidget):
+    """
+    Widget that re-filters its contents on every key press
+    """
+    def __init__(self, cost):
+        super(FilterWidget, self).__init__()
+        self._cost = cost
+        self.presses = []
+        self.releases = 0
+
+    def event(self, event):
+        if event.type() == standins.QKeyEvent.KeyPress:
+            self.presses.append((event.isAutoRepeat(), event.count(), event.text()))
+            time.sleep(self._cost)
+        elif event.type() == standins.QKeyEvent.KeyRelease:
+            self.releases += 1
+        return True
+
+def measure(num_repeats, per_pump, cost, coalesce):
+    """
+    :returns: Dictionary of results
+    """
+    session = standins.StandInSession(settings={"coalesce_key_repeats": coalesce, "warmup_enabled": False,
+                                                "menu_snapshot_cache": False})
+    engine = session.start_engine()
+    widget = FilterWidget(cost)
+    standins.QApplication._focus_widget = widget
+    plugin = session._plugin("qt_events.py")
+
+    start = time.time()
+    for i in range(num_repeats + 1):
+        plugin.ShotgunQtEventsKeyDown_OnEvent(standins.StandInContextArgs(KeyCode=_KEY_CODE, ShiftMask=0))
+        if i % per_pump == per_pump - 1:
+            session.pump()
+    plugin.ShotgunQtEventsKeyUp_OnEvent(standins.StandInContextArgs(KeyCode=_KEY_CODE, ShiftMask=0))
+    session.pump()
+    duration = time.time() - start
+
+    stats = engine.get_key_event_stats()
+    standins.QApplication._focus_widget = None
+    session.stop_engine()
+    return {"time": duration, "events": len(widget.presses), "releases": widget.releases,
+            "keys": sum(count for _, count, _ in widget.presses),
+            "text": "".join(text for _, _, text in widget.presses),
+            "marked": len([p for p in widget.presses if p[0]]), "stats": stats}
+
+def main():
+    parser = optparse.OptionParser(usage=__doc__.strip().splitlines()[-1].strip())
+    parser.add_option("--repeats", type="int", default=300, help="number of auto-repeats while the key is held")
+    parser.add_option("--per-pump", type="int", default=4, help="key events between event loop timer events")
+    parser.add_option("--cost", type="float", default=2.0, help="milliseconds the widget takes per key press")
+    options, _ = parser.parse_args()
+
+    rows = []
+    for name, coalesce in (("per event", False), ("coalesced", True)):
+        rows.append((name, measure(options.repeats, max(options.per_pump, 1), options.cost / 1000.0, coalesce)))
+
+    print("%-10s %8s %8s %8s %8s" % ("", "events", "keys", "repeats", "time"))
+    for name, results in rows:
+        print("%-10s %8d %8d %8d %6.1fms" % (name, results["events"], results["keys"], results["marked"],
+                                             results["time"] * 1000.0))
+    print("key bridge: %s" % rows[-1][1]["stats"])
+
+    # give the worker threads a moment to exit before the interpreter shuts down:
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread():
+            thread.join(1.0)
+
+    failures = []
+    for name, results in rows:
+        if results["keys"] != options.repeats + 1 or len(results["text"]) != options.repeats + 1:
+            failures.append("%s: %d key presses delivered for %d key down events"
+                            % (name, results["keys"], options.repeats + 1))
+        if results["events"] - results["marked"] != 1 or results["releases"] != 1:
+            failures.append("%s: auto-repeats weren't marked" % name)
+    for failure in failures:
+        print("FAIL: %s" % failure)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,146 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Engine restart leak detector.
+
+Starts and destroys the Softimage engine many times in a stand-in session,
+opening the Shotgun menu, running a command and showing a message box each
+time, and fails if engines are kept alive, if the QMessageBox wrappers stack
+up or if the number of Python objects, threads or the RSS keep growing.
+
+Usage:
+    python benchmarks/lifecycle_stress.py [--iterations N]
+"""
+
+import os
+import gc
+import sys
+import optparse
+import threading
+
+import standins
+
+def _rss_bytes():
+    """
+    Current resident set size of this process, or None if unknown
+    """
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (IOError, OSError, ValueError):
+        return None
+
+def _count_engines():
+    return len([o for o in gc.get_objects() if type(o).__name__ == "SoftimageEngine"])
+
+def _wrapper_depth(fn):
+    """
+    The number of wrappers around a function
+    """
+    depth = 0
+    while hasattr(fn, "__wrapped__"):
+        fn = fn.__wrapped__
+        depth += 1
+    return depth
+
+def _slope(values):
+    """
+    Least squares slope of the values against their index
+    """
+    n = len(values)
+    if n < 2:
+        return 0.0
+    mean_x = (n - 1) / 2.0
+    mean_y = sum(values) / float(n)
+    num = sum((i - mean_x) * (v - mean_y) for i, v in enumerate(values))
+    den = sum((i - mean_x) ** 2 for i in range(n))
+    return num / den
+
+def run(iterations, menu_opens, max_object_growth, max_rss_growth):
+    """
+    Run the stress test
+
+    :returns: List of failure messages, empty if everything passed
+    """
+    session = standins.StandInSession(num_apps=10, commands_per_app=3, num_favourites=2)
+    QtGui = session.qt.QtGui
+
+    object_counts = []
+    rss = []
+    failures = []
+    for iteration in range(iterations):
+        session.start_engine()
+        for _ in range(menu_opens):
+            menu = session.open_menu()
+            session.expand(menu)
+        session.click([item for item in menu.walk() if "Command" in item.Name][0])
+        session.pump()
+        QtGui.QMessageBox.information(None, "Stress", "Iteration %d" % iteration)
+        callbacks = session.menu_callback_count()
+        session.stop_engine()
+
+        gc.collect()
+        engines = _count_engines()
+        depth = _wrapper_depth(QtGui.QMessageBox.information)
+        if engines:
+            failures.append("Iteration %d: %d engine(s) still alive after destroy" % (iteration, engines))
+        if depth > 1:
+            failures.append("Iteration %d: QMessageBox.information is wrapped %d times" % (iteration, depth))
+        if callbacks > len(list(menu.walk())):
+            failures.append("Iteration %d: %d menu callbacks registered for a menu with %d items"
+                            % (iteration, callbacks, len(list(menu.walk()))))
+        object_counts.append(len(gc.get_objects()))
+        rss.append(_rss_bytes())
+        if failures:
+            break
+
+    # ignore the first half of the iterations whilst caches warm up
+    tail = object_counts[len(object_counts) // 2:]
+    object_growth = _slope(tail)
+    if object_growth > max_object_growth:
+        failures.append("Object count grows by %.1f objects per restart" % object_growth)
+
+    rss_tail = [r for r in rss[len(rss) // 2:] if r is not None]
+    rss_growth = _slope(rss_tail)
+    if rss_growth > max_rss_growth:
+        failures.append("RSS grows by %.0f bytes per restart" % rss_growth)
+
+    threads = threading.active_count()
+    if threads > 1:
+        # worker threads are told to exit when the engine is destroyed so give them a moment
+        for thread in threading.enumerate():
+            if thread is not threading.current_thread():
+                thread.join(1.0)
+        if threading.active_count() > 1:
+            failures.append("%d threads still running" % (threading.active_count() - 1))
+
+    print("restarts: %d, objects: %s -> %s (%.1f/restart), rss: %s -> %s (%.0f bytes/restart)"
+          % (len(object_counts), object_counts[0], object_counts[-1], object_growth,
+             rss[0], rss[-1], rss_growth))
+    return failures
+
+def main():
+    parser = optparse.OptionParser(usage=__doc__.strip().splitlines()[-1].strip())
+    parser.add_option("--iterations", type="int", default=200, help="number of engine restarts")
+    parser.add_option("--menu-opens", type="int", default=3, help="menu opens per engine")
+    parser.add_option("--max-object-growth", type="float", default=5.0,
+                      help="allowed growth in python objects per restart")
+    parser.add_option("--max-rss-growth", type="float", default=16384,
+                      help="allowed growth in RSS bytes per restart")
+    options, _ = parser.parse_args()
+
+    failures = run(options.iterations, options.menu_opens, options.max_object_growth, options.max_rss_growth)
+    for failure in failures:
+        print("FAIL: %s" % failure)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
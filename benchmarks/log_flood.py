@@ -0,0 +1,90 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Script log flooding from repeated failures.
+
+Simulates a menu callback that keeps failing: --failures errors are logged,
+each with the traceback of the exception being handled and a varying
+object id in the message, followed by a handful of unrelated warnings.
+This is done in a stand-in session with log rate limiting disabled and then
+enabled.  Reports the number of messages and characters sent to the
+Softimage script log and the time spent logging.  Exits with a failure if
+the suppressed messages aren't summarised when the engine is destroyed.
+
+Usage:
+    python benchmarks/log_flood.py [--failures N] [--limit N]
+"""
+
+import sys
+import time
+import optparse
+import threading
+
+import standins
+
+def _failing_callback(depth):
+    if depth:
+        return _failing_callback(depth - 1)
+    raise RuntimeError("Shotgun connection refused")
+
+def measure(num_failures, limit):
+    """
+    :returns: Dictionary of results
+    """
+    session = standins.StandInSession(settings={"log_rate_limit": limit, "warmup_enabled": False,
+                                                "menu_snapshot_cache": False})
+    engine = session.start_engine()
+    messages = session.host.stand_in.messages
+    del messages[:]
+    start = time.time()
+    for i in range(num_failures):
+        try:
+            _failing_callback(20)
+        except RuntimeError:
+            engine.log_error("Failed to launch 'Publish...' from menu item %#x!" % (0x1000 + i), sys.exc_info())
+    for i in range(3):
+        engine.log_warning("Unable to find icon for app %d" % i)
+    duration = time.time() - start
+    logged = len(messages)
+    chars = sum(len(msg) for _, msg in messages)
+    stats = engine.get_log_stats()
+    session.stop_engine()
+    summaries = [msg for _, msg in messages[logged:] if "suppressed" in msg]
+    return {"time": duration, "logged": logged, "chars": chars, "stats": stats, "summaries": summaries}
+
+def main():
+    parser = optparse.OptionParser(usage=__doc__.strip().splitlines()[-1].strip())
+    parser.add_option("--failures", type="int", default=1000, help="number of errors logged")
+    parser.add_option("--limit", type="int", default=5, help="similar messages logged per minute")
+    options, _ = parser.parse_args()
+
+    unlimited = measure(options.failures, 0)
+    limited = measure(options.failures, options.limit)
+
+    print("%-12s %10s %12s %10s" % ("", "messages", "characters", "time"))
+    for name, results in (("unlimited", unlimited), ("rate limited", limited)):
+        print("%-12s %10d %12d %8.1fms" % (name, results["logged"], results["chars"], results["time"] * 1000.0))
+    print("rate limiter: %s" % limited["stats"])
+    for summary in limited["summaries"]:
+        print("on destroy: %s" % summary.splitlines()[0])
+
+    # give the worker threads a moment to exit before the interpreter shuts down:
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread():
+            thread.join(1.0)
+
+    if options.failures > options.limit and not limited["summaries"]:
+        print("FAIL: the suppressed messages weren't summarised")
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
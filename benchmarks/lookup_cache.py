@@ -0,0 +1,74 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Shared lookup cache latency.
+
+Resolves a set of stand-in paths_from_entity lookups (each taking --lookup-ms)
+in a first session, then in a second session sharing the same cache database,
+and then again in the second session, and reports the time per lookup for a
+miss, a hit from the database and a hit from memory.
+
+Usage:
+    python benchmarks/lookup_cache.py [--entities N] [--lookup-ms N]
+"""
+
+import os
+import sys
+import imp
+import time
+import shutil
+import optparse
+import tempfile
+
+ENGINE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def _time_lookups(cache, num_entities, lookup):
+    start = time.time()
+    for entity_id in range(num_entities):
+        cache.get_or_compute("paths_from_entity", ["Shot", entity_id], lambda: lookup(entity_id))
+    return (time.time() - start) / num_entities
+
+def main():
+    parser = optparse.OptionParser(usage=__doc__.strip().splitlines()[-1].strip())
+    parser.add_option("--entities", type="int", default=200, help="number of entities to look up")
+    parser.add_option("--lookup-ms", type="float", default=5.0, help="time taken by an uncached lookup")
+    options, _ = parser.parse_args()
+
+    lookup_cache = imp.load_source("standin_lookup_cache",
+                                   os.path.join(ENGINE_ROOT, "python", "tk_softimage", "lookup_cache.py"))
+
+    def lookup(entity_id):
+        time.sleep(options.lookup_ms / 1000.0)
+        return [os.path.join(os.sep, "projects", "Shot", str(entity_id))]
+
+    cache_root = tempfile.mkdtemp(prefix="tk-softimage-lookup-cache")
+    try:
+        path = os.path.join(cache_root, "lookup_cache.db")
+        first_session = lookup_cache.LookupCache(path)
+        miss = _time_lookups(first_session, options.entities, lookup)
+        first_session.close()
+
+        second_session = lookup_cache.LookupCache(path)
+        database_hit = _time_lookups(second_session, options.entities, lookup)
+        memory_hit = _time_lookups(second_session, options.entities, lookup)
+        stats = second_session.get_stats()
+        second_session.close()
+    finally:
+        shutil.rmtree(cache_root)
+
+    print("miss:          %10.1fus per lookup" % (miss * 1e6))
+    print("database hit:  %10.1fus per lookup" % (database_hit * 1e6))
+    print("memory hit:    %10.1fus per lookup" % (memory_hit * 1e6))
+    print("second session: %s" % stats)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,128 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Shotgun menu open cost.
+
+Opens the Shotgun menu in a stand-in session with app sub-menus populated
+up-front and then lazily, and reports the Softimage calls made, the menu
+callbacks registered and the enable callbacks run per top-level menu open,
+along with the cost of expanding a single app sub-menu.  Exits with a
+failure if a menu from an earlier open, as if it had been torn off, can't
+be expanded or its commands run once the menu has been rebuilt.
+
+Usage:
+    python benchmarks/menu_open.py [--apps N] [--commands-per-app N] [--opens N]
+"""
+
+import sys
+import time
+import optparse
+import threading
+
+import standins
+
+class _EnableCallback(object):
+    """
+    Enable callback that counts how many times it has been called
+    """
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        return True
+
+def measure(lazy, num_apps, commands_per_app, opens):
+    """
+    :returns: Dictionary of per-open averages for the menu built with or without
+              lazy app sub-menus
+    """
+    enable_callback = _EnableCallback()
+    session = standins.StandInSession(num_apps=num_apps, commands_per_app=commands_per_app,
+                                      enable_callback=enable_callback,
+                                      settings={"lazy_app_menus": lazy, "menu_snapshot_cache": False})
+    engine = session.start_engine()
+    try:
+        totals = {"com_calls": 0, "callbacks_registered": 0, "enable_callbacks": 0, "seconds": 0.0}
+        first_menu = None
+        for _ in range(opens):
+            enable_callback.calls = 0
+            start = time.time()
+            menu = session.open_menu()
+            totals["seconds"] += time.time() - start
+            stats = engine.get_menu_stats()
+            totals["com_calls"] += stats["com_calls"]
+            totals["callbacks_registered"] += stats["callbacks_registered"]
+            totals["enable_callbacks"] += enable_callback.calls
+            if first_menu is None:
+                # (as if the user expanded the first menu and tore it off)
+                first_menu = menu
+                session.expand(first_menu)
+
+        # the menu torn off after the first open should still work after the rebuilds:
+        items = dict((item.Name, item) for item in first_menu.walk())
+        app = engine.apps["tk-multi-app0"]
+        invocations = app.invocations
+        try:
+            session.click(items["App 0 Command 0"])
+            session.pump()
+        except Exception:
+            pass
+        torn_off_ok = app.invocations > invocations
+
+        # the cost of the user expanding an app sub-menu:
+        expand_cost = None
+        before = engine.get_menu_stats()
+        enable_callback.calls = 0
+        session.expand(menu)
+        after = engine.get_menu_stats()
+        num_expanded = after["expanded_sub_menus"] - before["expanded_sub_menus"]
+        if num_expanded:
+            expand_cost = ((after["com_calls"] - before["com_calls"]) / float(num_expanded),
+                           enable_callback.calls / float(num_expanded))
+    finally:
+        session.stop_engine()
+
+    result = dict((name, value / float(opens)) for name, value in totals.items())
+    result["expand_cost"] = expand_cost
+    result["torn_off_ok"] = torn_off_ok
+    return result
+
+def main():
+    parser = optparse.OptionParser(usage=__doc__.strip().splitlines()[-1].strip())
+    parser.add_option("--apps", type="int", default=20, help="number of apps")
+    parser.add_option("--commands-per-app", type="int", default=4, help="commands registered by each app")
+    parser.add_option("--opens", type="int", default=20, help="number of menu opens to average over")
+    options, _ = parser.parse_args()
+
+    eager = measure(False, options.apps, options.commands_per_app, options.opens)
+    lazy = measure(True, options.apps, options.commands_per_app, options.opens)
+
+    print("%-24s %10s %10s %10s" % ("per menu open", "eager", "lazy", "saved"))
+    for name in ("com_calls", "callbacks_registered", "enable_callbacks"):
+        print("%-24s %10.1f %10.1f %10.1f" % (name, eager[name], lazy[name], eager[name] - lazy[name]))
+    print("%-24s %9.2fms %9.2fms" % ("time", eager["seconds"] * 1000.0, lazy["seconds"] * 1000.0))
+    if lazy["expand_cost"]:
+        print("expanding one app sub-menu: %.1f Softimage calls, %.1f enable callbacks" % lazy["expand_cost"])
+
+    # give the worker threads a moment to exit before the interpreter shuts down:
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread():
+            thread.join(1.0)
+
+    failures = ["%s: a command in a menu from an earlier open didn't run" % name
+                for name, results in (("eager", eager), ("lazy", lazy)) if not results["torn_off_ok"]]
+    for failure in failures:
+        print("FAIL: %s" % failure)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
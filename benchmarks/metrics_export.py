@@ -0,0 +1,139 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Engine metrics overhead and export.
+
+Measures the cost of updating a counter and observing a histogram value,
+then runs the Shotgun Qt event loop timer --ticks times in a stand-in
+session without metrics export and with the metrics exported to an
+OpenMetrics file and a local statsd socket on every tick.  The Shotgun
+menu is opened, a command run and a key pressed so that there is
+something to export.  Reports the time per tick and the metrics exported.
+Exits with a failure if the file or the statsd packets are missing the
+metrics.
+
+Usage:
+    python benchmarks/metrics_export.py [--ticks N]
+"""
+
+import os
+import sys
+import time
+import shutil
+import socket
+import optparse
+import tempfile
+import threading
+
+import standins
+
+# Softimage key code for 'A':
+_KEY_CODE = 65
+
+def measure_updates(engine, num_updates):
+    """
+    :returns: (seconds per counter update, seconds per histogram observation)
+    """
+    counter = engine.metrics_registry.counter("benchmark_updates")
+    histogram = engine.metrics_registry.histogram("benchmark_seconds")
+    start = time.time()
+    for _ in xrange(num_updates):
+        counter.inc()
+    counter_time = (time.time() - start) / num_updates
+    start = time.time()
+    for i in xrange(num_updates):
+        histogram.observe(i * 1e-6)
+    return counter_time, (time.time() - start) / num_updates
+
+def measure_ticks(num_ticks, settings):
+    """
+    :returns: Dictionary of results
+    """
+    session = standins.StandInSession(settings=dict(settings, warmup_enabled=False, menu_snapshot_cache=False))
+    engine = session.start_engine()
+    menu = session.open_menu()
+    session.expand(menu)
+    items = dict((item.Name, item) for item in menu.walk())
+    session.click(items["App 0 Command 0"])
+    standins.QApplication._focus_widget = standins.QWidget()
+    plugin = session._plugin("qt_events.py")
+    plugin.ShotgunQtEventsKeyDown_OnEvent(standins.StandInContextArgs(KeyCode=_KEY_CODE, ShiftMask=0))
+    plugin.ShotgunQtEventsKeyUp_OnEvent(standins.StandInContextArgs(KeyCode=_KEY_CODE, ShiftMask=0))
+    standins.QApplication._focus_widget = None
+
+    start = time.time()
+    for _ in range(num_ticks):
+        session.pump()
+    duration = time.time() - start
+
+    update_times = measure_updates(engine, 100000)
+    metrics = engine.get_metrics()
+    session.stop_engine()
+    return {"tick_time": duration / num_ticks, "update_times": update_times, "metrics": metrics,
+            "export": engine.get_metrics_export_stats()}
+
+def main():
+    parser = optparse.OptionParser(usage=__doc__.strip().splitlines()[-1].strip())
+    parser.add_option("--ticks", type="int", default=500, help="number of event loop timer ticks")
+    options, _ = parser.parse_args()
+
+    folder = tempfile.mkdtemp(prefix="tk-softimage-metrics-")
+    statsd = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    statsd.bind(("127.0.0.1", 0))
+    statsd.settimeout(0.5)
+    metrics_file = os.path.join(folder, "metrics.txt")
+    try:
+        plain = measure_ticks(options.ticks, {})
+        exported = measure_ticks(options.ticks, {"metrics_file": metrics_file,
+                                                 "metrics_statsd_address": "127.0.0.1:%d" % statsd.getsockname()[1],
+                                                 "metrics_export_interval": 0.0})
+        with open(metrics_file) as f:
+            text = f.read()
+        packets = []
+        try:
+            while True:
+                packets.append(statsd.recv(65536))
+        except socket.timeout:
+            pass
+    finally:
+        statsd.close()
+        shutil.rmtree(folder)
+
+    print("%-16s %12s" % ("", "per tick"))
+    for name, results in (("no export", plain), ("export per tick", exported)):
+        print("%-16s %10.1fus" % (name, results["tick_time"] * 1e6))
+    print("counter update %.0fns, histogram observation %.0fns"
+          % (plain["update_times"][0] * 1e9, plain["update_times"][1] * 1e9))
+    print("export: %s" % exported["export"])
+    for name, value in sorted(exported["metrics"].items()):
+        print("    %-45s %s" % (name, value))
+
+    # give the worker threads a moment to exit before the interpreter shuts down:
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread():
+            thread.join(1.0)
+
+    failures = []
+    statsd_lines = "\n".join(packets).splitlines()
+    for name in ("tk_softimage_menu_opens", "tk_softimage_commands_dispatched",
+                 "tk_softimage_key_events_forwarded", "tk_softimage_com_calls"):
+        if not [line for line in text.splitlines() if line.startswith(name + "_total ") and line[-2:] != " 0"]:
+            failures.append("%s is missing from the OpenMetrics file" % name)
+        if not [line for line in statsd_lines if line.startswith(name + ":") and line.endswith("|c")]:
+            failures.append("%s wasn't sent to statsd" % name)
+    if 'tk_softimage_qt_pump_seconds_bucket{le="+Inf"}' not in text or not text.endswith("# EOF\n"):
+        failures.append("the OpenMetrics file is incomplete")
+    for failure in failures:
+        print("FAIL: %s" % failure)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
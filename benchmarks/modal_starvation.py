@@ -0,0 +1,153 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Softimage timer starvation while a modal dialog is open.
+
+Runs a stand-in Softimage main loop that fires the Shotgun Qt event loop
+timer every --interval-ms for --session-ms.  Shortly after it starts, a
+command is dispatched that shows a dialog which the user closes after
+--dialog-ms, first with show_modal and then with show_modal_async.
+Reports the timer ticks delivered out of those expected, the longest gap
+between ticks, the longest single tick and, for show_modal_async, how long
+after the dialog was closed the result was delivered.  Then shows a dialog
+with show_modal_async and destroys the engine whilst it is open.  Exits
+with a failure if a dialog result isn't delivered, including when the
+engine is destroyed, or the timer is starved by show_modal_async.
+
+Usage:
+    python benchmarks/modal_starvation.py [--interval-ms N] [--dialog-ms N] [--session-ms N]
+"""
+
+import sys
+import time
+import optparse
+import threading
+
+import standins
+
+class DialogWidget(standins.QWidget):
+    pass
+
+def measure(use_async, interval, dialog_time, session_time):
+    """
+    :returns: Dictionary of results
+    """
+    session = standins.StandInSession(settings={"warmup_enabled": False, "menu_snapshot_cache": False})
+    engine = session.start_engine()
+
+    dialogs = []
+    create = engine._create_dialog_with_widget
+    def create_dialog_with_widget(*args, **kwargs):
+        dialog, widget = create(*args, **kwargs)
+        dialogs.append(dialog)
+        return dialog, widget
+    engine._create_dialog_with_widget = create_dialog_with_widget
+
+    results = []
+    def on_done(future):
+        results.append((time.time(), future.result()))
+
+    def show():
+        if use_async:
+            engine.show_modal_async("Publish", engine, DialogWidget).add_done_callback(on_done)
+        else:
+            results.append((time.time(), engine.show_modal("Publish", engine, DialogWidget)))
+
+    # the user closes the dialog after dialog_time:
+    standins.QDialog.exec_duration = dialog_time
+    ticks = []
+    longest_tick = 0.0
+    closed_at = None
+    start = time.time()
+    next_tick = start
+    dispatched = False
+    while True:
+        now = time.time()
+        if now - start >= session_time:
+            break
+        if not dispatched and now - start >= interval * 5:
+            engine.command_dispatcher.submit("tk-multi-publish", "Publish...", show)
+            dispatched = True
+            shown_at = now
+        if use_async and dialogs and closed_at is None and now - shown_at >= dialog_time:
+            # the click on the close button is delivered by the Qt event loop:
+            dialog = dialogs[0]
+            standins.QTimer.singleShot(0, lambda: dialog.done(standins.QDialog.Accepted))
+            closed_at = now
+        if now >= next_tick:
+            ticks.append(now)
+            session.pump()
+            longest_tick = max(longest_tick, time.time() - now)
+            # (like Softimage, late ticks aren't made up for)
+            next_tick = max(next_tick + interval, time.time())
+        time.sleep(0.0005)
+
+    standins.QDialog.exec_duration = 0.0
+    session.stop_engine()
+    gaps = [b - a for a, b in zip(ticks, ticks[1:])]
+    return {"ticks": len(ticks), "expected": int(session_time / interval), "max_gap": max(gaps or [0.0]),
+            "longest_tick": longest_tick, "results": results,
+            "result_delay": results[0][0] - closed_at if results and closed_at else None}
+
+def check_destroy():
+    """
+    :returns: The results delivered for a dialog that was open when the engine was destroyed
+    """
+    session = standins.StandInSession(settings={"warmup_enabled": False, "menu_snapshot_cache": False})
+    engine = session.start_engine()
+    results = []
+    future = engine.show_modal_async("Publish", engine, DialogWidget)
+    future.add_done_callback(lambda future: results.append(future.result()[0]))
+    session.pump()
+    session.stop_engine()
+    return results
+
+def main():
+    parser = optparse.OptionParser(usage=__doc__.strip().splitlines()[-1].strip())
+    parser.add_option("--interval-ms", type="float", default=20.0, help="Softimage timer interval")
+    parser.add_option("--dialog-ms", type="float", default=1000.0, help="time the dialog is open for")
+    parser.add_option("--session-ms", type="float", default=2000.0, help="time the Softimage main loop runs for")
+    options, _ = parser.parse_args()
+    interval = options.interval_ms / 1000.0
+    dialog_time = options.dialog_ms / 1000.0
+    session_time = max(options.session_ms / 1000.0, dialog_time + interval * 10)
+
+    rows = [("show_modal", measure(False, interval, dialog_time, session_time)),
+            ("show_modal_async", measure(True, interval, dialog_time, session_time))]
+    destroyed = check_destroy()
+
+    print("%-18s %8s %10s %12s %14s" % ("", "ticks", "max gap", "longest tick", "result delay"))
+    for name, results in rows:
+        delay = results["result_delay"]
+        print("%-18s %4d/%-3d %8.1fms %10.1fms %14s"
+              % (name, results["ticks"], results["expected"], results["max_gap"] * 1000.0,
+                 results["longest_tick"] * 1000.0, "%.1fms" % (delay * 1000.0) if delay is not None else "-"))
+
+    # give the worker threads a moment to exit before the interpreter shuts down:
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread():
+            thread.join(1.0)
+
+    failures = []
+    for name, results in rows:
+        if len(results["results"]) != 1 or results["results"][0][1][0] != standins.QDialog.Accepted:
+            failures.append("%s: the dialog result wasn't delivered" % name)
+    if rows[1][1]["max_gap"] > dialog_time / 2:
+        failures.append("show_modal_async: the Softimage timer was starved for %.1fms"
+                        % (rows[1][1]["max_gap"] * 1000.0))
+    if destroyed != [standins.QDialog.Rejected]:
+        failures.append("show_modal_async: the dialog result wasn't delivered when the engine was destroyed")
+    for failure in failures:
+        print("FAIL: %s" % failure)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
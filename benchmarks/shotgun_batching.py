@@ -0,0 +1,159 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Batched Shotgun queries.
+
+Replays the Shotgun queries of a representative session against a local
+Shotgun server stand-in: a dialog that loads the details of a list of shots,
+their tasks and the project (which several widgets ask for), and then a set
+of widgets that each look up a shot independently.  The dialog also lists the
+shots updated recently, with a date filter, order and limit, and the shots
+matching a complex filter.  The queries are made one
+at a time and then through the engine's batched query api, and the
+round-trips and time taken are reported.  Exits with a failure if the
+batched results differ, if calling result() within a batch scope doesn't
+return or if a done callback isn't run on the main thread.
+
+Usage:
+    python benchmarks/shotgun_batching.py [--shots N] [--latency-ms N]
+"""
+
+import sys
+import time
+import datetime
+import optparse
+import threading
+
+import standins
+import shotgun_server
+
+def _session_queries(num_shots):
+    """
+    :returns: Tuple (dialog queries, widget queries) as (entity type, filters, fields[,
+              order, filter operator, limit])
+    """
+    dialog = []
+    for shot_id in range(1, num_shots + 1):
+        dialog.append(("Shot", [["id", "is", shot_id]], ["code", "sg_status_list"]))
+        dialog.append(("Task", [["entity", "is", {"type": "Shot", "id": shot_id}]], ["content"]))
+    # (neither can be merged with the id lookups)
+    recently_updated = ("Shot", [["updated_at", "greater_than", datetime.datetime(2013, 1, 1)]], ["code"],
+                        [{"field_name": "updated_at", "direction": "desc"}], None, 5)
+    dialog.extend([recently_updated, recently_updated])
+    dialog.append(("Shot", [["id", "is", 1], {"filter_operator": "any",
+                                              "filters": [["sg_status_list", "is", "ip"],
+                                                          ["sg_status_list", "is", "fin"]]}], ["code"]))
+    for _ in range(5):
+        dialog.append(("Project", [["id", "is", 1]], ["name"]))
+    widgets = [("Shot", [["id", "is", (i % num_shots) + 1]], ["code"]) for i in range(num_shots)]
+    return dialog, widgets
+
+def _sequential(client, queries):
+    return [client.find(*query) for query in queries]
+
+def _batched(engine, dialog_queries, widget_queries):
+    with engine.shotgun_batch():
+        pending = [engine.find_batched(*query) for query in dialog_queries]
+    dialog_results = [query.result() for query in pending]
+
+    # independent widgets, collected by the batch window:
+    pending = [engine.find_batched(*query) for query in widget_queries]
+    widget_results = [query.result(timeout=10.0) for query in pending]
+    return dialog_results + widget_results
+
+def _check_scope_and_callbacks(session, engine):
+    """
+    :returns: List of failures
+    """
+    failures = []
+    result = []
+    def wait_in_scope():
+        with engine.shotgun_batch():
+            result.append(engine.find_batched("Project", [["id", "is", 1]], ["name"]).result(timeout=5.0))
+    try:
+        wait_in_scope()
+    except RuntimeError, e:
+        failures.append("result() within a batch scope didn't return: %s" % e)
+
+    callback_threads = []
+    main_thread = threading.current_thread()
+    engine.find_batched("Shot", [["id", "is", 1]], ["code"]).add_done_callback(
+        lambda query: callback_threads.append(threading.current_thread()))
+    deadline = time.time() + 5.0
+    while not callback_threads and time.time() < deadline:
+        session.pump()
+        time.sleep(0.005)
+    if callback_threads != [main_thread]:
+        failures.append("the done callback was run on %s rather than the main thread"
+                        % (callback_threads[0].name if callback_threads else "no thread"))
+    return failures
+
+def _normalise(results):
+    return [sorted(sorted(entity.items()) for entity in result) for result in results]
+
+def main():
+    parser = optparse.OptionParser(usage=__doc__.strip().splitlines()[-1].strip())
+    parser.add_option("--shots", type="int", default=20, help="number of shots in the dialog")
+    parser.add_option("--latency-ms", type="float", default=10.0, help="request round-trip time")
+    options, _ = parser.parse_args()
+
+    entities = [{"type": "Project", "id": 1, "name": "Big Buck Bunny"}]
+    for shot_id in range(1, options.shots + 1):
+        entities.append({"type": "Shot", "id": shot_id, "code": "sh%03d" % shot_id, "sg_status_list": "ip",
+                         "updated_at": (datetime.datetime(2013, 1, 1) + datetime.timedelta(days=shot_id)).isoformat()})
+        entities.append({"type": "Task", "id": 1000 + shot_id, "content": "Anim",
+                         "entity": {"type": "Shot", "id": shot_id}})
+    server = shotgun_server.StandInShotgunServer(entities, options.latency_ms / 1000.0, 0.0).start()
+    dialog_queries, widget_queries = _session_queries(options.shots)
+
+    rows = []
+    failures = []
+    try:
+        client = shotgun_server.StandInShotgunClient(server.url)
+        server.reset_counts()
+        start = time.time()
+        expected = _normalise(_sequential(client, dialog_queries + widget_queries))
+        rows.append(("sequential finds", server.requests, time.time() - start))
+
+        session = standins.StandInSession(shotgun=client,
+                                          settings={"warmup_enabled": False, "menu_snapshot_cache": False})
+        engine = session.start_engine()
+        try:
+            server.reset_counts()
+            start = time.time()
+            results = _normalise(_batched(engine, dialog_queries, widget_queries))
+            rows.append(("batched", server.requests, time.time() - start))
+            if results != expected:
+                failures.append("batched queries returned different results to the sequential finds")
+            failures.extend(_check_scope_and_callbacks(session, engine))
+        finally:
+            session.stop_engine()
+        client.close()
+    finally:
+        server.stop()
+
+    print("%d queries (%d unique)" % (len(dialog_queries) + len(widget_queries),
+                                      len(set(repr(q) for q in dialog_queries + widget_queries))))
+    print("%-24s %12s %10s" % ("", "round-trips", "time"))
+    for name, round_trips, duration in rows:
+        print("%-24s %12d %8.1fms" % (name, round_trips, duration * 1000.0))
+
+    # give the worker threads a moment to exit before the interpreter shuts down:
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread():
+            thread.join(1.0)
+
+    for failure in failures:
+        print("FAIL: %s" % failure)
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main())
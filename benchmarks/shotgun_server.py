@@ -0,0 +1,201 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Local HTTP stand-in for a Shotgun server and a minimal client for it.
+
+The server speaks a simplified version of the Shotgun json api over HTTP/1.1
+keep-alive connections.  Each new connection is delayed to stand in for the
+TCP and TLS handshakes and each request is delayed to stand in for the round
+trip to the server.  It counts the connections and requests it receives so
+benchmarks can measure round-trips.
+"""
+
+import json
+import time
+import socket
+import datetime
+import threading
+import httplib
+import urlparse
+import BaseHTTPServer
+import SocketServer
+
+class _Handler(BaseHTTPServer.BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    # send each response in one packet:
+    wbufsize = -1
+    disable_nagle_algorithm = True
+
+    def setup(self):
+        BaseHTTPServer.BaseHTTPRequestHandler.setup(self)
+        self.server.stand_in.record_connection()
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers.getheader("content-length", 0)))
+        request = json.loads(body)
+        response = self.server.stand_in.handle(request["method_name"], request.get("params"))
+        data = json.dumps(response)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class _ThreadingServer(SocketServer.ThreadingMixIn, BaseHTTPServer.HTTPServer):
+    daemon_threads = True
+
+
+class StandInShotgunServer(object):
+    """
+    Local Shotgun server stand-in holding a fixed set of entities
+    """
+
+    def __init__(self, entities=None, latency=0.01, connect_latency=0.1):
+        """
+        :param entities: List of entity dictionaries, each with at least 'type' and 'id'
+        :param latency: Seconds added to every request
+        :param connect_latency: Seconds added to every new connection
+        """
+        self.entities = list(entities or [])
+        self.latency = latency
+        self.connect_latency = connect_latency
+        self.connections = 0
+        self.requests = 0
+        self.requests_by_method = {}
+        self._lock = threading.Lock()
+        self._server = None
+        self._thread = None
+
+    @property
+    def url(self):
+        return "http://127.0.0.1:%d" % self._server.server_address[1]
+
+    def start(self):
+        self._server = _ThreadingServer(("127.0.0.1", 0), _Handler)
+        self._server.stand_in = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name="shotgun stand-in server")
+        self._thread.daemon = True
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        self._thread.join()
+
+    def reset_counts(self):
+        with self._lock:
+            self.connections = 0
+            self.requests = 0
+            self.requests_by_method = {}
+
+    def record_connection(self):
+        with self._lock:
+            self.connections += 1
+        time.sleep(self.connect_latency)
+
+    def handle(self, method_name, params):
+        with self._lock:
+            self.requests += 1
+            self.requests_by_method[method_name] = self.requests_by_method.get(method_name, 0) + 1
+        time.sleep(self.latency)
+
+        if method_name == "info":
+            return {"version": [7, 0, 0]}
+        if method_name == "read":
+            return self._read(params)
+        raise ValueError("Unsupported method '%s'" % method_name)
+
+    def _read(self, params):
+        filters = {"filter_operator": params.get("filter_operator") or "all", "filters": params["filters"]}
+        entities = [entity for entity in self.entities
+                    if entity["type"] == params["type"] and self._matches(entity, filters)]
+        for order in reversed(params.get("order") or []):
+            entities.sort(key=lambda entity: entity.get(order["field_name"]),
+                          reverse=order.get("direction") == "desc")
+        if params.get("limit"):
+            entities = entities[:params["limit"]]
+        fields = set(params.get("fields") or []) | set(["type", "id"])
+        return [dict((name, entity.get(name)) for name in fields) for entity in entities]
+
+    def _matches(self, entity, filter_):
+        if isinstance(filter_, dict):
+            matches = [self._matches(entity, f) for f in filter_["filters"]]
+            return any(matches) if filter_["filter_operator"] == "any" else all(matches)
+        field, relation, value = filter_
+        if relation == "is":
+            return entity.get(field) == value
+        if relation == "in":
+            return entity.get(field) in value
+        # (dates are sent as iso strings, which compare in date order)
+        if relation == "greater_than":
+            return entity.get(field) > value
+        if relation == "less_than":
+            return entity.get(field) < value
+        raise ValueError("Unsupported filter relation '%s'" % relation)
+
+
+class StandInShotgunClient(object):
+    """
+    Minimal stand-in for shotgun_api3.Shotgun talking to a StandInShotgunServer.
+
+    Like shotgun_api3, the client keeps a single persistent connection which is
+    only opened when the first request is made.
+    """
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        self._host = urlparse.urlparse(base_url).netloc
+        self._connection = None
+        self._lock = threading.Lock()
+
+    def info(self):
+        return self._call("info")
+
+    def find(self, entity_type, filters, fields=None, order=None, filter_operator=None, limit=0):
+        return self._call("read", {"type": entity_type, "filters": filters, "fields": fields, "order": order,
+                                   "filter_operator": filter_operator, "limit": limit})
+
+    def find_one(self, entity_type, filters, fields=None, order=None, filter_operator=None):
+        results = self.find(entity_type, filters, fields, order, filter_operator, 1)
+        return results[0] if results else None
+
+    def close(self):
+        with self._lock:
+            if self._connection:
+                self._connection.close()
+                self._connection = None
+
+    def _call(self, method_name, params=None):
+        body = json.dumps({"method_name": method_name, "params": params}, default=_serialize)
+        with self._lock:
+            if self._connection is None:
+                self._connection = httplib.HTTPConnection(self._host)
+            try:
+                self._connection.request("POST", "/api3/json", body, {"Content-Type": "application/json"})
+                response = self._connection.getresponse()
+                return json.loads(response.read())
+            except (httplib.HTTPException, socket.error):
+                self._connection.close()
+                self._connection = None
+                raise
+
+def _serialize(value):
+    """
+    Serialize dates as iso strings, as shotgun_api3 does
+    """
+    if isinstance(value, (datetime.datetime, datetime.date)):
+        return value.isoformat()
+    raise TypeError("%r is not JSON serializable" % value)
@@ -0,0 +1,146 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Pure-Python stand-in for the Softimage Application and XSIUIToolkit objects,
+and a HostAdapter that wraps them, so that the engine can be run and
+benchmarked where Softimage isn't available.
+
+StandInSession passes a StandInHost to each engine it starts, which sets it
+as the engine's host before the engine is initialized.
+"""
+
+import os
+import imp
+
+ENGINE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# (loaded by path so that the rest of the tk_softimage package isn't imported)
+_host = imp.load_source("standin_tk_softimage_host",
+                        os.path.join(ENGINE_ROOT, "python", "tk_softimage", "host.py"))
+HostAdapter = _host.HostAdapter
+
+
+class StandInHost(HostAdapter):
+    """
+    Pure-Python host that behaves like an interactive Softimage session.  Logged
+    messages, message boxes and plug-in loads are recorded on the stand-in
+    application rather than going anywhere.
+    """
+
+    def __init__(self, interactive=True, version=u"11.0.525.0"):
+        self.stand_in = StandInApplication(interactive, version)
+        severities = {
+            _host.LOG_INFO: StandInApplication.siInfo,
+            _host.LOG_WARNING: StandInApplication.siWarning,
+            _host.LOG_ERROR: StandInApplication.siError,
+            _host.LOG_VERBOSE: StandInApplication.siVerbose,
+        }
+        super(StandInHost, self).__init__(self.stand_in, self.stand_in, severities)
+
+
+class StandInView(object):
+    """
+    Stand-in for a Softimage layout View
+    """
+    def __init__(self, view_type, metadata=None):
+        self.Type = view_type
+        self.State = 0
+        self._attributes = {"metadata": metadata}
+
+    def GetAttributeValue(self, name):
+        return self._attributes.get(name)
+
+
+class StandInViews(list):
+    """
+    Stand-in for a Softimage Views collection
+    """
+    @property
+    def Count(self):
+        return len(self)
+
+
+class _StandInObject(object):
+    """
+    Simple attribute holder
+    """
+    def __init__(self, **kwargs):
+        self.__dict__.update(kwargs)
+
+
+class StandInScene(object):
+    """
+    Stand-in for a Softimage Scene
+    """
+    def __init__(self, name="Scene", filename=""):
+        self.Name = name
+        self.filename = filename
+
+    def Parameters(self, name):
+        if name == "Filename":
+            return _StandInObject(Value=self.filename)
+        raise KeyError(name)
+
+
+class StandInApplication(object):
+    """
+    Stand-in for the Softimage Application and XSIUIToolkit objects
+    """
+    siError, siWarning, siInfo, siVerbose = 2, 4, 8, 32
+
+    def __init__(self, interactive=True, version=u"11.0.525.0"):
+        self.Interactive = interactive
+        self.Name = "Softimage"
+        self.FullName = os.path.join(os.sep, "opt", "Softimage", "Application", "bin", "XSI")
+        self._version = version
+        self.scene = StandInScene()
+        self.Selection = []
+        self.ActiveProject = ""
+        self.Desktop = _StandInObject(ActiveLayout=_StandInObject(Views=StandInViews()),
+                                      RedrawUI=lambda: None)
+        self.messages = []
+        self.msg_boxes = []
+        self.loaded_plugins = []
+        self.projects = []
+
+    def Version(self):
+        return self._version
+
+    def LogMessage(self, msg, severity=siInfo):
+        self.messages.append((severity, msg))
+
+    def MsgBox(self, msg):
+        self.msg_boxes.append(msg)
+        return 1
+
+    def LoadPlugin(self, path):
+        if path not in self.loaded_plugins:
+            self.loaded_plugins.append(path)
+
+    def UnloadPlugin(self, path):
+        if path in self.loaded_plugins:
+            self.loaded_plugins.remove(path)
+
+    def select(self, *names):
+        """
+        Replace the selection with stand-in objects with the given full names
+        """
+        self.Selection = [_StandInObject(FullName=name) for name in names]
+
+    def CreateProject(self, path):
+        self.projects.append(path)
+        return _StandInObject(Path=path, ActiveScene=self.scene)
+
+    def __setattr__(self, name, value):
+        # setting the active project to a path activates the project at that path
+        if name == "ActiveProject" and not isinstance(value, _StandInObject):
+            value = _StandInObject(Path=value, ActiveScene=self.scene)
+        object.__setattr__(self, name, value)
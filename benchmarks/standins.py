@@ -0,0 +1,1101 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Stand-ins for sgtk, Qt and the win32com modules so that the Softimage engine
+and its plug-ins can be run outside of Softimage, e.g. on a Linux build
+machine, using the stand-in host from standin_host.
+
+These only implement as much of each API as the engine uses.  Call install()
+before using StandInSession.
+"""
+
+import os
+import imp
+import copy
+import json
+import zlib
+import sys
+import types
+import logging
+import itertools
+import time
+import tempfile
+
+import standin_host
+
+ENGINE_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+_module_ids = itertools.count()
+
+##########################################################################################
+# Qt
+
+class _QtNamespace(object):
+    """
+    Stand-in for the QtCore.Qt namespace.  Any enum that isn't explicitly
+    defined gets a unique integer value.
+    """
+    NoModifier = 0x00000000
+    ShiftModifier = 0x02000000
+    ControlModifier = 0x04000000
+    AltModifier = 0x08000000
+    KeypadModifier = 0x20000000
+    WindowStaysOnTopHint = 0x00040000
+    ApplicationModal = 2
+    WindowModal = 1
+    NonModal = 0
+    WA_DeleteOnClose = 55
+
+    def __init__(self):
+        self._values = {}
+
+    def __getattr__(self, name):
+        if name.startswith("_"):
+            raise AttributeError(name)
+        return self._values.setdefault(name, 0x01000000 + len(self._values))
+
+
+class QTimer(object):
+    """
+    Stand-in QTimer - single-shot timers are run the next time events are processed
+    """
+    _pending = []
+
+    @staticmethod
+    def singleShot(msec, callback):
+        QTimer._pending.append(callback)
+
+
+class QTextCodec(object):
+    @staticmethod
+    def codecForName(name):
+        return name
+
+    @staticmethod
+    def setCodecForCStrings(codec):
+        pass
+
+
+class QEvent(object):
+    Paint = 12
+    _next_user_type = 1000
+
+    def __init__(self, event_type):
+        self._type = event_type
+
+    def type(self):
+        return self._type
+
+    @staticmethod
+    def Type(value):
+        return value
+
+    @staticmethod
+    def registerEventType():
+        QEvent._next_user_type += 1
+        return QEvent._next_user_type
+
+
+class QObject(object):
+    def __init__(self, parent=None):
+        self._parent = parent
+        self._event_filters = []
+
+    def isDeleted(self):
+        return getattr(self, "_deleted", False)
+
+    def installEventFilter(self, event_filter):
+        self._event_filters.append(event_filter)
+
+    def eventFilter(self, obj, event):
+        return False
+
+    def event(self, event):
+        return False
+
+    def deleteLater(self):
+        self._deleted = True
+
+
+class _Signal(object):
+    def __init__(self):
+        self._slots = []
+
+    def connect(self, slot):
+        self._slots.append(slot)
+
+    def emit(self, *args):
+        for slot in list(self._slots):
+            slot(*args)
+
+
+class QKeyEvent(QEvent):
+    KeyPress = 6
+    KeyRelease = 7
+
+    def __init__(self, event_type, key, modifiers, text="", autorep=False, count=1):
+        super(QKeyEvent, self).__init__(event_type)
+        self._key = key
+        self._modifiers = modifiers
+        self._text = text
+        self._autorep = autorep
+        self._count = count
+
+    def key(self):
+        return self._key
+
+    def modifiers(self):
+        return self._modifiers
+
+    def text(self):
+        return self._text
+
+    def isAutoRepeat(self):
+        return self._autorep
+
+    def count(self):
+        return self._count
+
+
+class QRect(object):
+    """
+    Stand-in QRect - widgets cover the whole screen
+    """
+    def contains(self, point):
+        return True
+
+
+class QWidget(QObject):
+    """
+    Stand-in QWidget.  Widgets without a parent are registered as top-level
+    widgets with the QApplication.  Showing a widget posts a paint event.
+    """
+    def __init__(self, parent=None):
+        super(QWidget, self).__init__(parent)
+        self._title = ""
+        self._visible = False
+        self._flags = 0
+        self._attributes = {}
+        self.received_events = []
+        if parent is None:
+            QApplication._top_level_widgets.append(self)
+
+    def windowTitle(self):
+        return self._title
+
+    def setWindowTitle(self, title):
+        self._title = title
+
+    def setWindowFlags(self, flags):
+        self._flags = flags
+
+    def setWindowModality(self, modality):
+        self._modality = modality
+
+    def windowModality(self):
+        return getattr(self, "_modality", _QtNamespace.NonModal)
+
+    def setWindowIcon(self, icon):
+        self._icon = icon
+
+    def window(self):
+        return self._parent.window() if self._parent else self
+
+    def winId(self):
+        return id(self)
+
+    def geometry(self):
+        return QRect()
+
+    def setAttribute(self, attribute, on=True):
+        self._attributes[attribute] = on
+
+    def testAttribute(self, attribute):
+        return self._attributes.get(attribute, False)
+
+    def setStyleSheet(self, stylesheet):
+        self._stylesheet = stylesheet
+
+    def styleSheet(self):
+        return getattr(self, "_stylesheet", "")
+
+    def update(self):
+        pass
+
+    def show(self):
+        self._visible = True
+        QApplication.postEvent(self, QEvent(QEvent.Paint))
+
+    def hide(self):
+        self._visible = False
+
+    def close(self):
+        self._visible = False
+        return True
+
+    def isVisible(self):
+        return self._visible
+
+    def event(self, event):
+        self.received_events.append(event)
+        return True
+
+    def deleteLater(self):
+        super(QWidget, self).deleteLater()
+        if self in QApplication._top_level_widgets:
+            QApplication._top_level_widgets.remove(self)
+
+
+class QDialog(QWidget):
+    """
+    Stand-in QDialog.  exec_ runs a modal event loop for exec_duration seconds,
+    or until the dialog is closed, after which the dialog is accepted.
+    """
+    Rejected = 0
+    Accepted = 1
+    exec_duration = 0.0
+
+    def __init__(self, parent=None):
+        super(QDialog, self).__init__(parent)
+        self.finished = _Signal()
+        self._result = QDialog.Rejected
+
+    def exec_(self):
+        self.show()
+        # the modal event loop paints the dialog:
+        QApplication.sendPostedEvents()
+        deadline = time.time() + QDialog.exec_duration
+        while self._visible and time.time() < deadline:
+            time.sleep(0.001)
+            QApplication.processEvents()
+        if self._visible:
+            self.done(QDialog.Accepted)
+        return self._result
+
+    def done(self, result):
+        self._result = result
+        self.hide()
+        self.finished.emit(result)
+        if self.testAttribute(_QtNamespace.WA_DeleteOnClose):
+            self.deleteLater()
+
+    def close(self):
+        if self._visible:
+            self.done(QDialog.Rejected)
+        return True
+
+
+class QMessageBox(object):
+    Ok = 0x00000400
+
+    @staticmethod
+    def information(*args, **kwargs):
+        return QMessageBox.Ok
+
+    @staticmethod
+    def critical(*args, **kwargs):
+        return QMessageBox.Ok
+
+    @staticmethod
+    def question(*args, **kwargs):
+        return QMessageBox.Ok
+
+    @staticmethod
+    def warning(*args, **kwargs):
+        return QMessageBox.Ok
+
+
+class QPixmap(object):
+    """
+    Stand-in QPixmap.  Loading an image reads the file and takes decode_cost
+    seconds to stand in for decoding it.  As with Qt, loaded images are kept
+    in the QPixmapCache, keyed by path and modification time.
+    """
+    decode_cost = 0.0
+    decoded = 0
+
+    def __init__(self, path=None):
+        self.path = path
+        self.data = None
+        if path:
+            key = "qt_pixmap_%s_%s" % (path, os.path.getmtime(path))
+            if QPixmapCache.find(key, self):
+                return
+            with open(path, "rb") as f:
+                self.data = f.read()
+            time.sleep(QPixmap.decode_cost)
+            QPixmap.decoded += 1
+            QPixmapCache.insert(key, self)
+
+    def isNull(self):
+        return self.data is None
+
+
+class QPixmapCache(object):
+    _cache = {}
+
+    @staticmethod
+    def find(key, pixmap):
+        cached = QPixmapCache._cache.get(key)
+        if cached is None:
+            return False
+        pixmap.path, pixmap.data = cached.path, cached.data
+        return True
+
+    @staticmethod
+    def insert(key, pixmap):
+        QPixmapCache._cache[key] = pixmap
+        return True
+
+    @staticmethod
+    def clear():
+        QPixmapCache._cache = {}
+
+
+class QPalette(object):
+    def __init__(self, other=None):
+        self.colors = dict(other.colors) if other else {}
+
+    def setColor(self, role, color):
+        self.colors[role] = color
+
+
+class QStyle(object):
+    def __init__(self, name):
+        self._name = name
+
+    def objectName(self):
+        return self._name
+
+
+class QIcon(object):
+    def __init__(self, source=None):
+        if isinstance(source, QPixmap):
+            self.path, self.pixmap = source.path, source
+        else:
+            self.path, self.pixmap = source, QPixmap(source) if source else None
+
+
+class QCursor(object):
+    @staticmethod
+    def pos():
+        return (0, 0)
+
+
+class QApplication(object):
+    """
+    Stand-in QApplication.  processEvents runs any pending single-shot timers.
+    """
+    _instance = None
+    _top_level_widgets = []
+    _focus_widget = None
+    _posted_events = []
+
+    def __init__(self, args):
+        QApplication._instance = self
+        self._properties = {}
+
+    @staticmethod
+    def instance():
+        return QApplication._instance
+
+    def property(self, name):
+        return self._properties.get(name)
+
+    def setProperty(self, name, value):
+        self._properties[name] = value
+
+    @staticmethod
+    def processEvents(*args):
+        QApplication.sendPostedEvents()
+        pending = QTimer._pending
+        QTimer._pending = []
+        for callback in pending:
+            callback()
+
+    @staticmethod
+    def postEvent(receiver, event):
+        QApplication._posted_events.append((receiver, event))
+
+    @staticmethod
+    def sendPostedEvents(*args):
+        posted = QApplication._posted_events
+        QApplication._posted_events = []
+        for receiver, event in posted:
+            QApplication.sendEvent(receiver, event)
+
+    @staticmethod
+    def sendEvent(receiver, event):
+        for event_filter in getattr(receiver, "_event_filters", []):
+            if event_filter.eventFilter(receiver, event):
+                return True
+        return receiver.event(event)
+
+    @staticmethod
+    def topLevelWidgets():
+        return list(QApplication._top_level_widgets)
+
+    def focusWidget(self):
+        return QApplication._focus_widget
+
+    def setWindowIcon(self, icon):
+        self.window_icon = icon
+
+    def setQuitOnLastWindowClosed(self, quit):
+        pass
+
+    def setStyle(self, name):
+        self._style = QStyle(name)
+
+    def style(self):
+        return getattr(self, "_style", None)
+
+    def setPalette(self, palette):
+        self._palette = palette
+
+    def palette(self):
+        return getattr(self, "_palette", None) or QPalette()
+
+    def setStyleSheet(self, stylesheet):
+        self._stylesheet = stylesheet
+
+    def styleSheet(self):
+        return getattr(self, "_stylesheet", "")
+
+
+def _make_qt_modules():
+    QtCore = types.ModuleType("QtCore")
+    QtCore.Qt = _QtNamespace()
+    QtCore.QTimer = QTimer
+    QtCore.QTextCodec = QTextCodec
+    QtCore.QEvent = QEvent
+    QtCore.QObject = QObject
+
+    QtGui = types.ModuleType("QtGui")
+    for cls in (QApplication, QWidget, QDialog, QMessageBox, QIcon, QCursor, QKeyEvent, QPixmap, QPixmapCache,
+                QPalette):
+        setattr(QtGui, cls.__name__, cls)
+    return QtCore, QtGui
+
+def make_stylesheet(num_rules):
+    """
+    :returns: A Qt stylesheet with num_rules commented rules using the Shotgun style tokens
+    """
+    rules = []
+    for i in range(num_rules):
+        rules.append("/* rule %d */\n"
+                     "QWidget#widget_%d QPushButton:hover {\n"
+                     "    color: {{SG_FOREGROUND_COLOR}};\n"
+                     "    border: 1px solid {{SG_HIGHLIGHT_COLOR}};\n"
+                     "    padding: 2px 4px 2px 4px;\n"
+                     "}\n" % (i, i))
+    return "\n".join(rules)
+
+##########################################################################################
+# sgtk
+
+_current_engine = None
+
+def current_engine():
+    return _current_engine
+
+
+class Engine(object):
+    """
+    Stand-in for sgtk.platform.Engine.  Runs the same engine start-up and
+    shut-down sequence as the real thing.
+    """
+
+    def __init__(self, tk, context, engine_instance_name, env, settings=None, apps=None, host=None,
+                 disk_location=ENGINE_ROOT):
+        """
+        :param settings: Dictionary of engine settings
+        :param apps: Dictionary of app instance name to StandInApp
+        :param host: Host adapter the engine should use instead of creating its own
+        :param disk_location: The folder the engine is installed in
+        """
+        global _current_engine
+        self.tank = self.sgtk = tk
+        self.context = context
+        self.instance_name = engine_instance_name
+        self.name = "tk-softimage"
+        self.cache_location = os.path.join(tempfile.gettempdir(), "tk-softimage-standins", engine_instance_name)
+        self.environment = {"name": env, "description": "",
+                            "disk_location": self._write_environment(env, settings or {})}
+        self.disk_location = disk_location
+        self.icon_256 = os.path.join(disk_location, "icon_256.png")
+        self.logger = logging.getLogger("sgtk.env.%s.%s" % (env, engine_instance_name))
+        self.apps = {}
+        self.commands = {}
+        self.metrics = []
+        self._settings = dict(settings or {})
+        self._modules = {}
+        if host is not None:
+            # (the host is injected before the engine is initialized)
+            self.host = host
+
+        # seconds spent in each stage of the engine's life:
+        self.stage_times = {}
+
+        _current_engine = self
+        self._run_stage("init_engine", self.init_engine)
+        self._override_qmessagebox_methods(sys.modules["sgtk.platform.qt"].QtGui)
+        self._run_stage("pre_app_init", self.pre_app_init)
+        self._run_stage("init_apps", self._init_apps, apps or {})
+        self._run_stage("post_app_init", self.post_app_init)
+
+    def _run_stage(self, name, function, *args):
+        start = time.time()
+        try:
+            return function(*args)
+        finally:
+            self.stage_times[name] = time.time() - start
+
+    def _init_apps(self, apps):
+        for instance_name, app in apps.items():
+            app.init_app(self, instance_name)
+            self.apps[instance_name] = app
+
+    @property
+    def shotgun(self):
+        return self.tank.shotgun
+
+    def _write_environment(self, env, settings):
+        """
+        Write the settings to a stand-in environment file so that caches keyed on
+        the configuration files see settings changes.  The modification time is
+        derived from the contents so that changes are seen even within a second.
+        """
+        env_root = os.path.join(self.tank.pipeline_configuration.get_path(), "config", "env")
+        if not os.path.isdir(env_root):
+            env_root = os.path.join(self.cache_location, "env")
+        path = os.path.join(env_root, "%s.yml" % env)
+        data = json.dumps(settings, sort_keys=True, default=repr)
+        if not os.path.isdir(os.path.dirname(path)):
+            os.makedirs(os.path.dirname(path))
+        with open(path, "wt") as f:
+            f.write(data)
+        mtime = zlib.crc32(data) & 0x3fffffff
+        os.utime(path, (mtime, mtime))
+        return path
+
+    def get_setting(self, key, default=None):
+        """
+        As with tk-core, resolve the {config} and {engine} tokens in the setting
+        value, returning a copy
+        """
+        self.settings_resolved = getattr(self, "settings_resolved", 0) + 1
+        if key not in self._settings:
+            return default
+        return self._resolve_setting_value(copy.deepcopy(self._settings[key]))
+
+    def _resolve_setting_value(self, value):
+        if isinstance(value, basestring):
+            if "{" in value:
+                value = value.replace("{config}", self.tank.pipeline_configuration.get_path())
+                value = value.replace("{engine}", self.disk_location)
+            return value
+        if isinstance(value, list):
+            return [self._resolve_setting_value(v) for v in value]
+        if isinstance(value, dict):
+            return dict((k, self._resolve_setting_value(v)) for k, v in value.items())
+        return value
+
+    def import_module(self, module_name):
+        """
+        Import a module from the engine's python folder.  As with tk-core, each
+        engine instance gets its own copy of the module.
+        """
+        if module_name not in self._modules:
+            uid = "standin_%s_%d" % (module_name, next(_module_ids))
+            python_path = os.path.join(self.disk_location, "python")
+            fh, path, desc = imp.find_module(module_name, [python_path])
+            try:
+                self._modules[module_name] = imp.load_module(uid, fh, path, desc)
+            finally:
+                if fh:
+                    fh.close()
+        return self._modules[module_name]
+
+    def register_command(self, name, callback, properties=None):
+        self.commands[name] = {"callback": callback, "properties": properties or {}}
+
+    def log_metric(self, action):
+        self.metrics.append(action)
+
+    def destroy(self):
+        global _current_engine
+        self._run_stage("destroy_engine", self.destroy_engine)
+        _current_engine = None
+
+        # unlike tk-core, forget the modules imported for this engine so
+        # that they don't accumulate across engine restarts
+        for module in self._modules.values():
+            for name in [n for n in sys.modules if n == module.__name__ or n.startswith(module.__name__ + ".")]:
+                del sys.modules[name]
+        self._modules = {}
+
+    def _initialize_dark_look_and_feel(self):
+        """
+        As with tk-core, build the dark palette and load and resolve the dark stylesheet
+        """
+        app = QApplication.instance()
+        app.setStyle("plastique")
+        palette = QPalette()
+        for role in range(20):
+            palette.setColor(role, "#%06x" % (0x2b2b2b + role))
+        app.setPalette(palette)
+        app.setStyleSheet(self._resolve_sg_stylesheet_tokens(make_stylesheet(40)))
+
+    def _resolve_sg_stylesheet_tokens(self, stylesheet):
+        for token, value in (("{{SG_HIGHLIGHT_COLOR}}", "#18A7E3"), ("{{SG_ALERT_COLOR}}", "#FC6246"),
+                             ("{{SG_FOREGROUND_COLOR}}", "#C8C8C8")):
+            stylesheet = stylesheet.replace(token, value)
+        return stylesheet
+
+    def _apply_external_stylesheet(self, bundle, widget):
+        """
+        As with tk-core, read and resolve the bundle's style.qss for every dialog
+        """
+        qss_file = os.path.join(bundle.disk_location, "style.qss")
+        if os.path.exists(qss_file):
+            with open(qss_file, "rt") as f:
+                widget.setStyleSheet(self._resolve_sg_stylesheet_tokens(f.read()))
+            widget.update()
+
+    def _create_dialog_with_widget(self, title, bundle, widget_class, *args, **kwargs):
+        dialog = QDialog(self._get_dialog_parent())
+        dialog.setWindowTitle(title)
+        dialog.setWindowIcon(QIcon(bundle.icon_256))
+        dialog.setAttribute(_QtNamespace.WA_DeleteOnClose, True)
+        widget = widget_class(*args, **kwargs)
+        self._apply_external_stylesheet(bundle, widget)
+        return dialog, widget
+
+    def show_dialog(self, title, bundle, widget_class, *args, **kwargs):
+        dialog, widget = self._create_dialog_with_widget(title, bundle, widget_class, *args, **kwargs)
+        dialog.show()
+        return widget
+
+
+class StandInApp(object):
+    """
+    Stand-in app that registers a number of commands with the engine
+    """
+    def __init__(self, display_name, num_commands=1, enable_callback=None):
+        self.display_name = display_name
+        self.num_commands = num_commands
+        self.enable_callback = enable_callback
+        self.engine = None
+        self.instance_name = None
+        self.invocations = 0
+
+    def init_app(self, engine, instance_name):
+        self.engine = engine
+        self.instance_name = instance_name
+        for i in range(self.num_commands):
+            properties = {"app": self}
+            if self.enable_callback:
+                properties["enable_callback"] = self.enable_callback
+            engine.register_command("%s Command %d" % (self.display_name, i), self._run, properties)
+
+    def _run(self):
+        self.invocations += 1
+
+
+class StandInShotgun(object):
+    def __init__(self, base_url="https://example.shotgunstudio.com"):
+        self.base_url = base_url
+        self.calls = []
+
+    def info(self):
+        self.calls.append(("info",))
+        return {"version": [7, 0, 0]}
+
+    def find(self, entity_type, filters, fields=None, *args, **kwargs):
+        self.calls.append(("find", entity_type, filters, fields))
+        return []
+
+    def find_one(self, entity_type, filters, fields=None, *args, **kwargs):
+        self.calls.append(("find_one", entity_type, filters, fields))
+        return None
+
+
+class StandInTemplate(object):
+    def __init__(self, definition):
+        self.definition = definition
+
+    def apply_fields(self, fields):
+        return self.definition % fields
+
+
+class StandInPipelineConfiguration(object):
+    def __init__(self, path):
+        self._path = path
+
+    def get_path(self):
+        return self._path
+
+
+class StandInTk(object):
+    def __init__(self, shotgun=None, templates=None, roots=None, config_path=None):
+        self.shotgun = shotgun or StandInShotgun()
+        self.pipeline_configuration = StandInPipelineConfiguration(config_path or
+                                                                   os.path.join(os.sep, "configs", "standin"))
+        self.templates = templates or {}
+        self.roots = roots or {"primary": os.path.join(os.sep, "projects")}
+        self.paths_from_entity_calls = 0
+
+    @property
+    def shotgun_url(self):
+        # (as with tk-core, this is read from the configuration without connecting)
+        return self.shotgun.base_url
+
+    def paths_from_entity(self, entity_type, entity_id):
+        self.paths_from_entity_calls += 1
+        return [os.path.join(self.roots["primary"], entity_type, str(entity_id))]
+
+
+class StandInContext(object):
+    def __init__(self, project=None, entity=None, step=None, task=None):
+        self.project = project or {"type": "Project", "id": 1, "name": "Big Buck Bunny"}
+        self.entity = entity
+        self.step = step
+        self.task = task
+
+    def serialize(self):
+        return json.dumps({"project": self.project, "entity": self.entity, "step": self.step, "task": self.task})
+
+    def as_template_fields(self, template):
+        fields = {"Project": self.project["name"]}
+        if self.entity:
+            fields[self.entity["type"]] = self.entity.get("name")
+        return fields
+
+    def __str__(self):
+        if self.entity:
+            return "%s %s" % (self.entity["type"], self.entity.get("name"))
+        return "Project %s" % self.project["name"]
+
+##########################################################################################
+# win32com
+
+class _Constants(object):
+    siMenuMainTopLevelID = "{5B39D7CF-8F13-4F0B-A0F3-0A2C4D4F1B3B}"
+    siMenuItemSubmenu = 2
+    siOnKeyDown = 1
+    siOnKeyUp = 2
+    siShiftMask = 1
+    siCtrlMask = 2
+    siAltMask = 4
+    siError = 2
+    siWarning = 4
+    siInfo = 8
+    siVerbose = 32
+
+##########################################################################################
+# Softimage plug-ins
+
+class StandInMenuItem(object):
+    def __init__(self, label, callback_name):
+        self.Name = label
+        self.Callback = callback_name
+        self.Enabled = True
+
+
+class StandInMenu(object):
+    """
+    Stand-in for a Softimage Menu
+    """
+    def __init__(self, name):
+        self.Name = name
+        self.Callback = None
+        self.items = []
+
+    def AddCallbackItem(self, label, callback_name):
+        item = StandInMenuItem(label, callback_name)
+        self.items.append(item)
+        return item
+
+    def AddSubMenu(self, label):
+        sub_menu = StandInMenu(label)
+        self.items.append(sub_menu)
+        return sub_menu
+
+    def AddItem(self, label, style):
+        if style == _Constants.siMenuItemSubmenu:
+            return self.AddSubMenu(label)
+        item = StandInMenuItem(label, None)
+        self.items.append(item)
+        return item
+
+    def AddSeparatorItem(self):
+        self.items.append(None)
+
+    def walk(self):
+        """
+        Yield all menu items in this menu and its sub-menus.  Dynamic sub-menus
+        are yielded as well as any items they have been populated with.
+        """
+        for item in self.items:
+            if isinstance(item, StandInMenu):
+                if item.Callback:
+                    yield item
+                for sub_item in item.walk():
+                    yield sub_item
+            elif item is not None:
+                yield item
+
+
+class StandInPluginRegistrar(object):
+    def __init__(self, path):
+        self.OriginPath = os.path.dirname(path)
+        self.Name = None
+        self.menus = []
+        self.events = []
+        self.timer_events = []
+
+    def RegisterMenu(self, anchor, name, clicked=False, dynamic=False):
+        self.menus.append(name)
+
+    def RegisterEvent(self, name, event):
+        self.events.append(name)
+
+    def RegisterTimerEvent(self, name, interval, delay):
+        self.timer_events.append((name, interval))
+
+
+class StandInContextArgs(object):
+    """
+    Stand-in for the context passed to plug-in callbacks
+    """
+    def __init__(self, source=None, **attributes):
+        self.Source = source
+        self._attributes = attributes
+
+    def GetAttribute(self, name):
+        return self._attributes.get(name)
+
+    def SetAttribute(self, name, value):
+        self._attributes[name] = value
+
+
+def load_plugin(path, application):
+    """
+    Load a Softimage plug-in the way Softimage does, injecting the Application
+    object into its namespace and calling XSILoadPlugin.
+
+    :returns: The plug-in module
+    """
+    module = imp.new_module("standin_plugin_%d" % next(_module_ids))
+    module.__file__ = path
+    module.Application = application
+    with open(path) as fh:
+        exec(compile(fh.read(), path, "exec"), module.__dict__)
+    module.XSILoadPlugin(StandInPluginRegistrar(path))
+    return module
+
+
+def unload_plugin(module):
+    """
+    Unload a plug-in loaded with load_plugin
+    """
+    registrar = StandInPluginRegistrar(module.__file__)
+    registrar.Name = os.path.basename(module.__file__)
+    module.XSIUnloadPlugin(registrar)
+
+##########################################################################################
+
+def install():
+    """
+    Install the stand-in sgtk, tank, Qt and win32com modules into sys.modules
+    """
+    QtCore, QtGui = _make_qt_modules()
+
+    qt = types.ModuleType("sgtk.platform.qt")
+    qt.QtCore = QtCore
+    qt.QtGui = QtGui
+
+    platform = types.ModuleType("sgtk.platform")
+    platform.Engine = Engine
+    platform.current_engine = current_engine
+    platform.qt = qt
+
+    sgtk = types.ModuleType("sgtk")
+    sgtk.platform = platform
+
+    win32com = types.ModuleType("win32com")
+    client = types.ModuleType("win32com.client")
+    client.constants = _Constants()
+    win32com.client = client
+
+    PySide = types.ModuleType("PySide")
+    PySide.QtCore = QtCore
+    PySide.QtGui = QtGui
+
+    sys.modules.update({
+        "PySide": PySide,
+        "PySide.QtCore": QtCore,
+        "PySide.QtGui": QtGui,
+        "sgtk": sgtk,
+        "sgtk.platform": platform,
+        "sgtk.platform.qt": qt,
+        "tank": sgtk,
+        "tank.platform": platform,
+        "tank.platform.qt": qt,
+        "win32com": win32com,
+        "win32com.client": client,
+    })
+
+    return qt
+
+
+class StandInSession(object):
+    """
+    A stand-in Softimage session that the engine can be started in, with the
+    Shotgun menu and Qt event loop plug-ins loaded as Softimage would load them.
+    """
+
+    def __init__(self, num_apps=5, commands_per_app=3, num_favourites=0, num_layout_views=0,
+                 enable_callback=None, settings=None, context=None, shotgun=None, engine_root=ENGINE_ROOT, config_path=None):
+        """
+        :param shotgun: The Shotgun connection to use, defaults to a StandInShotgun
+        :param engine_root: The folder to load the engine from
+        :param config_path: The pipeline configuration folder.  If it exists, the
+                            environment file is written to its config/env folder
+        """
+        self.qt = install()
+        self.engine_root = engine_root
+        self.num_apps = num_apps
+        self.commands_per_app = commands_per_app
+        self.num_favourites = num_favourites
+        self.enable_callback = enable_callback
+        self.settings = dict(settings or {})
+        self.context = context or StandInContext(entity={"type": "Shot", "id": 42, "name": "sh010"})
+        self.tk = StandInTk(shotgun, config_path=config_path)
+        self.engine = None
+        self.plugins = {}
+        # seconds spent in each stage of starting and stopping the last engine:
+        self.stage_times = {}
+
+        # the host is shared by all engines started in this session, in the same
+        # way that the Softimage session outlives an engine restart:
+        self.host = standin_host.StandInHost()
+        views = self.host.stand_in.Desktop.ActiveLayout.Views
+        for i in range(num_layout_views):
+            views.append(standin_host.StandInView("Explorer" if i % 2 else "Menu Window", "View %d" % i))
+
+    def _load_engine_module(self):
+        name = "standin_engine_%d" % next(_module_ids)
+        return imp.load_source(name, os.path.join(self.engine_root, "engine.py"))
+
+    def make_apps(self):
+        return dict(("tk-multi-app%d" % i,
+                     StandInApp("App %d" % i, self.commands_per_app, self.enable_callback))
+                    for i in range(self.num_apps))
+
+    def make_settings(self):
+        settings = {"menu_favourites": []}
+        for i in range(min(self.num_favourites, self.num_apps)):
+            settings["menu_favourites"].append({"app_instance": "tk-multi-app%d" % i,
+                                                "name": "App %d Command 0" % i})
+        settings.update(self.settings)
+        return settings
+
+    def start_engine(self):
+        """
+        Start the engine and load the Softimage plug-ins it registers
+        """
+        self.stage_times = {}
+        start = time.time()
+        engine_module = self._load_engine_module()
+        self.stage_times["load_engine"] = time.time() - start
+        self._engine_module_name = engine_module.__name__
+        self.engine = engine_module.SoftimageEngine(self.tk, self.context, "tk-softimage", "standin",
+                                                    settings=self.make_settings(), apps=self.make_apps(),
+                                                    host=self.host, disk_location=self.engine_root)
+        self.stage_times.update(self.engine.stage_times)
+        start = time.time()
+        self._sync_plugins()
+        self.stage_times["load_plugins"] = time.time() - start
+        return self.engine
+
+    def stop_engine(self):
+        """
+        Destroy the engine and unload its plug-ins
+        """
+        self.engine.destroy()
+        self.stage_times.update(self.engine.stage_times)
+        self.engine = None
+        start = time.time()
+        self._sync_plugins()
+        self.stage_times["unload_plugins"] = time.time() - start
+        # unlike tk-core, release the engine module so that modules don't
+        # accumulate across engine restarts:
+        del sys.modules[self._engine_module_name]
+
+    def _sync_plugins(self):
+        """
+        Load/unload plug-in modules to match the plug-ins loaded in the stand-in host
+        """
+        loaded = self.host.stand_in.loaded_plugins
+        for path in list(self.plugins):
+            if path not in loaded:
+                unload_plugin(self.plugins.pop(path))
+        for path in loaded:
+            if path not in self.plugins:
+                self.plugins[path] = load_plugin(path, self.host.stand_in)
+
+    def _plugin(self, name):
+        for path, plugin in self.plugins.items():
+            if os.path.basename(path) == name:
+                return plugin
+        return None
+
+    def open_menu(self):
+        """
+        Open the Shotgun menu, building it as Softimage would
+
+        :returns: The StandInMenu that was built
+        """
+        si_menu = StandInMenu("Shotgun")
+        self._plugin("menu.py").Shotgun_Init(StandInContextArgs(si_menu))
+        return si_menu
+
+    def expand(self, menu):
+        """
+        Expand all the dynamic sub-menus in the menu, populating them as Softimage would
+        """
+        for item in menu.items:
+            if isinstance(item, StandInMenu):
+                if item.Callback:
+                    del item.items[:]
+                    getattr(self._plugin("menu.py"), item.Callback)(StandInContextArgs(item))
+                self.expand(item)
+
+    def click(self, menu_item):
+        """
+        Click a menu item
+        """
+        getattr(self._plugin("menu.py"), menu_item.Callback)(None)
+
+    def pump(self):
+        """
+        Run the Shotgun Qt event loop timer event once
+        """
+        self._plugin("qt_events.py").ShotgunQtEventLoop_OnEvent(StandInContextArgs())
+
+    def menu_callback_count(self):
+        """
+        :returns: The number of menu callbacks registered in the menu plug-in
+        """
+        plugin = self._plugin("menu.py")
+        return len([name for name in vars(plugin) if name.startswith("_shotgun_menu_command_")])
@@ -0,0 +1,104 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Style application time and memory across many dialogs.
+
+Creates --dialogs dialogs for an app with a stylesheet of --rules rules and
+a header icon that takes --decode-ms to decode, in a stand-in session:
+reading the stylesheet and decoding the icon for every dialog, as tk-core
+does, and then through the engine's style cache, with and without
+minification.  Reports the time taken, the number of icon decodes and the
+stylesheet memory held by the dialogs.
+
+Usage:
+    python benchmarks/style_cache.py [--dialogs N] [--rules N] [--decode-ms N]
+"""
+
+import os
+import sys
+import time
+import types
+import shutil
+import optparse
+import tempfile
+import threading
+
+import standins
+
+class StandInBundle(object):
+    def __init__(self, disk_location):
+        self.disk_location = disk_location
+        self.icon_256 = os.path.join(disk_location, "icon_256.png")
+
+def measure(bundle, num_dialogs, cached, minify):
+    """
+    :returns: Dictionary with the time taken, the number of icons decoded and the number of
+              stylesheet characters held
+    """
+    standins.QPixmapCache.clear()
+    standins.QPixmap.decoded = 0
+    session = standins.StandInSession(settings={"warmup_enabled": False, "menu_snapshot_cache": False,
+                                                "minify_stylesheets": minify})
+    engine = session.start_engine()
+    results = {}
+    try:
+        if not cached:
+            # as tk-core does, without the engine's style cache:
+            engine._apply_external_stylesheet = types.MethodType(standins.Engine._apply_external_stylesheet,
+                                                                 engine)
+
+        start = time.time()
+        widgets = [engine._create_dialog_with_widget("Loader", bundle, standins.QWidget)[1]
+                   for _ in range(num_dialogs)]
+        results["time"] = time.time() - start
+        results["decoded"] = standins.QPixmap.decoded
+        # (widgets sharing the cached stylesheet share the same string)
+        stylesheets = dict((id(w.styleSheet()), w.styleSheet()) for w in widgets)
+        results["stylesheet_chars"] = sum(len(stylesheet) for stylesheet in stylesheets.values())
+    finally:
+        session.stop_engine()
+    return results
+
+def main():
+    parser = optparse.OptionParser(usage=__doc__.strip().splitlines()[-1].strip())
+    parser.add_option("--dialogs", type="int", default=100, help="number of dialogs to create")
+    parser.add_option("--rules", type="int", default=200, help="number of rules in the app stylesheet")
+    parser.add_option("--decode-ms", type="float", default=2.0, help="time taken to decode an icon")
+    options, _ = parser.parse_args()
+    standins.QPixmap.decode_cost = options.decode_ms / 1000.0
+
+    bundle_root = tempfile.mkdtemp(prefix="tk-softimage-style-")
+    try:
+        bundle = StandInBundle(bundle_root)
+        shutil.copy(os.path.join(standins.ENGINE_ROOT, "icon_256.png"), bundle.icon_256)
+        with open(os.path.join(bundle_root, "style.qss"), "wt") as f:
+            f.write(standins.make_stylesheet(options.rules))
+
+        rows = [("uncached", measure(bundle, options.dialogs, False, False)),
+                ("cached", measure(bundle, options.dialogs, True, False)),
+                ("cached + minified", measure(bundle, options.dialogs, True, True))]
+    finally:
+        shutil.rmtree(bundle_root)
+
+    print("%d dialogs, %d stylesheet rules" % (options.dialogs, options.rules))
+    print("%-18s %10s %8s %16s" % ("", "dialogs", "decodes", "stylesheet chars"))
+    for name, results in rows:
+        print("%-18s %8.1fms %8d %16d" % (name, results["time"] * 1000.0, results["decoded"],
+                                          results["stylesheet_chars"]))
+
+    # give the worker threads a moment to exit before the interpreter shuts down:
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread():
+            thread.join(1.0)
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,103 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Warm-up.
+
+Starts the engine in a stand-in session connected to a local Shotgun server
+stand-in, with and without the warm-up, and reports how long the first
+Shotgun query made on the main thread takes along with the warm-up step
+timings and the longest Shotgun Qt event loop timer tick while the warm-up
+ran.  Exits with a failure if the warm-up didn't connect to the server, or
+if a timer tick took as long as setting up a connection, i.e. the warm-up
+made a network round-trip on the main thread.
+
+Usage:
+    python benchmarks/warmup.py [--connect-ms N] [--latency-ms N]
+"""
+
+import sys
+import time
+import optparse
+import threading
+
+import standins
+import shotgun_server
+
+def measure(server, warmup_enabled):
+    """
+    :returns: Tuple (seconds taken by the first query, warm-up timings, longest timer tick in seconds)
+    """
+    server.reset_counts()
+    client = shotgun_server.StandInShotgunClient(server.url)
+    session = standins.StandInSession(shotgun=client,
+                                      settings={"warmup_enabled": warmup_enabled,
+                                                "warmup_modules": ["json", "webbrowser"],
+                                                "menu_snapshot_cache": False})
+    engine = session.start_engine()
+    longest_tick = 0.0
+    try:
+        if warmup_enabled:
+            # the warm-up imports each module and connects to Shotgun as the timer runs:
+            deadline = time.time() + 10.0
+            while not engine._warmup.finished and time.time() < deadline:
+                start = time.time()
+                session.pump()
+                longest_tick = max(longest_tick, time.time() - start)
+                time.sleep(0.01)
+        # (as the user would, do something that needs Shotgun a little after start-up)
+        start = time.time()
+        engine.shotgun.find_one("Shot", [["id", "is", 42]], ["code"])
+        first_query = time.time() - start
+        timings = engine.get_warmup_timings()
+    finally:
+        session.stop_engine()
+        client.close()
+    return first_query, timings, longest_tick
+
+def main():
+    parser = optparse.OptionParser(usage=__doc__.strip().splitlines()[-1].strip())
+    parser.add_option("--connect-ms", type="float", default=150.0, help="connection set-up time")
+    parser.add_option("--latency-ms", type="float", default=10.0, help="request round-trip time")
+    options, _ = parser.parse_args()
+
+    server = shotgun_server.StandInShotgunServer([{"type": "Shot", "id": 42, "code": "sh010"}],
+                                                 options.latency_ms / 1000.0,
+                                                 options.connect_ms / 1000.0).start()
+    try:
+        cold, _, _ = measure(server, False)
+        warm, timings, longest_tick = measure(server, True)
+        # (the warm-up's connection and the query's)
+        connections = server.connections
+    finally:
+        server.stop()
+
+    print("first Shotgun query without warm-up: %8.1fms" % (cold * 1000.0))
+    print("first Shotgun query after warm-up:   %8.1fms" % (warm * 1000.0))
+    for name, duration, error in timings:
+        print("  warm-up %-24s %8.1fms%s" % (name, duration * 1000.0, " (%s)" % error if error else ""))
+    print("longest timer tick during warm-up:  %8.1fms" % (longest_tick * 1000.0))
+
+    # give the worker threads a moment to exit before the interpreter shuts down:
+    for thread in threading.enumerate():
+        if thread is not threading.current_thread():
+            thread.join(1.0)
+
+    errors = [error for _, _, error in timings if error]
+    if errors or connections != 2:
+        print("FAIL: the warm-up didn't connect to the server: %s" % (errors or "%d connections" % connections))
+        return 1
+    if longest_tick >= options.connect_ms / 1000.0:
+        print("FAIL: a timer tick took %.1fms during the warm-up" % (longest_tick * 1000.0))
+        return 1
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -14,14 +14,70 @@ Implements the Softimage Engine for the Shotgun Pipeline Toolkit.
 
 import sys
 import os
+import time
 
 import sgtk
 from sgtk.platform import Engine
 
-import win32com
-from win32com.client import Dispatch, constants
-Application = Dispatch("XSI.Application").Application
-XSIUIToolkit = Dispatch("XSI.UIToolkit")
+def _engine_operation(method):
+    """
+    Decorator used to attribute all Softimage host calls made by an engine
+    method to that method and to report it as the current engine phase to
+    the hang watchdog.
+    """
+    def wrapper(self, *args, **kwargs):
+        watchdog = getattr(self, "_watchdog", None)
+        with self.host.operation(method.__name__):
+            if watchdog is None:
+                return method(self, *args, **kwargs)
+            with watchdog.phase(method.__name__):
+                return method(self, *args, **kwargs)
+    wrapper.__name__ = method.__name__
+    wrapper.__doc__ = method.__doc__
+    return wrapper
+
+# the QMessageBox static methods that get wrapped so they are shown application modal:
+_QMESSAGEBOX_METHODS = ("information", "critical", "question", "warning")
+
+# histogram buckets for the time modal dialogs are open for, in seconds:
+_MODAL_DIALOG_BUCKETS = (0.5, 1.0, 5.0, 10.0, 30.0, 60.0, 300.0, 600.0)
+
+def _override_qmessagebox_methods(QtGui):
+    """
+    Wrap the common QMessageBox static methods so that they are parented to the
+    dialog parent and run application modal by the current Softimage engine.
+
+    The wrappers outlive the engine that installed them (they are installed on the
+    QMessageBox class which persists across engine restarts) so they don't hold on
+    to an engine but look up the current one each time they are called.  Methods
+    that are already wrapped are left alone so repeated engine restarts don't
+    stack wrappers.
+    """
+    for method_name in _QMESSAGEBOX_METHODS:
+        method = getattr(QtGui.QMessageBox, method_name)
+        if getattr(method, "_tk_softimage_wrapper", False):
+            continue
+        setattr(QtGui.QMessageBox, method_name, staticmethod(_make_qmessagebox_wrapper(method)))
+
+def _make_qmessagebox_wrapper(fn):
+    """
+    Create the wrapper for a single QMessageBox static method
+    """
+    def wrapper(*args, **kwargs):
+        # (import here rather than relying on this module's globals as the
+        # module that created the wrapper may since have been released)
+        import sgtk
+        engine = sgtk.platform.current_engine()
+        if engine is None or not hasattr(engine, "_fix_dialog_parent_in_args"):
+            # not running in the Softimage engine
+            return fn(*args, **kwargs)
+        args, kwargs = engine._fix_dialog_parent_in_args(args, kwargs)
+        return engine._run_application_modal(lambda: fn(*args, **kwargs))
+    wrapper.__name__ = getattr(fn, "__name__", "wrapper")
+    wrapper.__doc__ = getattr(fn, "__doc__", None)
+    wrapper.__wrapped__ = fn
+    wrapper._tk_softimage_wrapper = True
+    return wrapper
 
 class SoftimageEngine(Engine):
 
@@ -48,17 +104,221 @@ class SoftimageEngine(Engine):
         """
         return self._host_info
 
+    @property
+    def host(self):
+        """
+        The HostAdapter used for all communication with Softimage.  This can be set
+        before the engine is initialized to use a different host, e.g. a stand-in.
+        """
+        if getattr(self, "_host", None) is None:
+            tk_softimage = self.import_module("tk_softimage")
+            self._host = tk_softimage.get_host()
+        return self._host
+
+    @host.setter
+    def host(self, host):
+        self._host = host
+
+    def import_module(self, module_name):
+        """
+        Import a module from the engine's python folder, or from the local mirror
+        of it if bundle_mirror_enabled is set
+        """
+        if not self._get_bundle_mirror():
+            return super(SoftimageEngine, self).import_module(module_name)
+
+        if module_name not in self._mirrored_modules:
+            import imp
+            python_folder = self._bundle_mirror.get_path("python")
+            fh, path, description = imp.find_module(module_name, [python_folder])
+            try:
+                uid = "tk_softimage_mirror_%s_%d" % (module_name, id(self))
+                self._mirrored_modules[module_name] = imp.load_module(uid, fh, path, description)
+            finally:
+                if fh:
+                    fh.close()
+        return self._mirrored_modules[module_name]
+
+    def get_bundle_mirror_stats(self):
+        """
+        :returns: Dictionary describing the sync of the local bundle mirror, or None if
+                  the mirror isn't being used
+        """
+        if not self._get_bundle_mirror():
+            return None
+        return self._bundle_mirror.get_stats()
+
+    def _get_bundle_mirror(self):
+        """
+        Sync the local mirror of the engine's code the first time it's needed.  This
+        happens before anything is imported from the python folder.
+
+        :returns: The BundleMirror, or None if the mirror is disabled or failed
+        """
+        if getattr(self, "_bundle_mirror", False) is False:
+            self._bundle_mirror = None
+            self._mirrored_modules = {}
+            # (read directly as the bootstrap cache is loaded from the mirror)
+            if super(SoftimageEngine, self).get_setting("bundle_mirror_enabled", False):
+                try:
+                    self._bundle_mirror = self._sync_bundle_mirror()
+                except Exception, e:
+                    self.logger.warning("Failed to mirror the engine to local disk, loading it "
+                                        "from %s instead: %s" % (self.disk_location, e))
+        return self._bundle_mirror
+
+    def _sync_bundle_mirror(self):
+        # (the mirror module is loaded on its own as the tk_softimage
+        # package should be imported from the mirror)
+        import imp
+        bundle_mirror = imp.load_source("tk_softimage_bundle_mirror",
+                                        os.path.join(self.disk_location, "python", "tk_softimage",
+                                                     "bundle_mirror.py"))
+        mirror_root = (super(SoftimageEngine, self).get_setting("bundle_mirror_root")
+                       or os.path.join(self._get_cache_root(), "bundle_mirror"))
+        mirror = bundle_mirror.BundleMirror(self.disk_location, mirror_root)
+        mirror.sync()
+        self.logger.debug("Loading engine code from local mirror %s: %s" % (mirror.path, mirror.get_stats()))
+        return mirror
+
+    def _save_bootstrap_cache(self):
+        if getattr(self, "_bootstrap_cache", None):
+            try:
+                self._bootstrap_cache.save()
+            except Exception, e:
+                self.logger.debug("Failed to save the bootstrap cache: %s" % e)
+
+    def _get_code_root(self):
+        """
+        :returns: The folder to load the engine's modules and plug-ins from
+        """
+        mirror = self._get_bundle_mirror()
+        return mirror.path if mirror else self.disk_location
+
+    ##########################################################################################
+    # settings
+
+    def get_setting(self, key, default=None):
+        """
+        Get a value from the engine's settings, from the bootstrap cache if the
+        setting has been resolved before for the same pipeline configuration
+        """
+        cache = getattr(self, "_bootstrap_cache", None)
+        if cache is None:
+            return super(SoftimageEngine, self).get_setting(key, default)
+        return cache.get_setting(key, default, super(SoftimageEngine, self).get_setting)
+
+    def get_bootstrap_cache_stats(self):
+        """
+        :returns: Dictionary with the number of settings served from the bootstrap cache
+                  and resolved, or None if the cache is disabled
+        """
+        cache = getattr(self, "_bootstrap_cache", None)
+        return cache.get_stats() if cache else None
+
+    def _load_bootstrap_cache(self, tk_softimage):
+        """
+        Load the bootstrap cache for this engine instance and environment
+
+        :returns: The BootstrapCache or None if it is disabled or failed to load
+        """
+        if not super(SoftimageEngine, self).get_setting("bootstrap_cache_enabled", False):
+            return None
+        try:
+            import hashlib
+            start = time.time()
+            key, num_files = self._get_configuration_hash()
+            hash_time = time.time() - start
+            # (one file per environment so that they don't replace each other's settings)
+            scope = hashlib.sha1(repr([self.environment.get("name"), self.instance_name])).hexdigest()[:12]
+            cache = tk_softimage.BootstrapCache(os.path.join(self._get_cache_root(),
+                                                             "bootstrap_cache_%s.json" % scope), key)
+        except Exception, e:
+            self.logger.warning("Failed to load the bootstrap cache: %s" % e)
+            return None
+        self.logger.debug("Bootstrap cache for %d configuration files (hashed in %.1fms): %s"
+                          % (num_files, hash_time * 1000.0, cache.get_stats()))
+        return cache
+
+    def _get_configuration_hash(self, wait=True):
+        """
+        Hash the files the engine's configuration is read from - the environment
+        folder, including any included files kept in it, and the core
+        configuration (templates, roots, etc.) - for invalidating the caches
+        that depend on the configuration.  The hash is only computed once per
+        engine, in the background if _start_configuration_hash has been called.
+
+        :param wait: Wait for the hash if it is being computed in the background
+        :returns: (hex digest, number of files hashed), or None if wait is False and
+                  the hash is still being computed
+        """
+        if getattr(self, "_configuration_hash", None) is None:
+            future = getattr(self, "_configuration_hash_future", None)
+            if future is None:
+                tk_softimage = self.import_module("tk_softimage")
+                self._configuration_hash = tk_softimage.hash_configuration(*self._get_configuration_files())
+            elif wait or future.done():
+                self._configuration_hash = future.result()
+            else:
+                return None
+        return self._configuration_hash
+
+    def _start_configuration_hash(self):
+        """
+        Start computing the configuration hash in the background so that walking
+        the configuration folders doesn't hold up the main thread
+        """
+        if getattr(self, "_configuration_hash", None) is None:
+            tk_softimage = self.import_module("tk_softimage")
+            self._configuration_hash_future = self._worker_pool.submit(tk_softimage.hash_configuration,
+                                                                       *self._get_configuration_files())
+
+    def _get_configuration_files(self):
+        """
+        :returns: (the files and folders to hash, extra data to hash) for hash_configuration
+        """
+        config_path = self._get_config_path()
+        env_path = self.environment.get("disk_location")
+        paths = [os.path.dirname(env_path) if env_path else None,
+                 os.path.join(config_path, "config", "core") if config_path else None,
+                 os.path.join(self.disk_location, "info.yml")]
+        return paths, [self.instance_name, self.environment.get("name")]
+
+    def get_host_call_counts(self, operation=None):
+        """
+        :param operation: If specified, only return the calls made by this engine
+                          operation, e.g. 'init_engine' or 'populate_shotgun_menu'
+        :returns: Dictionary of Softimage host call name to the number of times it was made
+        """
+        return self.host.get_call_counts(operation)
+
     ##########################################################################################
     # init and destroy
 
+    @_engine_operation
     def init_engine(self):
         """
         Called when the engine is being initialized
         """
         
+        tk_softimage = self.import_module("tk_softimage")
+
+        # settings requested from here on are served from the bootstrap cache:
+        self._bootstrap_cache = self._load_bootstrap_cache(tk_softimage)
+
+        self._log_limiter = None
+        if self.get_setting("log_rate_limit", 5) > 0:
+            self._log_limiter = tk_softimage.LogLimiter(self.get_setting("log_rate_limit", 5),
+                                                        self.get_setting("log_rate_period", 60.0))
+        self._watchdog = tk_softimage.HangWatchdog(self.logger, self.get_setting("watchdog_threshold", 5.0))
+
+        # counters and timings, exported by _start_metrics_export:
+        self._statsd_address = self._get_statsd_address()
+        self._metrics = tk_softimage.MetricsRegistry(keep_samples=100 if self._statsd_address else 0)
+
         # determine if this is a tested version:
         is_certified_version = False
-        version_str = Application.version()
+        version_str = self.host.version
 
         try:
             # Attempt getting the year version from product name version info block
@@ -67,7 +327,7 @@ class SoftimageEngine(Engine):
                 import re
 
                 # Parses the Windows FileInfo block to extract the ProductName field.
-                application_full_path = Application.FullName
+                application_full_path = self.host.full_name
 
                 # Need to query the version info block based on file's locale
                 language, codepage = win32api.GetFileVersionInfo(application_full_path, "\\VarFileInfo\\Translation")[0]
@@ -99,12 +359,12 @@ class SoftimageEngine(Engine):
                         self.logger.debug("Extracted release version '%s' based 'version_major' (%d) version." % (metric_logged_version, version_major))
                 except:
                     # Worst case fallback, just use whatever was returned by the Soft Image API
-                    self.logger.debug("Extracted release version '%s' from %s's own API." % (version_str, Application.Name))
+                    self.logger.debug("Extracted release version '%s' from %s's own API." % (version_str, self.host.name))
                     metric_logged_version = version_str
 
             # Create a _host_info variable that we can update so later usage of
             # the `host_info` property can benefit having the updated information.
-            self._host_info = {"name": Application.Name, "version": metric_logged_version}
+            self._host_info = {"name": self.host.name, "version": metric_logged_version}
 
             # Actually log the metric
             self.log_metric("Launched Software")
@@ -143,11 +403,34 @@ class SoftimageEngine(Engine):
             
             if self.has_ui and "SGTK_SOFTIMAGE_VERSION_WARNING_SHOWN" not in os.environ:
                 # have to call RedrawUI() otherwise Softimage will crash!
-                Application.Desktop.RedrawUI()
-                XSIUIToolkit.MsgBox("Warning - Shotgun Pipeline Toolkit!\n\n%s" % msg)
+                self.host.redraw_ui()
+                self.host.msg_box("Warning - Shotgun Pipeline Toolkit!\n\n%s" % msg)
                 os.environ["SGTK_SOFTIMAGE_VERSION_WARNING_SHOWN"] = "1"
-                
-            self.log_warning(msg)
+
+            # only log the full warning for the first engine started in this session:
+            if "SGTK_SOFTIMAGE_VERSION_WARNING_LOGGED" not in os.environ:
+                self.log_warning(msg)
+                os.environ["SGTK_SOFTIMAGE_VERSION_WARNING_LOGGED"] = "1"
+            else:
+                self.log_debug("Softimage %s has not yet been fully tested with the Toolkit" % version_str)
+
+        self._worker_pool = tk_softimage.WorkerPool(self.logger, self.get_setting("worker_pool_size", 2))
+
+        # path and context lookups are shared with other Softimage sessions:
+        self._lookup_cache = None
+        self._lookup_scope = None
+        lookup_cache_ttl = self.get_setting("lookup_cache_ttl", 3600)
+        if lookup_cache_ttl > 0:
+            # (folders created for an entity aren't seen until its paths expire)
+            namespace_ttls = {"paths_from_entity": min(lookup_cache_ttl,
+                                                       self.get_setting("lookup_cache_paths_ttl", 60))}
+            self._lookup_cache = tk_softimage.LookupCache(os.path.join(self._get_cache_root(), "lookup_cache.db"),
+                                                          lookup_cache_ttl,
+                                                          self.get_setting("lookup_cache_size", 10000),
+                                                          namespace_ttls)
+
+        if self._lookup_cache is not None or (self.has_ui and self.get_setting("menu_snapshot_cache", True)):
+            self._start_configuration_hash()
 
         # Set the Softimage project based on config
         self._set_project()
@@ -155,34 +438,115 @@ class SoftimageEngine(Engine):
         # menu:
         self._menu = None
         tk_softimage = self.import_module("tk_softimage")
-        self._menu_generator = tk_softimage.MenuGenerator(self)
-        self._shotgun_plugin_path = os.path.join(self.disk_location, "plugins", "shotgun", "Application", "Plugins")
-        
+        self._event_loop_monitor = tk_softimage.EventLoopMonitor(metrics=self._metrics)
+        self._command_profiler = tk_softimage.CommandProfiler(self.get_setting("profile_history_size", 50),
+                                                              self.get_setting("profile_commands", False))
+        self._command_dispatcher = tk_softimage.CommandDispatcher(self.logger, self._command_profiler,
+                                                                  self._watchdog)
+        self._menu_generator = tk_softimage.MenuGenerator(self, self._create_menu_cache())
+        self._key_bridge = tk_softimage.KeyEventBridge(self._send_key_event,
+                                                       self.get_setting("coalesce_key_repeats", False))
+        self._shotgun_plugin_path = os.path.join(self._get_code_root(), "plugins", "shotgun", "Application", "Plugins")
+
+        self._warmup = None
+        self._app_host_server = None
+        self._app_host_processes = []
+        self._shotgun_batcher = tk_softimage.ShotgunBatcher(self._get_shotgun_connection, self.submit_task,
+                                                            self.get_setting("shotgun_batch_window", 0.02),
+                                                            self.run_in_main_thread)
+
+        # look-and-feel, stylesheets and icons shared by all dialogs:
+        self._style_cache = tk_softimage.StyleCache(self.get_setting("minify_stylesheets", False))
+
+        self._metrics_exporter = self._start_metrics_export()
+
+        # (dialog, finished callback) for the dialogs shown with show_modal_async
+        # that are still open, by future id:
+        self._async_modal_futures = {}
+
+        # functions to call when a dialog is next closed, by dialog id (see _on_dialog_finished):
+        self._dialog_finished_callbacks = {}
+
+        # closed dialogs kept for reuse by show_dialog and show_modal:
+        self._dialog_pool = None
+        if self.get_setting("dialog_pool_size", 0) > 0:
+            self._dialog_pool = tk_softimage.DialogPool(self.logger, self.get_setting("dialog_pool_size"),
+                                                        self.get_setting("dialog_pool_max_age", 600.0))
+
+        # resolve the context menu label, url and paths off the main thread
+        # so that the first menu open doesn't have to:
+        if self.has_ui:
+            self._menu_generator.warm_context_snapshot()
+
         
+    @_engine_operation
     def destroy_engine(self):
         """
         Called when engine is destroyed
         """
         self.log_debug("%s: Destroying..." % self)
 
+        # drop any commands that haven't been run yet and cancel
+        # any outstanding background tasks:
+        self._command_dispatcher.clear()
+        # close the dialogs still open from show_modal_async.  Their callbacks are
+        # run now as the main-thread queue won't be processed again:
+        if self._async_modal_futures:
+            from sgtk.platform.qt import QtGui
+            for dialog, on_finished in self._async_modal_futures.values():
+                on_finished(QtGui.QDialog.Rejected, run_callbacks=True)
+                dialog.close()
+        self._async_modal_futures = {}
+        self._key_bridge.clear()
+        self._shotgun_batcher.close()
+        self._worker_pool.shutdown()
+        self._watchdog.stop()
+
+        if self._metrics_exporter:
+            self._metrics_exporter.export(wait=True)
+            self._metrics_exporter.close()
+
+        # report how well the Qt event loop was serviced this session:
+        if self._event_loop_monitor.get_summary()["ticks"]:
+            self.log_info("Qt event loop: %s" % self._event_loop_monitor.format_summary())
+        self._event_loop_monitor.close()
+
+        if self._app_host_server:
+            # (out-of-process apps keep running but can no longer talk to Softimage)
+            self._app_host_server.stop()
+
+        if self._bundle_mirror:
+            self.log_debug("Bundle mirror: %s" % self._bundle_mirror.get_stats())
+
+        self._save_bootstrap_cache()
+        self._log_suppressed_summary()
+
+        if self._lookup_cache:
+            self.log_debug("Lookup cache: %s" % self._lookup_cache.get_stats())
+            self._lookup_cache.close()
+
         # clean up UI:
         if self.has_ui:
+            if self._dialog_pool:
+                self.log_debug("Dialog pool: %s" % self._dialog_pool.get_stats())
+                self._dialog_pool.clear()
+
             if self._menu:
                 # close any torn-off menus:
-                self._menu.close_torn_off_menus()
+                self._menu.close_torn_off_menus(self.host)
         
             # Unload the menu plugin
-            Application.UnloadPlugin(os.path.join(self._shotgun_plugin_path, "menu.py"))
+            self.host.unload_plugin(os.path.join(self._shotgun_plugin_path, "menu.py"))
 
             # unload the qtevents plugin
-            Application.UnloadPlugin(os.path.join(self._shotgun_plugin_path, "qt_events.py"))
+            self.host.unload_plugin(os.path.join(self._shotgun_plugin_path, "qt_events.py"))
 
     @property
     def has_ui(self):
         """
         Detect and return if Softimage is running in batch mode
         """
-        return Application.Interactive
+        return self.host.interactive
 
     def pre_app_init(self):
         """
@@ -196,6 +560,7 @@ class SoftimageEngine(Engine):
         QtCore.QTextCodec.setCodecForCStrings(utf8)
         self.log_debug("set utf-8 codec for widget text")
 
+    @_engine_operation
     def post_app_init(self):
         """
         Called when all apps have initialized
@@ -206,42 +571,572 @@ class SoftimageEngine(Engine):
             self._initialise_qapplication()
                         
             # Re-load plug-ins
-            Application.UnloadPlugin(os.path.join(self._shotgun_plugin_path, "menu.py"))
-            Application.UnloadPlugin(os.path.join(self._shotgun_plugin_path, "qt_events.py"))
+            self.host.unload_plugin(os.path.join(self._shotgun_plugin_path, "menu.py"))
+            self.host.unload_plugin(os.path.join(self._shotgun_plugin_path, "qt_events.py"))
             
-            Application.LoadPlugin(os.path.join(self._shotgun_plugin_path, "menu.py"))
-            Application.LoadPlugin(os.path.join(self._shotgun_plugin_path, "qt_events.py"))
+            self.host.load_plugin(os.path.join(self._shotgun_plugin_path, "menu.py"))
+            self.host.load_plugin(os.path.join(self._shotgun_plugin_path, "qt_events.py"))
+
+            # the heartbeats come from the Qt events plug-in so the main thread can
+            # only be watched for hangs once it has been loaded:
+            if self.get_setting("watchdog_enabled", False):
+                self._watchdog.start()
+
+            # get slow one-off work out of the way once the UI is up:
+            if self.get_setting("warmup_enabled", False):
+                self._start_warmup()
+
+        # settings resolved at startup won't need to be resolved next time:
+        self._save_bootstrap_cache()
 
+    @_engine_operation
     def populate_shotgun_menu(self, menu):
         """
         Use the menu generator to populate the Shotgun menu
         """
         self._menu = menu
-        self._menu_generator.create_menu(self._menu)
+        self._metrics.counter("menu_opens", "Times the Shotgun menu was built.").inc()
+        with self._metrics.histogram("menu_build_seconds", "Time taken to build the Shotgun menu.").time():
+            self._menu_generator.create_menu(self._menu)
+
+        stats = getattr(menu, "stats", None)
+        if stats:
+            self._menu_stats = stats
+            if stats.dynamic_sub_menus:
+                self.log_debug("Built Shotgun menu with %d Softimage calls; %d items and %d enable callbacks "
+                               "deferred to %d app sub-menus" % (stats.com_calls, stats.deferred_items,
+                                                                  stats.deferred_enable_callbacks,
+                                                                  stats.dynamic_sub_menus))
+
+    def cached_lookup(self, namespace, key, compute):
+        """
+        Look up a value in the cache shared by all Softimage sessions on this machine,
+        computing and caching it if it isn't there.  Safe to call from any thread.
+
+        The key is scoped to the pipeline configuration, the Shotgun site and the
+        configuration files (templates, roots, etc.).  The cache isn't used until the
+        configuration hash has been computed in the background.  Empty values and
+        errors aren't cached so that they are looked up again next time.
+
+        :param namespace: The type of lookup, e.g. 'paths_from_entity'
+        :param key: json-serializable key identifying the lookup
+        :param compute: Function that computes the value.  The value must be
+                        json-serializable.
+        :returns: The value
+        """
+        if self._lookup_cache is None:
+            return compute()
+        scope = self._get_lookup_scope()
+        if scope is None:
+            return compute()
+        return self._lookup_cache.get_or_compute(namespace, scope + [key], compute)
+
+    def _get_lookup_scope(self):
+        """
+        The same entity or template can resolve differently for another pipeline
+        configuration or site, or once the configuration is edited, so lookups are
+        scoped to these.
+
+        :returns: List of the values the lookups are scoped to, or None if the
+                  configuration hash isn't ready yet
+        """
+        if self._lookup_scope is None:
+            try:
+                configuration_hash = self._get_configuration_hash(wait=False)
+            except Exception, e:
+                self.logger.debug("Not caching lookups, the configuration couldn't be hashed: %s" % e)
+                configuration_hash = None
+            if configuration_hash is None:
+                return None
+            self._lookup_scope = [self._get_config_path(), self._get_site(), configuration_hash[0]]
+        return self._lookup_scope
+
+    def get_lookup_cache_stats(self):
+        """
+        :returns: Dictionary with the hits, memory_hits, misses, evictions, errors and
+                  hit_rate of the shared lookup cache, or None if it is disabled
+        """
+        if self._lookup_cache is None:
+            return None
+        return self._lookup_cache.get_stats()
+
+    def get_menu_stats(self):
+        """
+        Get the number of Softimage calls made to build the Shotgun menu the last time
+        it was opened, including any app sub-menus expanded since, and the work deferred
+        until app sub-menus are expanded.
+
+        :returns: Dictionary with the com_calls, callbacks_registered, dynamic_sub_menus,
+                  expanded_sub_menus, deferred_items and deferred_enable_callbacks counts,
+                  or None if the menu hasn't been built yet
+        """
+        stats = getattr(self, "_menu_stats", None)
+        return stats.as_dict() if stats else None
+
+    ##########################################################################################
+    # background tasks
+
+    def submit_task(self, fn, *args, **kwargs):
+        """
+        Run a function in a background thread from the engine's worker pool.
+
+        The function must not talk to Softimage or Qt.  Use add_done_callback on
+        the returned future to get the result - callbacks are always run on the
+        Softimage main thread.
+
+        :param fn: The function to run
+        :returns: TaskFuture for the result of the function
+        """
+        return self._worker_pool.submit(fn, *args, **kwargs)
+
+    def run_in_main_thread(self, fn, *args, **kwargs):
+        """
+        Queue a function to be run on the Softimage main thread.  This can
+        be called from any thread.
+
+        :param fn: The function to run
+        """
+        self._worker_pool.run_in_main_thread(fn, *args, **kwargs)
+
+    def get_task_stats(self):
+        """
+        :returns: Dictionary of queue depths and task latency metrics for the
+                  engine's worker pool
+        """
+        return self._worker_pool.get_stats()
+
+    def on_qt_event_loop_timer(self):
+        """
+        Called by the Shotgun Qt event loop plug-in each time it has processed
+        Qt events, to run any work that is waiting for the main thread.
+        """
+        self._watchdog.heartbeat()
+        self._command_dispatcher.process()
+        self._worker_pool.process_main_thread_queue()
+        self._key_bridge.flush()
+        if self._metrics_exporter:
+            self._metrics_exporter.maybe_export()
+
+    @property
+    def key_bridge(self):
+        """
+        The KeyEventBridge the Qt events plug-in sends Softimage key events to
+        """
+        return self._key_bridge
+
+    def get_key_event_stats(self):
+        """
+        :returns: Dictionary with the number of key presses and auto-repeats forwarded
+                  from Softimage, the number of auto-repeats coalesced and the number of
+                  key events sent to Qt
+        """
+        return self._key_bridge.get_stats()
+
+    def _send_key_event(self, pressed, key, modifiers, text, auto_repeat, count):
+        """
+        Send a key event to the focused Qt widget
+        """
+        from sgtk.platform.qt import QtGui
+        focus_widget = QtGui.QApplication.instance().focusWidget()
+        if not focus_widget:
+            return
+        event_type = QtGui.QKeyEvent.KeyPress if pressed else QtGui.QKeyEvent.KeyRelease
+        QtGui.QApplication.sendEvent(focus_widget, QtGui.QKeyEvent(event_type, key, modifiers, text,
+                                                                   auto_repeat, count))
+
+    @property
+    def event_loop_monitor(self):
+        """
+        The EventLoopMonitor fed by the Shotgun Qt event loop plug-in
+        """
+        return self._event_loop_monitor
+
+    def get_event_loop_stats(self):
+        """
+        :returns: Dictionary summarising the Qt event loop timer jitter, the time spent
+                  processing Qt events and the latency of posted Qt events for this session
+        """
+        return self._event_loop_monitor.get_summary()
+
+    ##########################################################################################
+    # metrics
+
+    @property
+    def metrics_registry(self):
+        """
+        The MetricsRegistry the engine records its counters and timings in.  Metrics
+        must only be updated from the main thread.
+        """
+        return self._metrics
+
+    def get_metrics(self):
+        """
+        :returns: Dictionary of metric name to the current counter or gauge value or,
+                  for histograms, a dictionary with the count and sum
+        """
+        return self._metrics.get_values()
+
+    def get_metrics_export_stats(self):
+        """
+        :returns: Dictionary with the number of metrics exports, export errors and statsd
+                  packets sent, or None if metrics aren't being exported
+        """
+        if not self._metrics_exporter:
+            return None
+        return self._metrics_exporter.get_stats()
+
+    def _get_statsd_address(self):
+        """
+        :returns: (host, port) from the metrics_statsd_address setting, or None
+        """
+        address = self.get_setting("metrics_statsd_address", "")
+        if not address:
+            return None
+        host, _, port = address.rpartition(":")
+        try:
+            return (host or "localhost", int(port))
+        except ValueError:
+            self.log_warning("Ignoring invalid metrics_statsd_address '%s', expected 'host:port'" % address)
+            return None
+
+    def _start_metrics_export(self):
+        """
+        Expose the stats kept by the engine's helpers as metrics and, if the metrics
+        are to be exported, create the exporter
+
+        :returns: The MetricsExporter or None
+        """
+        dispatcher = self._command_dispatcher
+        key_bridge = self._key_bridge
+        worker_pool = self._worker_pool
+        host = self.host
+        self._metrics.add_collected("commands_dispatched", "counter",
+                                    lambda: dispatcher.get_stats()["dispatched"],
+                                    "Menu commands run by the command dispatcher.")
+        self._metrics.add_collected("key_events_forwarded", "counter", lambda: key_bridge.get_stats()["sent"],
+                                    "Key events forwarded from Softimage to Qt.")
+        self._metrics.add_collected("com_calls", "counter", lambda: sum(host.get_call_counts().values()),
+                                    "Calls made to Softimage through the host adapter.")
+        self._metrics.add_collected("main_thread_queue_depth", "gauge",
+                                    lambda: worker_pool.get_stats()["main_thread_queue_depth"],
+                                    "Calls waiting to be run on the main thread.")
+        self._metrics.add_collected("task_queue_depth", "gauge", lambda: worker_pool.get_stats()["queue_depth"],
+                                    "Background tasks waiting for a worker thread.")
+
+        path = os.path.expandvars(os.path.expanduser(self.get_setting("metrics_file", "")))
+        if not path and not self._statsd_address:
+            return None
+        tk_softimage = self.import_module("tk_softimage")
+        return tk_softimage.MetricsExporter(self._metrics, path or None, self._statsd_address,
+                                            self.get_setting("metrics_export_interval", 10.0), self.submit_task)
+
+    ##########################################################################################
+    # hang watchdog
+
+    def heartbeat(self):
+        """
+        Tell the hang watchdog that the Softimage main thread is responsive.  This
+        is called by the Shotgun plug-ins whenever Softimage calls into them.
+        """
+        self._watchdog.heartbeat()
+
+    def get_stall_history(self):
+        """
+        :returns: List of (started, duration, phase) tuples for the most recent
+                  times the main thread stopped responding, oldest first
+        """
+        return self._watchdog.get_stalls()
+
+    ##########################################################################################
+    # batched Shotgun queries
+
+    def shotgun_batch(self):
+        """
+        Context manager that collects the find queries made with find_batched within
+        it and sends them to Shotgun together when it exits, e.g.
+
+            with engine.shotgun_batch():
+                shot = engine.find_batched("Shot", [["id", "is", shot_id]], ["code"])
+                task = engine.find_batched("Task", [["id", "is", task_id]], ["content"])
+            print shot.result(), task.result()
+        """
+        return self._shotgun_batcher.batch()
+
+    def find_batched(self, entity_type, filters, fields=None, order=None, filter_operator=None, limit=0):
+        """
+        Queue a Shotgun find query to be sent together with other queries.  Identical
+        queries are only sent once.  Outside of a shotgun_batch() scope, queries are
+        collected for the shotgun_batch_window and then sent from a worker thread.
+        The arguments are the same as for Shotgun.find.
+
+        :returns: BatchedQuery - call result() to wait for the list of entities found
+                  or add_done_callback() to be called on the main thread once it is
+                  available
+        """
+        return self._shotgun_batcher.find(entity_type, filters, fields, order, filter_operator, limit)
+
+    def get_shotgun_batch_stats(self):
+        """
+        :returns: Dictionary with the number of queries made with find_batched, the number
+                  deduplicated and sent, and the number of round-trips made to Shotgun
+        """
+        return self._shotgun_batcher.get_stats()
+
+    def _get_shotgun_connection(self):
+        return self.shotgun
+
+    ##########################################################################################
+    # out-of-process apps
+
+    def is_out_of_process_app(self, app_instance_name):
+        """
+        :returns: True if the app's commands should be run in a child process
+        """
+        return (app_instance_name in (self.get_setting("out_of_process_apps") or [])
+                and bool(self.get_setting("app_host_python")))
+
+    @property
+    def app_host_server(self):
+        """
+        The HostRpcServer that out-of-process apps connect to, started the first time
+        it is needed
+        """
+        if self._app_host_server is None:
+            tk_softimage = self.import_module("tk_softimage")
+            self._app_host_server = tk_softimage.HostRpcServer(self, self.logger)
+            self._app_host_server.start()
+        return self._app_host_server
+
+    def run_command_out_of_process(self, app_instance_name, command_name):
+        """
+        Run an app command in a child Python process with its own Qt event loop.  The
+        child starts the app_host_engine for the current pipeline configuration and
+        context and talks back to Softimage through the app host server.
+
+        :returns: The AppHostProcess
+        """
+        tk_softimage = self.import_module("tk_softimage")
+        launch_info = {
+            "config_path": self.sgtk.pipeline_configuration.get_path(),
+            "context": self.context.serialize(),
+            "engine": self.get_setting("app_host_engine", "tk-shell"),
+            "app_instance": app_instance_name,
+            "command": command_name,
+        }
+        self.log_debug("Running '%s' from %s out of process" % (command_name, app_instance_name))
+        process = tk_softimage.AppHostProcess(self.app_host_server, self.get_setting("app_host_python"),
+                                              launch_info)
+        self._app_host_processes = [p for p in self._app_host_processes if p.is_running()] + [process]
+        return process
+
+    def get_app_host_stats(self):
+        """
+        :returns: Dictionary with the number of out-of-process apps running and the number
+                  and mean/max latency of the host calls they have made, or None if no
+                  app has been run out of process
+        """
+        if self._app_host_server is None:
+            return None
+        stats = self._app_host_server.get_stats()
+        stats["running"] = len([p for p in self._app_host_processes if p.is_running()])
+        return stats
+
+    ##########################################################################################
+    # warm-up
+
+    def _start_warmup(self):
+        """
+        Import heavy modules on the main thread, a step at a time once the engine
+        has started, and look up and connect to the Shotgun site in the background
+        so that the first action that needs them is quick.  (The context used by
+        the menu is already resolved in the background by warm_context_snapshot.)
+        """
+        tk_softimage = self.import_module("tk_softimage")
+        self._warmup = tk_softimage.WarmUp(self.logger)
+        for module_name in self.get_setting("warmup_modules", []):
+            self._warmup.add_import_step(module_name)
+        site = self._get_site()
+        if site:
+            self._warmup.add_connect_step(site)
+        self._warmup.start(self.run_in_main_thread, self.submit_task)
+
+    def get_warmup_timings(self):
+        """
+        :returns: List of (step name, duration in seconds, error message or None) for
+                  the warm-up steps that have run, or None if the warm-up hasn't started
+        """
+        if self._warmup is None:
+            return None
+        return self._warmup.get_timings()
+
+    ##########################################################################################
+    # command dispatch and profiling
+
+    @property
+    def command_dispatcher(self):
+        """
+        The queue used to run app commands requested from the Shotgun menu
+        """
+        return self._command_dispatcher
+
+    def get_command_dispatch_stats(self):
+        """
+        :returns: Dictionary with the number of commands dispatched and coalesced
+                  and the mean and max queue-to-start latency in seconds
+        """
+        return self._command_dispatcher.get_stats()
+
+    @property
+    def command_profiler(self):
+        """
+        The profiler used to time app commands run from the Shotgun menu
+        """
+        return self._command_profiler
+
+    def get_command_profile_report(self, sort_by="total_wall"):
+        """
+        Summarise the profiled history of all app commands run from the Shotgun menu
+
+        :param sort_by: The report column to sort by, largest first
+        :returns: List of dictionaries, one per app command
+        """
+        return self._command_profiler.get_report(sort_by)
+
+    def dump_command_profile(self, path=None, format=None, sort_by="total_wall"):
+        """
+        Write the app command profile report to disk in csv or json format.
+
+        :param path: The file to write.  If not specified, a json file is written to
+                     the temp directory.
+        :param format: 'csv' or 'json'.  If not specified, this is determined from
+                       the file extension.
+        :param sort_by: The report column to sort by, largest first
+        :returns: The path to the written report
+        """
+        if not path:
+            import tempfile
+            path = os.path.join(tempfile.gettempdir(), "tk-softimage_command_profile_%d.json" % os.getpid())
+        self._command_profiler.write_report(path, format, sort_by)
+        self.log_info("Wrote command profile report to '%s'" % path)
+        return path
 
     ##########################################################################################
     # logging
 
     def log_debug(self, msg):
         if self.get_setting("debug_logging", False):
-            Application.LogMessage("Shotgun: %s" % msg, constants.siInfo)
+            self.host.log_message("Shotgun: %s" % msg, "info")
 
     def log_info(self, msg):
-        Application.LogMessage("Shotgun: %s" % msg, constants.siInfo)
+        self.host.log_message("Shotgun: %s" % msg, "info")
 
     def log_warning(self, msg):
-        Application.LogMessage("Shotgun: %s" % msg, constants.siWarning)
+        self._log_limited("warning", msg)
+
+    def log_error(self, msg, exc_info=None):
+        """
+        :param exc_info: sys.exc_info() of an exception whose traceback should be
+                         logged with the message.  This isn't taken from sys.exc_info()
+                         here as, in Python 2, that still returns the last exception
+                         handled once its except block has finished.
+        """
+        self._log_limited("error", msg, exc_info)
 
-    def log_error(self, msg):
-        import traceback
-        tb = traceback.print_exc()
-        if tb:
-            msg = tb+"\n"+msg
-        Application.LogMessage("Shotgun: %s" % msg, constants.siError)
+    def _log_limited(self, severity, msg, exc_info=None):
+        """
+        Log a message unless too many similar messages have been logged recently.
+        The traceback is only formatted if the message is logged.
+        """
+        limiter = getattr(self, "_log_limiter", None)
+        suffix = ""
+        if limiter:
+            suffix = limiter.check(severity, msg)
+            if suffix is None:
+                return
+        if exc_info and exc_info[0] is not None:
+            import traceback
+            msg = "%s\n%s" % ("".join(traceback.format_exception(*exc_info)).rstrip(), msg)
+        self.host.log_message("Shotgun: %s%s" % (msg, suffix), severity)
+
+    def get_log_stats(self):
+        """
+        :returns: Dictionary with the number of warnings and errors logged and suppressed,
+                  or None if rate limiting is disabled
+        """
+        return self._log_limiter.get_stats() if self._log_limiter else None
+
+    def _log_suppressed_summary(self):
+        """
+        Log how many messages were suppressed since they were last logged
+        """
+        if not self._log_limiter:
+            return
+        for severity, msg, count in self._log_limiter.pop_suppressed():
+            self.host.log_message("Shotgun: %d similar messages suppressed, the last was: %s" % (count, msg),
+                                  severity)
 
     ##########################################################################################
     # scene and project management
 
+    def _create_menu_cache(self):
+        """
+        Create the cache used to render the Shotgun menu from the layout computed by a
+        previous session.  The cache is specific to the pipeline configuration,
+        environment and context.
+
+        :returns: MenuCache or None if the cache is disabled
+        """
+        if not self.has_ui or not self.get_setting("menu_snapshot_cache", True):
+            return None
+
+        key_parts = [self._get_config_path(), self.environment.get("name")] + self._get_context_key()
+        tk_softimage = self.import_module("tk_softimage")
+        return tk_softimage.MenuCache(self._get_cache_root(), repr(key_parts), self._get_configuration_hash)
+
+    def _get_cache_root(self):
+        """
+        The folder to store the engine's caches in
+        """
+        cache_root = getattr(self, "cache_location", None)
+        if not cache_root:
+            # (separate folders so that configurations and sites don't share caches)
+            import tempfile
+            import hashlib
+            scope = hashlib.sha1(repr([self._get_config_path(), self._get_site()])).hexdigest()[:12]
+            cache_root = os.path.join(tempfile.gettempdir(), "tk-softimage", scope)
+        return cache_root
+
+    def _get_config_path(self):
+        """
+        :returns: The path of the pipeline configuration, or None if it isn't known
+        """
+        try:
+            return self.sgtk.pipeline_configuration.get_path()
+        except Exception:
+            return None
+
+    def _get_site(self):
+        """
+        :returns: The url of the Shotgun site, or None if it isn't known
+        """
+        if getattr(self, "_site", None) is None:
+            try:
+                self._site = self.sgtk.shotgun_url
+            except Exception:
+                return None
+        return self._site
+
+    def _get_context_key(self):
+        """
+        :returns: List of (entity type, id) for the entities in the current context,
+                  for use in cache keys
+        """
+        key = []
+        for entity in (self.context.project, self.context.entity, self.context.step, self.context.task):
+            if entity:
+                key.append((entity.get("type"), entity.get("id")))
+        return key
+
     def _set_project(self):
         """
         Set the softimage project
@@ -250,9 +1145,15 @@ class SoftimageEngine(Engine):
         if setting is None:
             return
 
-        tmpl = self.sgtk.templates.get(setting)
-        fields = self.context.as_template_fields(tmpl)
-        proj_path = tmpl.apply_fields(fields)
+        def _resolve_project_path():
+            tmpl = self.sgtk.templates.get(setting)
+            fields = self.context.as_template_fields(tmpl)
+            return tmpl.apply_fields(fields)
+        proj_path = self.cached_lookup("template_project", [setting] + self._get_context_key(),
+                                       _resolve_project_path)
+        if isinstance(proj_path, unicode):
+            # (values read back from the lookup cache are unicode)
+            proj_path = proj_path.encode("utf-8")
         self.log_info("Setting Softimage project to '%s'" % proj_path)
 
         try:
@@ -260,20 +1161,21 @@ class SoftimageEngine(Engine):
             # Application.ActiveProject.Path returns a unicode object. If the path contains
             # non-ascii characters, the comparison will fail since the str and unicode objects
             # cannot be compared, so we convert the unicode object to a utf-8 string.
-            if (Application.ActiveProject.Path 
-                and os.path.normpath(Application.ActiveProject.Path).lower().encode("utf-8") == os.path.normpath(proj_path).lower()):
+            active_project_path = self.host.get_active_project_path()
+            if (active_project_path 
+                and os.path.normpath(active_project_path).lower().encode("utf-8") == os.path.normpath(proj_path).lower()):
                 # project is already set to this path so no need to do anything!
                 return
             
             # make sure the project exists:
-            created_proj = Application.CreateProject(proj_path)
+            created_proj = self.host.create_project(proj_path)
             if not created_proj:
                 raise
 
             # and set it:
-            Application.ActiveProject = proj_path
+            self.host.set_active_project(proj_path)
         except:
-            self.log_error("Error setting Softimage Project: %s" % proj_path)
+            self.log_error("Error setting Softimage Project: %s" % proj_path, sys.exc_info())
 
     ##########################################################################################
     # pyside / qt
@@ -325,13 +1227,136 @@ class SoftimageEngine(Engine):
         from PySide import QtGui
 
         # create the dialog:
-        dialog, widget = self._create_dialog_with_widget(title, bundle, widget_class, *args, **kwargs)
+        dialog, widget = self._get_dialog_with_widget(title, bundle, widget_class, *args, **kwargs)
         
         # show the dialog in application modal if possible:
+        self._metrics.counter("modal_dialogs_shown", "Modal dialogs shown with show_modal.").inc()
         status = QtGui.QDialog.Rejected
-        status = self._run_application_modal(dialog.exec_)
+        with self._metrics.histogram("modal_dialog_seconds", "Time modal dialogs were open for.",
+                                     _MODAL_DIALOG_BUCKETS).time():
+            status = self._run_application_modal(dialog.exec_)
+
+        if self._dialog_pool:
+            self._dialog_pool.release(dialog)
 
         return status, widget
+
+    def show_modal_async(self, title, bundle, widget_class, *args, **kwargs):
+        """
+        Shows a window modal dialog without waiting for it to be closed.  Unlike
+        show_modal, this doesn't run a nested Qt event loop or disable the Softimage
+        windows, so Softimage and the Shotgun Qt event loop keep running normally
+        while the dialog is open.  The dialog only blocks input to the other Toolkit
+        windows.
+
+        :param title: The title of the window
+        :param bundle: The app, engine or framework object that is associated with this window
+        :param widget_class: The class of the UI to be constructed. This must derive from QWidget.
+
+        Additional parameters specified will be passed through to the widget_class constructor.
+
+        :returns: TaskFuture for (a standard QT dialog status return code, the created
+                  widget_class instance) once the dialog is closed.  Use add_done_callback
+                  to be called back on the main thread.  If the engine is destroyed whilst
+                  the dialog is open, the dialog is closed and the callbacks are run with
+                  a rejected status before the engine goes away.  If this environment
+                  doesn't support UI display the future is already cancelled.
+        """
+        tk_softimage = self.import_module("tk_softimage")
+        if not self.has_ui:
+            self.log_error("Sorry, this environment does not support UI display! Cannot show "
+                           "the requested window '%s'." % title)
+            future = tk_softimage.TaskFuture(self._worker_pool)
+            future.cancel()
+            return future
+
+        from sgtk.platform.qt import QtCore
+
+        dialog, widget = self._get_dialog_with_widget(title, bundle, widget_class, *args, **kwargs)
+        future = tk_softimage.TaskFuture(self._worker_pool)
+        duration = self._metrics.histogram("modal_dialog_seconds", "Time modal dialogs were open for.",
+                                           _MODAL_DIALOG_BUCKETS)
+        shown_at = time.time()
+
+        def on_finished(status, run_callbacks=False):
+            if self._async_modal_futures.pop(id(future), None) is None:
+                return
+            duration.observe(time.time() - shown_at)
+            dialog.setWindowModality(QtCore.Qt.NonModal)
+            future.set_result((status, widget), run_callbacks)
+
+        self._metrics.counter("async_modal_dialogs_shown", "Modal dialogs shown with show_modal_async.").inc()
+        dialog.setWindowModality(QtCore.Qt.WindowModal)
+        self._async_modal_futures[id(future)] = (dialog, on_finished)
+        self._dialog_finished_callbacks[id(dialog)] = on_finished
+        dialog.show()
+        return future
+
+    def show_dialog(self, title, bundle, widget_class, *args, **kwargs):
+        """
+        Shows a non-modal dialog window in a way suitable for this engine. The engine will attempt to
+        parent the dialog nicely to the host application.
+
+        :param title: The title of the window
+        :param bundle: The app, engine or framework object that is associated with this window
+        :param widget_class: The class of the UI to be constructed. This must derive from QWidget.
+
+        Additional parameters specified will be passed through to the widget_class constructor.
+
+        :returns: the created widget_class instance
+        """
+        if not self._dialog_pool:
+            return super(SoftimageEngine, self).show_dialog(title, bundle, widget_class, *args, **kwargs)
+
+        if not self.has_ui:
+            self.log_error("Sorry, this environment does not support UI display! Cannot show "
+                           "the requested window '%s'." % title)
+            return
+
+        # (the dialog is returned to the pool by _on_dialog_finished once it is closed)
+        dialog, widget = self._get_dialog_with_widget(title, bundle, widget_class, *args, **kwargs)
+        dialog.show()
+        return widget
+
+    def _get_dialog_with_widget(self, title, bundle, widget_class, *args, **kwargs):
+        """
+        Create a dialog containing the widget, or reuse a closed one from the
+        dialog pool if pooling is enabled.
+
+        :returns: (the dialog, the widget_class instance)
+        """
+        def create():
+            dialog, widget = self._create_dialog_with_widget(title, bundle, widget_class, *args, **kwargs)
+            # connected once here rather than each time the dialog is shown as pooled
+            # dialogs are shown many times:
+            dialog.finished.connect(lambda status: self._on_dialog_finished(dialog, status))
+            return dialog, widget
+
+        if not self._dialog_pool:
+            return create()
+        return self._dialog_pool.get_dialog((bundle, widget_class), title, create, args, kwargs)
+
+    def _on_dialog_finished(self, dialog, status):
+        """
+        Called when a dialog created by _get_dialog_with_widget is closed.  Runs the
+        function registered for this time the dialog was shown, if any, and returns
+        the dialog to the dialog pool.
+        """
+        callback = self._dialog_finished_callbacks.pop(id(dialog), None)
+        if callback:
+            callback(status)
+        if self._dialog_pool:
+            self._dialog_pool.release(dialog)
+
+    def get_dialog_pool_stats(self):
+        """
+        :returns: Dictionary with the dialog pool hits, misses and evictions and the mean
+                  time to first paint of pooled and fresh dialogs, or None if pooling is
+                  disabled
+        """
+        if not self._dialog_pool:
+            return None
+        return self._dialog_pool.get_stats()
     
     def _initialise_qapplication(self):
         """
@@ -342,71 +1367,55 @@ class SoftimageEngine(Engine):
             
             self.log_debug("Initialising main QApplication...")
             qt_app = QtGui.QApplication([])
-            qt_app.setWindowIcon(QtGui.QIcon(self.icon_256))
+            qt_app.setWindowIcon(self._style_cache.get_icon(self.icon_256))
             qt_app.setQuitOnLastWindowClosed(False)
             
             # set up the dark style
             self._initialize_dark_look_and_feel()
         
     
+    def _apply_external_stylesheet(self, bundle, widget):
+        """
+        Apply the bundle's style.qss to the widget.  The stylesheet is only read
+        and its tokens resolved once per bundle rather than for every dialog.
+        """
+        qss_file = os.path.join(bundle.disk_location, "style.qss")
+        resolve = getattr(self, "_resolve_sg_stylesheet_tokens", None)
+        stylesheet = self._style_cache.get_stylesheet(qss_file, resolve)
+        if stylesheet:
+            widget.setStyleSheet(stylesheet)
+            widget.update()
+
+    # (older versions of core call the method by this name)
+    _apply_external_styleshet = _apply_external_stylesheet
+
+    def get_style_cache_stats(self):
+        """
+        :returns: Dictionary with the number of stylesheet and icon cache hits and misses
+        """
+        return self._style_cache.get_stats()
+
     def _override_qmessagebox_methods(self, QtGui):
         """
         Handle common QMessageBox methods to better handle
         parenting and modality 
         """
-        
-        information_fn = QtGui.QMessageBox.information
-        critical_fn = QtGui.QMessageBox.critical
-        question_fn = QtGui.QMessageBox.question
-        warning_fn = QtGui.QMessageBox.warning
-        
-        def _fix_parent_in_args(*args, **kwargs):
-            if args:
-                # parent is first arg:
-                if args[0] == None:
-                    qt_parent_widget = self._get_dialog_parent()
-                    args = (qt_parent_widget, ) + args[1:]
-            else:
-                if "parent" in kwargs:
-                    if kwargs["parent"] == None:
-                        qt_parent_widget = self._get_dialog_parent()
-                        kwargs["parent"] = qt_parent_widget
-                else:
-                    # parent not set at all!
-                    args = (qt_parent_widget, )
-                
-            return args, kwargs
-        
-        @staticmethod
-        def _info_wrapper(*args, **kwargs):
-            args, kwargs = _fix_parent_in_args(*args, **kwargs)
-            func = lambda a=args, k=kwargs: information_fn(*a, **k)
-            return self._run_application_modal(func)
-        
-        @staticmethod
-        def _critical_wrapper(*args, **kwargs):
-            args, kwargs = _fix_parent_in_args(*args, **kwargs)
-            func = lambda a=args, k=kwargs: critical_fn(*a, **k)
-            return self._run_application_modal(func)
-        
-        @staticmethod
-        def _question_wrapper(*args, **kwargs):
-            args, kwargs = _fix_parent_in_args(*args, **kwargs)
-            func = lambda a=args, k=kwargs: question_fn(*a, **k)
-            return self._run_application_modal(func)
-        
-        @staticmethod
-        def _warning_wrapper(*args, **kwargs):
-            args, kwargs = _fix_parent_in_args(*args, **kwargs)
-            func = lambda a=args, k=kwargs: warning_fn(*a, **k)
-            return self._run_application_modal(func)
-
-        QtGui.QMessageBox.information = _info_wrapper
-        QtGui.QMessageBox.critical = _critical_wrapper
-        QtGui.QMessageBox.question = _question_wrapper
-        QtGui.QMessageBox.warning = _warning_wrapper
-    
-    
+        _override_qmessagebox_methods(QtGui)
+
+    def _fix_dialog_parent_in_args(self, args, kwargs):
+        """
+        Make sure the parent passed to a QMessageBox static method
+        is the dialog parent if it was not specified.
+        """
+        if args:
+            # parent is first arg:
+            if args[0] == None:
+                args = (self._get_dialog_parent(), ) + tuple(args[1:])
+        elif kwargs.get("parent") == None:
+            # parent either not set at all or set to None!
+            kwargs["parent"] = self._get_dialog_parent()
+        return args, kwargs
+
     def _run_application_modal(self, func):
         """
         Run the specified function application modal if
@@ -420,6 +1429,8 @@ class SoftimageEngine(Engine):
             # main Softimage window we have to do this ourselves...
             import win32api, win32gui
             tk_softimage = self.import_module("tk_softimage")
+            windows_toggled = self._metrics.counter("windows_toggled",
+                                                    "Softimage windows disabled or re-enabled for modal dialogs.")
 
             foreground_window = None
             saved_state = []
@@ -434,12 +1445,15 @@ class SoftimageEngine(Engine):
                     if enabled:
                         # disable the window:
                         win32gui.EnableWindow(hwnd, False)
+                        windows_toggled.inc()
 
-                # run function
-                ret = func()
+                # run function - the modal event loop stops the Softimage timer
+                # events which would otherwise look like a hang to the watchdog
+                with self._watchdog.suspended("modal dialog"):
+                    ret = func()
                 
             except Exception, e:
-                self.log_error("Error showing modal dialog: %s" % e)
+                self.log_error("Error showing modal dialog: %s" % e, sys.exc_info())
             finally:
                 #self.log_debug("Restoring state of main application windows")
                 # kinda important to ensure we restore other window state:
@@ -447,11 +1461,13 @@ class SoftimageEngine(Engine):
                     if win32gui.IsWindowEnabled(hwnd) != state:
                         # restore the state:
                         win32gui.EnableWindow(hwnd, state)
+                        windows_toggled.inc()
                 if foreground_window:
                     win32gui.SetForegroundWindow(foreground_window)
         else:
             # show dialog:
-            ret = func()
+            with self._watchdog.suspended("modal dialog"):
+                ret = func()
             
         return ret        
         
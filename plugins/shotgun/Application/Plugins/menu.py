@@ -12,6 +12,8 @@
 Implements the Shotgun Menu as a Softimage plug-in
 """
 
+import hashlib
+
 from win32com.client import constants
 
 def XSILoadPlugin( in_reg ):
@@ -32,8 +34,12 @@ def XSIUnloadPlugin( in_reg ):
     """
     Plug-in Unload
     """    
+    # release the menu callbacks - the engine closes any torn-off menus that
+    # use them before unloading the plug-in:
+    _unregister_callbacks()
+
     strPluginName = in_reg.Name
-    Application.LogMessage(str(strPluginName) + str(" has been unloaded."),constants.siVerbose)
+    _log_message(str(strPluginName) + str(" has been unloaded."), "verbose")
     return True
 
 #########################################################################################################################
@@ -44,6 +50,10 @@ def Shotgun_Init( in_ctxt ):
     time the menu is about to be displayed (because it is dynamic) 
     """
     import sgtk
+
+    # (the callbacks registered for the previous menu aren't released here as
+    # torn-off menus and their sub-menus still use them - rebuilding the menu
+    # replaces them as each item keeps its callback name)
     sg_menu = ShotgunMenu(in_ctxt.Source)
     
     engine = sgtk.platform.current_engine()
@@ -54,28 +64,145 @@ def Shotgun_Init( in_ctxt ):
         # just add a menu showing that Shotgun is disabled:
         def on_shotgun_disabled():
             # (AD) - TODO - show a dialog?
-            Application.LogMessage("Shotgun is disabled")
+            _log_message("Shotgun is disabled")
         sg_menu.AddCallbackItem("Shotgun Disabled", on_shotgun_disabled)
 
+# names of the menu callbacks currently registered in globals()
+_REGISTERED_CALLBACKS = set()
+
+def _unregister_callbacks():
+    """
+    Remove all menu callbacks registered by ShotgunMenu.AddCallbackItem
+    """
+    module_globals = globals()
+    for cmd_name in _REGISTERED_CALLBACKS:
+        module_globals.pop(cmd_name, None)
+    _REGISTERED_CALLBACKS.clear()
+
+class TornOffMenuIndex(object):
+    """
+    Keeps track of the names of the menus in the last Shotgun menu built so
+    that any of them that have been torn off can be closed.
+
+    The layout views are only scanned for torn-off menus when they are
+    closed, which only happens when the engine is destroyed.
+    """
+    def __init__(self):
+        self._menu_names = set()
+
+    def reset(self):
+        """
+        Forget the menu names registered for the previous menu
+        """
+        self._menu_names = set()
+
+    def add_menu_name(self, name):
+        """
+        Register the name of a menu that may be torn off
+        """
+        self._menu_names.add(name)
+
+    def close_all(self, host=None):
+        """
+        Close all torn-off menu views
+        """
+        for view in _get_layout_views(host):
+            try:
+                if view.Type != "Menu Window":
+                    continue
+                if view.GetAttributeValue("metadata") in self._menu_names:
+                    view.State = 1
+            except Exception:
+                # view has already gone away!
+                pass
+
+def _to_unicode(name):
+    """
+    Menu names are utf-8 strings or unicode objects
+    """
+    return name if isinstance(name, unicode) else name.decode("utf-8")
+
+def _get_host():
+    """
+    Get the host adapter of the current engine, or None if there is no engine
+    """
+    import sgtk
+    return getattr(sgtk.platform.current_engine(), "host", None)
+
+def _log_message(msg, severity="info"):
+    """
+    Log a message to the Softimage script history, through the engine's host
+    adapter if there is an engine so that the call is counted.
+    """
+    host = _get_host()
+    if host is not None:
+        host.log_message(msg, severity)
+        return
+    severities = {"info": constants.siInfo, "verbose": constants.siVerbose}
+    Application.LogMessage(msg, severities[severity])
+
+def _get_layout_views(host=None):
+    """
+    Get the views of the active layout, through the engine's host adapter
+    if possible.
+    """
+    host = host or _get_host()
+    if host is not None:
+        return host.get_layout_views()
+    return Application.Desktop.ActiveLayout.Views
+
+# torn-off menus can outlive the menu objects that created them so the index
+# lives for as long as this plugin is loaded:
+_TORN_OFF_MENUS = TornOffMenuIndex()
+
+class MenuStats(object):
+    """
+    Counts the Softimage calls made whilst building a menu and its sub-menus
+    and the work deferred to dynamic sub-menus that haven't been expanded
+    """
+    def __init__(self):
+        self.com_calls = 0
+        self.callbacks_registered = 0
+        self.dynamic_sub_menus = 0
+        self.expanded_sub_menus = 0
+        self.deferred_items = 0
+        self.deferred_enable_callbacks = 0
+
+    def as_dict(self):
+        return dict(vars(self))
+
 class ShotgunMenu(object):
     """
     Wraps the Softimage Menu in a more friendly way
     """
     class CallbackNameGenerator(object):
         """
-        Used to generate a unique callback name
+        Used to generate the callback name for a menu item.  The name is derived
+        from the path of the item in the menu so that the item gets the same name
+        each time the menu is rebuilt, and the items of menus torn off from an
+        earlier build keep working.
         """
         def __init__(self):
-            self._id = 0
-        def generate_name(self):
-            name = "_shotgun_menu_command_%d" % self._id
-            self._id += 1
-            return name
+            self._used = {}
+        def generate_name(self, path):
+            # (items with the same path in one build are told apart by their order)
+            count = self._used.get(path, 0)
+            self._used[path] = count + 1
+            key = ("%s#%d" % (path, count) if count else path).encode("utf-8")
+            return "_shotgun_menu_command_%s" % hashlib.sha1(key).hexdigest()[:16]
     
-    def __init__(self, si_menu, name_generator=None):
+    def __init__(self, si_menu, name_generator=None, stats=None, path=None):
         self._si_menu = si_menu
         self._name_generator = name_generator or ShotgunMenu.CallbackNameGenerator()
+        self._stats = stats or MenuStats()
         self._sub_menus = []
+        self._path = path
+        if name_generator is None:
+            # this is the top-level menu, built afresh each time it is opened
+            name = self.name
+            _TORN_OFF_MENUS.reset()
+            _TORN_OFF_MENUS.add_menu_name(name)
+            self._path = _to_unicode(name)
 
         # handle different versions of Menu Api
         #if Application.Version().startswith("11.")
@@ -95,7 +222,28 @@ class ShotgunMenu(object):
         Access the name of the menu
         """
         return self._si_menu.Name
+
+    @property
+    def stats(self):
+        """
+        Access the MenuStats shared by this menu and its sub-menus
+        """
+        return self._stats
         
+    def _get_item_path(self, name):
+        return u"%s/%s" % (self._path, _to_unicode(name))
+
+    def _register_callback(self, callback, name):
+        """
+        Register a callback for the named item in globals() so that Softimage can
+        find it by name
+        """
+        cmd_name = self._name_generator.generate_name(self._get_item_path(name))
+        globals()[cmd_name] = callback
+        _REGISTERED_CALLBACKS.add(cmd_name)
+        self._stats.callbacks_registered += 1
+        return cmd_name
+
     def AddCallbackItem(self, name, callback):
         """
         Wraps the Softimage 'Menu.AddCallBackItem' call in a more callback friendly way.
@@ -114,9 +262,9 @@ class ShotgunMenu(object):
         # to overcome this problem, this method wraps the Softimage call and dynamically registers a new callback function in the globals()
         # dictionary which Softimage can find and this in turn will call the intended callback! 
         
-        cmd_name = self._name_generator.generate_name()
         #Application.LogMessage("Registering command %s for callback %s" % (cmd_name, callback))
-        globals()[cmd_name] = lambda x: callback()
+        cmd_name = self._register_callback(lambda x: callback(), name)
+        self._stats.com_calls += 1
         return self._si_AddCallbackItem(name, cmd_name)
         
     def AddSubMenu(self, name):
@@ -125,46 +273,59 @@ class ShotgunMenu(object):
         """
         # the menu name should be a unicode object so we cast it to support when, for example, 
         # the context contains info with non-ascii characters
-        sub_menu = ShotgunMenu(self._si_AddSubMenu(name.decode("utf-8")), self._name_generator)
+        name = name.decode("utf-8")
+        self._stats.com_calls += 1
+        sub_menu = ShotgunMenu(self._si_AddSubMenu(name), self._name_generator, self._stats,
+                               self._get_item_path(name))
         self._sub_menus.append(sub_menu)
+        _TORN_OFF_MENUS.add_menu_name(name)
         return sub_menu
 
+    def AddDynamicSubMenu(self, name, populate, num_items=0, num_enable_callbacks=0):
+        """
+        Add the named sub-menu, deferring the creation of its items until it is expanded.
+
+        :param name: The name of the sub-menu
+        :param populate: Function called with a ShotgunMenu for the sub-menu each time
+                         the sub-menu is expanded
+        :param num_items: The number of items populate will add, for reporting
+        :param num_enable_callbacks: The number of enable callbacks populate will run,
+                                     for reporting
+        """
+        if not hasattr(self._si_menu, "AddItem"):
+            # no support for dynamic sub-menus so populate it straight away:
+            sub_menu = self.AddSubMenu(name)
+            populate(sub_menu)
+            return sub_menu
+
+        name = name.decode("utf-8")
+        path = self._get_item_path(name)
+        stats = self._stats
+        def on_expand(in_ctxt):
+            stats.expanded_sub_menus += 1
+            # (the items are named afresh each time the sub-menu is expanded)
+            populate(ShotgunMenu(in_ctxt.Source, ShotgunMenu.CallbackNameGenerator(), stats, path))
+
+        cmd_name = self._register_callback(on_expand, name)
+        item = self._si_menu.AddItem(name, constants.siMenuItemSubmenu)
+        item.Callback = cmd_name
+        self._stats.com_calls += 2
+        self._stats.dynamic_sub_menus += 1
+        self._stats.deferred_items += num_items
+        self._stats.deferred_enable_callbacks += num_enable_callbacks
+        _TORN_OFF_MENUS.add_menu_name(name)
+        return item
+
     def AddSeparatorItem(self):
         """
         Add a seperator to the menu 
         """
+        self._stats.com_calls += 1
         self._si_menu.AddSeparatorItem()
 
-    def close_torn_off_menus(self):
+    def close_torn_off_menus(self, host=None):
         """
         Helper function that can be used to close all 
         torn-off menus
         """
-        all_menus = [self] + self._get_child_menus()
-        all_menu_names = [m.name for m in all_menus]
-        
-        active_layout = Application.Desktop.ActiveLayout
-        for view in active_layout.Views:
-            if view.Type != "Menu Window":
-                continue
-            
-            view_name = view.GetAttributeValue("metadata")
-            if view_name in all_menu_names:
-                view.State = 1
-        
-    def _get_child_menus(self):
-        child_menus = []
-        for sub_menu in self._sub_menus:
-            child_menus.append(sub_menu)
-            child_menus.extend(sub_menu._get_child_menus())
-        return child_menus        
-        
-        
-        
-        
-        
-        
-        
-        
-        
-    
\ No newline at end of file
+        _TORN_OFF_MENUS.close_all(host)
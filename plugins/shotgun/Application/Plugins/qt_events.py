@@ -34,9 +34,13 @@ directly importing PySide/PyQT
 """
 
 import sys
+import time
 import win32com
 from win32com.client import constants
 
+# the interval, in seconds, that the Qt event loop timer is registered with:
+_TIMER_INTERVAL = None
+
 def XSILoadPlugin( in_reg ):
     """
     Plug-in Load
@@ -71,6 +75,9 @@ def XSILoadPlugin( in_reg ):
         timer_frequency = 20
     
     in_reg.RegisterTimerEvent("Shotgun Qt Event Loop", timer_frequency, 0)
+
+    global _TIMER_INTERVAL
+    _TIMER_INTERVAL = timer_frequency / 1000.0
     
     return True
 
@@ -90,8 +97,27 @@ def ShotgunQtEventLoop_OnEvent(in_ctxt):
     try:
         import sgtk
         from sgtk.platform.qt import QtGui
+
+        engine = sgtk.platform.current_engine()
+        monitor = getattr(engine, "event_loop_monitor", None)
+        if monitor:
+            monitor.record_timer_tick(_TIMER_INTERVAL)
+            pump_start = time.time()
+
         QtGui.QApplication.processEvents()
         QtGui.QApplication.sendPostedEvents(None, 0)
+
+        if monitor:
+            monitor.record_pump_duration(time.time() - pump_start)
+
+        # run any menu commands and task callbacks waiting for the main thread:
+        if engine and hasattr(engine, "on_qt_event_loop_timer"):
+            engine.on_qt_event_loop_timer()
+
+        if monitor:
+            # measure how long an event posted now waits for Qt to get time again,
+            # i.e. for the next tick:
+            monitor.post_sentinel()
         #QtGui.QApplication.flush()
         #Application.Desktop.RedrawUI()
     except:
@@ -101,6 +127,7 @@ def ShotgunQtEventsKeyDown_OnEvent( in_ctxt ):
     """
     Block XSI keys from processing, pass along to Qt
     """
+    _heartbeat()
     if _is_qt_widget_focused():
         # process the key
         _consume_key( in_ctxt, True )
@@ -114,15 +141,34 @@ def ShotgunQtEventsKeyUp_OnEvent( in_ctxt ):
     """
     Block XSI keys from processing, pass along to Qt
     """
+    _heartbeat()
     if _is_qt_widget_focused():
         # process the key
         _consume_key( in_ctxt, False )
 
         # Block the Signal from XSI
         in_ctxt.SetAttribute( 'Consumed', True )
+    else:
+        # make sure the next press of this key isn't taken for an auto-repeat:
+        bridge = _get_key_bridge()
+        key = _translate_key( in_ctxt )
+        if bridge and key:
+            bridge.forget( key[0] )
 
     return True
 
+def _heartbeat():
+    """
+    Let the engine's hang watchdog know that Softimage is responsive
+    """
+    try:
+        import sgtk
+        engine = sgtk.platform.current_engine()
+        if engine and hasattr(engine, "heartbeat"):
+            engine.heartbeat()
+    except:
+        pass
+
 _SI_TO_QT_KEY_MAP = None
 def _get_key_map():
     """
@@ -288,12 +334,51 @@ def _get_key_map():
         
     return _SI_TO_QT_KEY_MAP
 
+def _get_key_bridge():
+    """
+    :returns: The engine's KeyEventBridge or None if the engine doesn't have one
+    """
+    try:
+        import sgtk
+        return getattr(sgtk.platform.current_engine(), "key_bridge", None)
+    except:
+        return None
+
 def _consume_key( ctxt, pressed ):
     """
     build the proper QKeyEvent from Softimage key event and send the it along to the focused widget
     """
-    from sgtk.platform.qt import QtCore, QtGui
-    
+    from sgtk.platform.qt import QtGui
+
+    result = _translate_key( ctxt )
+    if not result:
+        return
+    key, modifier, text = result
+
+    bridge = _get_key_bridge()
+    if bridge:
+        # the engine marks (and optionally coalesces) auto-repeats:
+        if pressed:
+            bridge.key_down( key, modifier, text )
+        else:
+            bridge.key_up( key, modifier, text )
+        return
+
+    if ( pressed ):
+        event = QtGui.QKeyEvent.KeyPress
+    else:
+        event = QtGui.QKeyEvent.KeyRelease
+
+    # Send the event along to the focused widget
+    QtGui.QApplication.sendEvent( QtGui.QApplication.instance().focusWidget(), QtGui.QKeyEvent( event, key, modifier, text ) )
+
+def _translate_key( ctxt ):
+    """
+    :returns: (Qt key, Qt modifiers, text) for a Softimage key event, or None if
+              the key isn't mapped
+    """
+    from sgtk.platform.qt import QtCore
+
     kcode = ctxt.GetAttribute( 'KeyCode' )
     mask = ctxt.GetAttribute( 'ShiftMask' )
 
@@ -313,18 +398,13 @@ def _consume_key( ctxt, pressed ):
 
     # Generate a Qt Key Event to be processed
     result  = _get_key_map().get( kcode )
-    if ( result ):
-
-        if ( pressed ):
-            event = QtGui.QKeyEvent.KeyPress
-        else:
-            event = QtGui.QKeyEvent.KeyRelease
+    if ( not result ):
+        return None
 
-        if ( result[2] ):
-            modifier |= result[2]
+    if ( result[2] ):
+        modifier |= result[2]
 
-        # Send the event along to the focused widget
-        QtGui.QApplication.sendEvent( QtGui.QApplication.instance().focusWidget(), QtGui.QKeyEvent( event, result[0], modifier, result[1] ) )
+    return ( result[0], modifier, result[1] )
 
 def _is_qt_widget_focused():
     """
@@ -9,7 +9,25 @@
 # not expressly granted therein are reserved by Shotgun Software Inc.
 
 from .menu_generation import MenuGenerator
+from .menu_cache import MenuCache
+from .lookup_cache import LookupCache
 from .qt_parent_window import get_qt_parent_window
+from .profiler import CommandProfiler
+from .dispatch import CommandDispatcher
+from .tasks import WorkerPool, TaskFuture, TaskCancelledError
+from .host import get_host, HostAdapter, SoftimageHost
+from .watchdog import HangWatchdog
+from .event_loop_monitor import EventLoopMonitor
+from .warmup import WarmUp
+from .batching import ShotgunBatcher, BatchedQuery
+from .app_host import HostRpcServer, AppHostProcess
+from .dialog_pool import DialogPool
+from .style_cache import StyleCache, minify_stylesheet
+from .bundle_mirror import BundleMirror
+from .bootstrap_cache import BootstrapCache, hash_configuration
+from .log_limiter import LogLimiter
+from .key_bridge import KeyEventBridge
+from .metrics import MetricsRegistry, MetricsExporter, format_openmetrics, format_statsd
 
 import sys
 if sys.platform == "win32":
@@ -0,0 +1,228 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Engine side of the out-of-process app host.
+
+Selected apps can be run in a child Python process with its own Qt event loop
+so that heavy UIs can't stall Softimage.  The child talks back to the engine
+over an authenticated local socket for the few host operations it needs.  See
+app_host_child.py for the child side.
+"""
+
+import os
+import time
+import binascii
+import threading
+import subprocess
+from collections import deque
+from multiprocessing.connection import Listener, Client
+
+# the script run in the child process:
+CHILD_SCRIPT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app_host_child.py")
+
+class HostRpcServer(object):
+    """
+    Serves host operations to out-of-process apps.
+
+    Requests are received on a background thread per connection but are always
+    executed on the Softimage main thread, via the engine's main-thread queue,
+    as they talk to Softimage.  Only the methods named in METHODS can be called.
+    """
+
+    METHODS = ("ping", "log_message", "get_project_info", "get_scene_name", "get_scene_path",
+               "get_selection", "get_launch_info")
+
+    def __init__(self, engine, logger, history_size=100):
+        """
+        :param engine: The engine, used to run requests on the main thread and to
+                       access the host
+        :param logger: The logger to report errors to.  This is called from
+                       background threads so must not talk to Softimage!
+        :param history_size: The number of request latencies to keep
+        """
+        self._engine = engine
+        self._logger = logger
+        self._listener = None
+        self._authkey = None
+        self._connections = []
+        self._lock = threading.Lock()
+        self._stopped = False
+        self._launches = {}
+        self._latencies = deque(maxlen=history_size)
+        self._num_requests = 0
+
+    @property
+    def address(self):
+        return self._listener.address if self._listener else None
+
+    @property
+    def authkey(self):
+        return self._authkey
+
+    def start(self):
+        """
+        Start listening for connections from child processes
+        """
+        if self._listener:
+            return
+        self._authkey = os.urandom(16)
+        self._listener = Listener(("127.0.0.1", 0), authkey=self._authkey)
+        thread = threading.Thread(target=self._accept_loop, name="tk-softimage app host server")
+        thread.daemon = True
+        thread.start()
+
+    def stop(self):
+        """
+        Stop listening and close all connections.  Child processes see their
+        connection close and can no longer make host calls.
+        """
+        if not self._listener or self._stopped:
+            return
+        self._stopped = True
+        try:
+            # wake up the accept loop:
+            Client(self._listener.address, authkey=self._authkey).close()
+        except Exception:
+            pass
+        self._listener.close()
+        with self._lock:
+            for connection in self._connections:
+                connection.close()
+            self._connections = []
+
+    def add_launch(self, info):
+        """
+        Register the launch info (app, command, context, etc.) for a child process
+
+        :returns: Token the child uses to retrieve the info with get_launch_info
+        """
+        token = binascii.hexlify(os.urandom(8))
+        self._launches[token] = info
+        return token
+
+    def get_stats(self):
+        """
+        :returns: Dictionary with the number of requests served and the mean and max
+                  time in seconds from a request being received to its response being sent
+        """
+        latencies = list(self._latencies)
+        return {
+            "requests": self._num_requests,
+            "mean_latency": (sum(latencies) / len(latencies)) if latencies else None,
+            "max_latency": max(latencies) if latencies else None,
+        }
+
+    def _accept_loop(self):
+        while not self._stopped:
+            try:
+                connection = self._listener.accept()
+            except Exception, e:
+                if not self._stopped:
+                    self._logger.debug("App host server failed to accept a connection: %s" % e)
+                continue
+            if self._stopped:
+                connection.close()
+                return
+            with self._lock:
+                self._connections.append(connection)
+            thread = threading.Thread(target=self._serve, args=(connection,),
+                                      name="tk-softimage app host connection")
+            thread.daemon = True
+            thread.start()
+
+    def _serve(self, connection):
+        """
+        Receive requests from a child process and queue them for the main thread
+        """
+        while not self._stopped:
+            try:
+                request_id, method, args = connection.recv()
+            except (EOFError, IOError, OSError):
+                break
+            self._engine.run_in_main_thread(self._handle, connection, request_id, method, args, time.time())
+        with self._lock:
+            if connection in self._connections:
+                self._connections.remove(connection)
+        connection.close()
+
+    def _handle(self, connection, request_id, method, args, received_at):
+        """
+        Run a request on the main thread and send the response
+        """
+        if method not in self.METHODS:
+            response = (request_id, False, "Unknown host method '%s'" % method)
+        else:
+            try:
+                response = (request_id, True, getattr(self, "_rpc_%s" % method)(*args))
+            except Exception, e:
+                response = (request_id, False, "%s: %s" % (e.__class__.__name__, e))
+        try:
+            connection.send(response)
+        except (IOError, OSError, ValueError):
+            # the child has gone away
+            return
+        self._num_requests += 1
+        self._latencies.append(time.time() - received_at)
+
+    ##########################################################################################
+    # host methods
+
+    def _rpc_ping(self, *args):
+        return args
+
+    def _rpc_log_message(self, message, severity="info"):
+        self._engine.host.log_message(message, severity)
+
+    def _rpc_get_project_info(self):
+        return {
+            "project_path": self._engine.host.get_active_project_path(),
+            "context": str(self._engine.context),
+            "softimage_version": self._engine.host.version,
+        }
+
+    def _rpc_get_scene_name(self):
+        return self._engine.host.get_scene_name()
+
+    def _rpc_get_scene_path(self):
+        return self._engine.host.get_scene_path()
+
+    def _rpc_get_selection(self):
+        return self._engine.host.get_selection_names()
+
+    def _rpc_get_launch_info(self, token):
+        return self._launches.pop(token)
+
+
+class AppHostProcess(object):
+    """
+    A child Python process running an app command with its own Qt event loop
+    """
+
+    def __init__(self, server, python, launch_info, extra_args=None, stdout=None):
+        """
+        :param server: The HostRpcServer the child connects back to
+        :param python: Path to the Python interpreter to run the child with
+        :param launch_info: Dictionary passed to the child describing what to run
+        :param extra_args: Additional command line arguments for the child script
+        :param stdout: Passed to subprocess.Popen for the child's stdout
+        """
+        token = server.add_launch(launch_info)
+        host, port = server.address
+        args = [python, CHILD_SCRIPT, "--address", "%s:%d" % (host, port), "--token", token]
+        args.extend(extra_args or [])
+        env = dict(os.environ)
+        # (the authkey isn't passed on the command line where other users could see it)
+        env["TK_SOFTIMAGE_APP_HOST_AUTHKEY"] = binascii.hexlify(server.authkey)
+        self.launch_info = launch_info
+        self.process = subprocess.Popen(args, env=env, stdout=stdout)
+
+    def is_running(self):
+        return self.process.poll() is None
@@ -0,0 +1,179 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Child side of the out-of-process app host.
+
+Run by the engine (see app_host.py) in a separate Python process.  Connects
+back to the engine, starts a Toolkit engine for the same pipeline
+configuration and context, runs the requested app command and then runs a
+native Qt event loop until the app's windows are closed.
+
+Apps running in the child can reach Softimage through the HostRpcClient kept
+on the engine started in the child:
+
+    host = sgtk.platform.current_engine().softimage_host
+
+or, e.g. whilst the app is being initialized, through get_softimage_host().
+This script is run as __main__ so it registers itself as the
+tk_softimage_app_host_child module to be importable:
+
+    import tk_softimage_app_host_child
+    host = tk_softimage_app_host_child.get_softimage_host()
+
+Can also be run with --ping N to measure the RPC round-trip to the engine.
+"""
+
+import os
+import sys
+import time
+import binascii
+import optparse
+import threading
+from multiprocessing.connection import Client
+
+# the name this module is importable as in the child process
+MODULE_NAME = "tk_softimage_app_host_child"
+
+# the connection to the engine for this process
+_host = None
+
+class HostRpcError(Exception):
+    """
+    Raised when a host call fails in the Softimage process
+    """
+
+class HostRpcClient(object):
+    """
+    Makes host calls on the Softimage engine that launched this process
+    """
+
+    def __init__(self, address, authkey):
+        self._connection = Client(address, authkey=authkey)
+        self._lock = threading.Lock()
+        self._next_id = 0
+
+    def call(self, method, *args):
+        """
+        Call a host method in the Softimage process and return its result
+        """
+        with self._lock:
+            self._next_id += 1
+            request_id = self._next_id
+            self._connection.send((request_id, method, args))
+            response_id, ok, result = self._connection.recv()
+        if response_id != request_id:
+            raise HostRpcError("Received the response to request %d instead of %d" % (response_id, request_id))
+        if not ok:
+            raise HostRpcError(result)
+        return result
+
+    def log_message(self, message, severity="info"):
+        return self.call("log_message", message, severity)
+
+    def get_project_info(self):
+        return self.call("get_project_info")
+
+    def get_scene_name(self):
+        return self.call("get_scene_name")
+
+    def get_scene_path(self):
+        return self.call("get_scene_path")
+
+    def get_selection(self):
+        return self.call("get_selection")
+
+    def close(self):
+        self._connection.close()
+
+def get_softimage_host():
+    """
+    :returns: The HostRpcClient connected to the Softimage engine, or None if this
+              isn't running in an out-of-process app host
+    """
+    return _host
+
+def _ping(host, count):
+    """
+    Measure the host call round-trip and print the latencies in ms, one per line
+    """
+    for i in range(count):
+        start = time.time()
+        host.call("ping", i)
+        sys.stdout.write("%f\n" % ((time.time() - start) * 1000.0))
+    sys.stdout.flush()
+
+def _run_app(info):
+    """
+    Start a Toolkit engine in this process and run the app command
+    """
+    import sgtk
+    tk = sgtk.sgtk_from_path(info["config_path"])
+    context = sgtk.Context.deserialize(info["context"])
+    engine = sgtk.platform.start_engine(info["engine"], tk, context)
+    engine.softimage_host = _host
+
+    from sgtk.platform.qt import QtGui
+    app = QtGui.QApplication.instance() or QtGui.QApplication(sys.argv)
+    app.setQuitOnLastWindowClosed(True)
+
+    command = _find_command(engine, info["command"], info["app_instance"])
+    if not command:
+        raise RuntimeError("Command '%s' wasn't registered by app '%s'" % (info["command"], info["app_instance"]))
+    command["callback"]()
+
+    # show_modal blocks until the dialog is closed so only run an event loop if
+    # the command has left windows open:
+    if [widget for widget in app.topLevelWidgets() if widget.isVisible()]:
+        app.exec_()
+    engine.destroy()
+
+def _find_command(engine, name, app_instance_name):
+    """
+    Find a command registered by an app.  Different apps can register commands
+    with the same name so the command's app is checked as well.
+
+    :returns: The command dictionary, or None if the app didn't register the command
+    """
+    for command_name, command in engine.commands.items():
+        app = command["properties"].get("app")
+        if command_name == name and app is not None and app.instance_name == app_instance_name:
+            return command
+    return None
+
+def main():
+    global _host
+
+    parser = optparse.OptionParser()
+    parser.add_option("--address", help="host:port of the engine's app host server")
+    parser.add_option("--token", help="token identifying this launch")
+    parser.add_option("--ping", type="int", default=0, help="measure N host call round-trips and exit")
+    options, _ = parser.parse_args()
+
+    host, port = options.address.rsplit(":", 1)
+    authkey = binascii.unhexlify(os.environ.pop("TK_SOFTIMAGE_APP_HOST_AUTHKEY"))
+    _host = HostRpcClient((host, int(port)), authkey)
+    sys.modules.setdefault(MODULE_NAME, sys.modules[__name__])
+    try:
+        info = _host.call("get_launch_info", options.token)
+        if options.ping:
+            _ping(_host, options.ping)
+        else:
+            try:
+                _run_app(info)
+            except Exception, e:
+                _host.log_message("Shotgun: Failed to run '%s' out of process: %s" % (info["command"], e), "error")
+                raise
+    finally:
+        _host.close()
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,315 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Batching of Shotgun read queries made by apps running in Softimage
+"""
+
+import sys
+import json
+import threading
+from contextlib import contextmanager
+
+from .tasks import _reraise
+
+class BatchedQuery(object):
+    """
+    The pending result of a find query queued with the ShotgunBatcher
+    """
+
+    def __init__(self, entity_type, filters, fields, order=None, filter_operator=None, limit=0,
+                 batcher=None, run_callback=None):
+        """
+        :param batcher: The ShotgunBatcher the query is queued with
+        :param run_callback: Function taking a callback and its arguments that
+                             runs it on the main thread, defaults to running it
+                             immediately
+        """
+        self.entity_type = entity_type
+        self.filters = filters
+        self.fields = fields
+        self.order = order
+        self.filter_operator = filter_operator
+        self.limit = limit
+        self._batcher = batcher
+        self._run_callback = run_callback or (lambda fn, *args: fn(*args))
+        self._done = threading.Event()
+        self._result = None
+        self._exc_info = None
+        self._callbacks = []
+        self._lock = threading.Lock()
+
+    def done(self):
+        return self._done.is_set()
+
+    def result(self, timeout=None):
+        """
+        Wait for and return the list of entities found, re-raising any exception
+        raised by the batched request.  If the query hasn't been sent yet (e.g.
+        it is in a shotgun_batch() scope that is still open) it is sent now
+        along with the other queued queries, rather than waiting for the scope
+        to exit.
+        """
+        if not self._done.is_set() and self._batcher:
+            self._batcher.flush_query(self)
+        self._done.wait(timeout)
+        if not self._done.is_set():
+            raise RuntimeError("Timed out waiting for Shotgun query to complete")
+        if self._exc_info:
+            _reraise(self._exc_info)
+        return self._result
+
+    def add_done_callback(self, callback):
+        """
+        Add a function to be called with this query once it is done.  The callback
+        is run on the main thread.
+        """
+        with self._lock:
+            if not self._done.is_set():
+                self._callbacks.append(callback)
+                return
+        self._run_callback(callback, self)
+
+    @property
+    def mergeable(self):
+        """
+        Whether the query can be merged with others that only differ by an id
+        filter - only simple queries with a single ['id', 'is', N] filter can be
+        """
+        if self.order or self.filter_operator or self.limit:
+            return False
+        if not all(isinstance(f, (list, tuple)) and len(f) == 3 for f in self.filters):
+            # (e.g. a complex filter dictionary)
+            return False
+        return len([f for f in self.filters if list(f[:2]) == ["id", "is"]]) == 1
+
+    def _set_result(self, result, exc_info=None):
+        with self._lock:
+            self._result = result
+            self._exc_info = exc_info
+            self._done.set()
+            callbacks = self._callbacks
+            self._callbacks = []
+        for callback in callbacks:
+            self._run_callback(callback, self)
+
+
+class ShotgunBatcher(object):
+    """
+    Collects find queries and sends them to Shotgun together.
+
+    Queries are collected either within an explicit batch() scope, and sent when
+    the outermost scope exits, or for a short window after the first query is
+    queued outside of a scope, and then sent from a worker thread.
+
+    Identical queries are only sent once, and queries for the same entity type
+    and fields that only differ by an ['id', 'is', N] filter are merged into a
+    single ['id', 'in', [...]] query and the results are fanned back out.
+    Queries with an order, filter operator or limit, or with complex filters,
+    are sent as they are.
+    """
+
+    def __init__(self, get_connection, submit_task=None, window=0.02, run_in_main_thread=None):
+        """
+        :param get_connection: Function that returns the Shotgun connection to use
+        :param submit_task: Function used to run a function in a worker thread,
+                            required for queries queued outside of a batch scope
+        :param window: Seconds to collect queries for outside of a batch scope
+        :param run_in_main_thread: Function taking a function and its arguments that
+                                   queues it to be run on the main thread, used for the
+                                   done callbacks.  Defaults to running them on the
+                                   thread that sent the batch.
+        """
+        self._get_connection = get_connection
+        self._submit_task = submit_task
+        self._window = window
+        self._run_in_main_thread = run_in_main_thread
+        self._lock = threading.Lock()
+        self._pending = {}
+        self._scope_depth = 0
+        self._timer = None
+        self._closed = False
+        self._stats = {"queries": 0, "deduplicated": 0, "sent": 0, "round_trips": 0}
+
+    @contextmanager
+    def batch(self):
+        """
+        Context manager that collects the queries made within it and sends them
+        when it exits.  Results are available once the scope has exited, or
+        straight away if result() is called within the scope.
+        """
+        with self._lock:
+            self._scope_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._scope_depth -= 1
+                flush = self._scope_depth == 0
+            if flush:
+                self.flush()
+
+    def find(self, entity_type, filters, fields=None, order=None, filter_operator=None, limit=0):
+        """
+        Queue a find query.  The arguments are the same as for Shotgun.find.
+
+        :returns: BatchedQuery for the result of the query
+        """
+        key = _make_key([entity_type, filters, sorted(fields or []), order, filter_operator, limit])
+        flush = False
+        with self._lock:
+            self._stats["queries"] += 1
+            query = self._pending.get(key)
+            if query:
+                self._stats["deduplicated"] += 1
+                return query
+            query = BatchedQuery(entity_type, filters, fields, order, filter_operator, limit,
+                                 self, self._run_in_main_thread)
+            self._pending[key] = query
+            if not self._scope_depth and self._timer is None:
+                if self._submit_task is None or self._closed:
+                    flush = True
+                else:
+                    # (a timer rather than a sleeping task so that no worker is held
+                    # for the window)
+                    self._timer = threading.Timer(self._window, self._on_window_elapsed)
+                    self._timer.daemon = True
+                    self._timer.start()
+        if flush:
+            self.flush()
+        return query
+
+    def flush(self):
+        """
+        Send all queued queries now
+        """
+        with self._lock:
+            queries = list(self._pending.values())
+            self._pending = {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if queries:
+            self._send(queries)
+
+    def flush_query(self, query):
+        """
+        Send the queued queries now if the query hasn't been sent yet
+        """
+        with self._lock:
+            pending = query in self._pending.values()
+        if pending:
+            self.flush()
+
+    def close(self):
+        """
+        Stop collecting queries for a window.  Queries still waiting for the window
+        are sent now and any queued after this are sent straight away.
+        """
+        with self._lock:
+            self._closed = True
+        self.flush()
+
+    def get_stats(self):
+        """
+        :returns: Dictionary with the number of queries made, deduplicated and sent, and
+                  the number of round-trips made to Shotgun to send them
+        """
+        with self._lock:
+            return dict(self._stats)
+
+    def _on_window_elapsed(self):
+        """
+        Called on the timer thread once the window has passed
+        """
+        with self._lock:
+            if self._timer is None:
+                # (flushed already)
+                return
+            self._timer = None
+        try:
+            self._submit_task(self.flush)
+        except RuntimeError:
+            # the worker pool has been shut down
+            self.flush()
+
+    def _send(self, queries):
+        """
+        Send the queries to Shotgun in as few requests as possible
+        """
+        with self._lock:
+            self._stats["sent"] += len(queries)
+        try:
+            connection = self._get_connection()
+        except Exception:
+            exc_info = sys.exc_info()
+            for query in queries:
+                query._set_result(None, exc_info)
+            return
+        self._run_requests(connection, self._merge(queries))
+
+    def _merge(self, queries):
+        """
+        Merge queries that only differ by an id filter
+
+        :returns: List of (queries, merged id list or None)
+        """
+        requests = []
+        by_id = {}
+        for query in queries:
+            if not query.mergeable:
+                requests.append(([query], None))
+                continue
+            id_filters = [f for f in query.filters if list(f[:2]) == ["id", "is"]]
+            other_filters = [f for f in query.filters if f is not id_filters[0]]
+            key = _make_key([query.entity_type, other_filters, sorted(query.fields or [])])
+            by_id.setdefault(key, []).append((query, id_filters[0][2]))
+        for grouped in by_id.values():
+            if len(grouped) == 1:
+                requests.append(([grouped[0][0]], None))
+            else:
+                requests.append(([query for query, _ in grouped], [entity_id for _, entity_id in grouped]))
+        return requests
+
+    def _run_requests(self, connection, requests):
+        for queries, ids in requests:
+            query = queries[0]
+            filters = query.filters
+            if ids is not None:
+                filters = [f for f in filters if list(f[:2]) != ["id", "is"]] + [["id", "in", ids]]
+            self._count_round_trip()
+            try:
+                result = connection.find(query.entity_type, filters, query.fields, query.order,
+                                         query.filter_operator, query.limit)
+            except Exception:
+                exc_info = sys.exc_info()
+                for query in queries:
+                    query._set_result(None, exc_info)
+                continue
+            if ids is None:
+                query._set_result(result)
+            else:
+                # fan the results back out to the individual queries:
+                by_id = dict((entity["id"], entity) for entity in result)
+                for query in queries:
+                    entity_id = [f for f in query.filters if list(f[:2]) == ["id", "is"]][0][2]
+                    query._set_result([by_id[entity_id]] if entity_id in by_id else [])
+
+    def _count_round_trip(self):
+        with self._lock:
+            self._stats["round_trips"] += 1
+
+
+def _make_key(query):
+    """
+    :returns: String key for the query, which may contain values (dates, etc.) that
+              can't be serialized to json
+    """
+    return json.dumps(query, sort_keys=True, default=repr)
@@ -0,0 +1,156 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+On-disk cache of the engine's resolved settings so that later starts with
+the same pipeline configuration don't have to resolve them again
+"""
+
+import os
+import json
+import time
+import hashlib
+
+# bump this if the cache format changes:
+CACHE_VERSION = 2
+
+# stored for settings that aren't set in the configuration:
+_MISSING = {"__tk_softimage_missing__": True}
+
+def hash_configuration(paths, extra=None):
+    """
+    Hash the configuration files found at the paths.  Folders are walked
+    recursively.  Only file metadata (path, size and modification time, to
+    the precision the file system keeps) is used so that the configuration
+    doesn't have to be read.
+
+    :param paths: Files and folders to hash
+    :param extra: Additional json-serializable data to include in the hash
+    :returns: (hex digest, number of files hashed)
+    """
+    files = []
+    for root in paths:
+        if not root:
+            continue
+        if os.path.isfile(root):
+            stat = os.stat(root)
+            files.append([root, stat.st_size, stat.st_mtime])
+            continue
+        for dir_path, dir_names, file_names in os.walk(root):
+            dir_names[:] = [d for d in dir_names if not d.startswith(".")]
+            for file_name in file_names:
+                if file_name.startswith("."):
+                    continue
+                file_path = os.path.join(dir_path, file_name)
+                stat = os.stat(file_path)
+                files.append([file_path, stat.st_size, stat.st_mtime])
+    files.sort()
+    return hashlib.sha1(json.dumps([CACHE_VERSION, files, extra])).hexdigest(), len(files)
+
+def _to_str(value):
+    """
+    Convert the unicode strings read back from json to utf-8 strings, as the
+    settings are when they are read from the configuration
+    """
+    if isinstance(value, unicode):
+        return value.encode("utf-8")
+    if isinstance(value, list):
+        return [_to_str(v) for v in value]
+    if isinstance(value, dict):
+        return dict((_to_str(k), _to_str(v)) for k, v in value.items())
+    return value
+
+
+class BootstrapCache(object):
+    """
+    Resolved engine settings, saved to a file and keyed by a hash of the
+    pipeline configuration files.
+
+    Settings are resolved the first time they are requested and remembered.
+    save() writes them to disk; if the configuration hash matches when the
+    cache is next loaded the saved values are used without resolving them.
+    Settings that can't be stored as json are always resolved.
+    """
+
+    def __init__(self, path, key):
+        """
+        :param path: The file to store the cache in
+        :param key: Hash of the configuration the settings were resolved from
+        """
+        self._path = path
+        self._key = key
+        self._settings = {}
+        self._dirty = False
+        self._stats = {"hits": 0, "resolved": 0, "loaded": False, "load_time": None}
+        self._load()
+
+    def get_setting(self, name, default, resolve):
+        """
+        Get a setting, resolving and remembering it if it isn't cached
+
+        :param name: The setting name
+        :param default: Value to return if the setting isn't set
+        :param resolve: Function taking the setting name and a default and
+                        returning the resolved value
+        """
+        if name in self._settings:
+            self._stats["hits"] += 1
+            value = self._settings[name]
+            return default if value == _MISSING else value
+
+        self._stats["resolved"] += 1
+        missing = object()
+        value = resolve(name, missing)
+        try:
+            # (only remember values that will survive being saved)
+            json.dumps(value)
+        except (TypeError, ValueError):
+            return default if value is missing else value
+        self._settings[name] = _MISSING if value is missing else value
+        self._dirty = True
+        return default if value is missing else value
+
+    def save(self):
+        """
+        Write the cache to disk if any settings have been resolved since it was loaded
+        """
+        if not self._dirty:
+            return
+        folder = os.path.dirname(self._path)
+        if not os.path.isdir(folder):
+            os.makedirs(folder)
+        temp_path = "%s.tmp%d" % (self._path, os.getpid())
+        with open(temp_path, "wt") as f:
+            json.dump({"key": self._key, "settings": self._settings}, f)
+        if os.path.exists(self._path):
+            # (rename doesn't replace existing files on Windows)
+            os.remove(self._path)
+        os.rename(temp_path, self._path)
+        self._dirty = False
+
+    def get_stats(self):
+        """
+        :returns: Dictionary with the number of settings served from the cache and
+                  resolved, whether the cache was loaded from disk and how long that took
+        """
+        return dict(self._stats)
+
+    def _load(self):
+        start = time.time()
+        try:
+            with open(self._path, "rt") as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return
+        if data.get("key") != self._key:
+            return
+        self._settings = _to_str(data["settings"])
+        self._stats["loaded"] = True
+        self._stats["load_time"] = time.time() - start
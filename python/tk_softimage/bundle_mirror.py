@@ -0,0 +1,200 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Local mirror of the engine's code for engines installed on network shares.
+
+The engine loads this module on its own, before anything else is imported
+from the tk_softimage package, so it must not import anything from the
+package.
+"""
+
+import os
+import json
+import time
+import shutil
+import hashlib
+import py_compile
+
+# bump this if the mirror layout changes:
+MIRROR_VERSION = 1
+
+# the name of the file recording the content hashes of a complete mirror:
+MANIFEST_NAME = "mirror_manifest.json"
+
+class BundleMirror(object):
+    """
+    Copies folders of a bundle to local disk, compiling the Python modules,
+    so that they can be loaded without reading them from the network.
+
+    Mirrors are stored in a folder named after a hash of the relative path,
+    size and modification time of every source file, so a change to any
+    source file results in a new mirror.  Checking whether the mirror is up
+    to date therefore only needs the file metadata from the network.  The
+    content hash of every file is recorded when it's copied and the local
+    copy is verified against it before it's used.
+
+    A new mirror is built in a temporary folder and renamed into place once
+    complete so that concurrent Softimage sessions never see a partial copy.
+    """
+
+    def __init__(self, source_root, mirror_root, folders=("python", "plugins"), keep=2):
+        """
+        :param source_root: The bundle's disk location
+        :param mirror_root: Folder to store mirrors in
+        :param folders: The folders of the bundle to mirror
+        :param keep: The number of mirrors of the bundle to keep on disk
+        """
+        self.source_root = os.path.normpath(source_root)
+        self._folders = folders
+        self._keep = keep
+        source_key = hashlib.sha1(os.path.normcase(self.source_root)).hexdigest()[:12]
+        self._bundle_root = os.path.join(mirror_root, source_key)
+        self.path = None
+        self._stats = {"source_files": 0, "source_bytes_read": 0, "local_bytes_verified": 0,
+                       "compiled": 0, "warm": None, "duration": None}
+
+    def sync(self):
+        """
+        Make sure an up to date, verified mirror exists
+
+        :returns: The path of the mirror
+        """
+        start = time.time()
+        files = self._scan_source()
+        key = hashlib.sha1(json.dumps([MIRROR_VERSION, files])).hexdigest()[:16]
+        path = os.path.join(self._bundle_root, key)
+
+        self._stats["warm"] = self._verify(path, files)
+        if not self._stats["warm"]:
+            self._build(path, files)
+            self._remove_old_mirrors(path)
+        self.path = path
+        self._stats["duration"] = time.time() - start
+        return path
+
+    def get_path(self, *parts):
+        """
+        :returns: The path of a file in the mirror
+        """
+        return os.path.join(self.path, *parts)
+
+    def get_stats(self):
+        """
+        :returns: Dictionary with the number of source files checked, the bytes read
+                  from the source and verified locally, the number of modules compiled,
+                  whether an existing mirror was used and the time the sync took
+        """
+        return dict(self._stats)
+
+    def _scan_source(self):
+        """
+        :returns: Sorted list of [relative path, size, mtime] for the files to mirror
+        """
+        files = []
+        for folder in self._folders:
+            for dir_path, dir_names, file_names in os.walk(os.path.join(self.source_root, folder)):
+                dir_names[:] = [d for d in dir_names if not d.startswith(".")]
+                for file_name in file_names:
+                    if file_name.endswith((".pyc", ".pyo")) or file_name.startswith("."):
+                        continue
+                    file_path = os.path.join(dir_path, file_name)
+                    stat = os.stat(file_path)
+                    files.append([os.path.relpath(file_path, self.source_root), stat.st_size,
+                                  int(stat.st_mtime)])
+        files.sort()
+        self._stats["source_files"] = len(files)
+        return files
+
+    def _verify(self, path, files):
+        """
+        :returns: True if a complete mirror exists at the path and every file matches
+                  the content hash recorded when it was copied
+        """
+        try:
+            with open(os.path.join(path, MANIFEST_NAME), "rt") as f:
+                hashes = json.load(f)
+        except (IOError, ValueError):
+            return False
+        if sorted(hashes) != [rel_path for rel_path, _, _ in files]:
+            return False
+        for rel_path, content_hash in hashes.items():
+            try:
+                with open(os.path.join(path, rel_path), "rb") as f:
+                    data = f.read()
+            except IOError:
+                return False
+            self._stats["local_bytes_verified"] += len(data)
+            if hashlib.sha1(data).hexdigest() != content_hash:
+                return False
+        return True
+
+    def _build(self, path, files):
+        """
+        Copy and compile the files into a new mirror at the path
+        """
+        temp_path = "%s.tmp%d" % (path, os.getpid())
+        if os.path.exists(temp_path):
+            shutil.rmtree(temp_path)
+        hashes = {}
+        for rel_path, _, _ in files:
+            source_path = os.path.join(self.source_root, rel_path)
+            target_path = os.path.join(temp_path, rel_path)
+            if not os.path.isdir(os.path.dirname(target_path)):
+                os.makedirs(os.path.dirname(target_path))
+            with open(source_path, "rb") as f:
+                data = f.read()
+            self._stats["source_bytes_read"] += len(data)
+            with open(target_path, "wb") as f:
+                f.write(data)
+            # (keep the modification time so that the compiled modules match their source)
+            shutil.copystat(source_path, target_path)
+            hashes[rel_path] = hashlib.sha1(data).hexdigest()
+            if rel_path.endswith(".py"):
+                py_compile.compile(target_path, doraise=True)
+                self._stats["compiled"] += 1
+
+        with open(os.path.join(temp_path, MANIFEST_NAME), "wt") as f:
+            json.dump(hashes, f)
+
+        if os.path.exists(path):
+            # a stale or incomplete mirror, or another session just built the same one:
+            if self._verify(path, files):
+                shutil.rmtree(temp_path, ignore_errors=True)
+                return
+            shutil.rmtree(path, ignore_errors=True)
+        try:
+            os.rename(temp_path, path)
+        except OSError:
+            # another session renamed its copy into place first:
+            shutil.rmtree(temp_path, ignore_errors=True)
+            if not self._verify(path, files):
+                raise
+
+    def _remove_old_mirrors(self, current_path):
+        """
+        Remove all but the most recent mirrors of the bundle.  Mirrors that are in
+        use by another session may fail to be removed and are left for next time.
+        """
+        mirrors = []
+        for name in os.listdir(self._bundle_root):
+            mirror_path = os.path.join(self._bundle_root, name)
+            if mirror_path == current_path or not os.path.isdir(mirror_path):
+                continue
+            mtime = os.path.getmtime(mirror_path)
+            if ".tmp" in name:
+                # another session may still be building this one:
+                if time.time() - mtime > 3600:
+                    shutil.rmtree(mirror_path, ignore_errors=True)
+                continue
+            mirrors.append((mtime, mirror_path))
+        mirrors.sort(reverse=True)
+        for _, mirror_path in mirrors[self._keep - 1:]:
+            shutil.rmtree(mirror_path, ignore_errors=True)
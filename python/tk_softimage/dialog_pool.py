@@ -0,0 +1,219 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Pool of closed app dialogs that can be shown again without rebuilding
+their widget tree
+"""
+
+import time
+from collections import OrderedDict, deque
+
+class _PooledDialog(object):
+    """
+    A dialog and its widget together with the arguments the widget was built with
+    """
+
+    def __init__(self, key, dialog, widget, args, kwargs):
+        self.key = key
+        self.dialog = dialog
+        self.widget = widget
+        self.args = args
+        self.kwargs = kwargs
+        self.released_at = None
+        self.paint_filter = None
+
+
+class DialogPool(object):
+    """
+    Keeps dialogs created through show_dialog and show_modal once they have been
+    closed so that the next request for the same widget class from the same
+    bundle can reuse them.
+
+    Closed dialogs are hidden rather than destroyed and are only reused if the
+    widget would have been constructed with the same arguments.  A widget can
+    implement prepare_for_reuse() to reset its state before it is shown again.
+    At most max_size dialogs are kept, least recently closed first out, and a
+    dialog that has been closed for longer than max_age seconds is destroyed
+    instead of being reused.
+
+    The pool also measures the time from a dialog being requested to its first
+    paint, for pooled and freshly constructed dialogs.
+    """
+
+    def __init__(self, logger, max_size=4, max_age=600.0, history_size=50):
+        """
+        :param logger: The logger to report errors to
+        :param max_size: The maximum number of closed dialogs to keep
+        :param max_age: Seconds a closed dialog is kept for before it is destroyed
+        :param history_size: The number of time-to-first-paint samples to keep
+        """
+        self._logger = logger
+        self._max_size = max_size
+        self._max_age = max_age
+        self._idle = OrderedDict()
+        self._in_use = {}
+        self._stats = {"hits": 0, "misses": 0, "evictions": 0, "expired": 0}
+        self._first_paint = {"pooled": deque(maxlen=history_size), "fresh": deque(maxlen=history_size)}
+
+    def get_dialog(self, key, title, create, args, kwargs):
+        """
+        Get a dialog for a widget, reusing a pooled one if possible
+
+        :param key: (bundle, widget_class) identifying which dialogs can be reused
+        :param title: The window title
+        :param create: Function that creates a new (dialog, widget), taking no arguments
+        :param args: The positional arguments the widget is constructed with
+        :param kwargs: The keyword arguments the widget is constructed with
+        :returns: (dialog, widget)
+        """
+        requested_at = time.time()
+        self._discard_expired()
+        entry = self._take(key, args, kwargs)
+        if entry:
+            self._stats["hits"] += 1
+            entry.dialog.setWindowTitle(title)
+            prepare = getattr(entry.widget, "prepare_for_reuse", None)
+            if prepare:
+                prepare()
+            # the widget may have been closed itself to close the dialog:
+            entry.widget.show()
+            kind = "pooled"
+        else:
+            self._stats["misses"] += 1
+            dialog, widget = create()
+            entry = _PooledDialog(key, dialog, widget, args, kwargs)
+            _set_delete_on_close(dialog, False)
+            kind = "fresh"
+
+        entry.released_at = None
+        self._in_use[id(entry.dialog)] = entry
+        self._watch_first_paint(entry, kind, requested_at)
+        return entry.dialog, entry.widget
+
+    def release(self, dialog):
+        """
+        Return a closed dialog to the pool.  Releasing a dialog more than once,
+        or one that didn't come from the pool, does nothing.
+        """
+        entry = self._in_use.pop(id(dialog), None)
+        if entry is None:
+            return
+        if not _is_valid(entry.dialog):
+            return
+        entry.dialog.hide()
+        entry.released_at = time.time()
+        self._idle[id(entry.dialog)] = entry
+        while len(self._idle) > self._max_size:
+            _, evicted = self._idle.popitem(last=False)
+            self._stats["evictions"] += 1
+            self._dispose(evicted)
+
+    def clear(self):
+        """
+        Destroy all pooled dialogs.  Dialogs that are still open are left alone
+        but will no longer be returned to the pool.
+        """
+        idle = self._idle.values()
+        self._idle = OrderedDict()
+        self._in_use = {}
+        for entry in idle:
+            self._dispose(entry)
+
+    def get_stats(self):
+        """
+        :returns: Dictionary with the number of pool hits, misses, evictions and expired
+                  dialogs, the number of dialogs in the pool and the mean time to first
+                  paint in seconds for pooled and fresh dialogs (None if not measured)
+        """
+        stats = dict(self._stats)
+        stats["idle"] = len(self._idle)
+        for kind, samples in self._first_paint.items():
+            stats["%s_first_paint" % kind] = (sum(samples) / len(samples)) if samples else None
+        return stats
+
+    def _take(self, key, args, kwargs):
+        """
+        Remove and return the most recently closed reusable dialog, or None
+        """
+        for dialog_id, entry in reversed(self._idle.items()):
+            if entry.key != key or entry.args != args or entry.kwargs != kwargs:
+                continue
+            del self._idle[dialog_id]
+            if _is_valid(entry.dialog):
+                return entry
+        return None
+
+    def _discard_expired(self):
+        now = time.time()
+        for dialog_id, entry in self._idle.items():
+            if now - entry.released_at > self._max_age:
+                del self._idle[dialog_id]
+                self._stats["expired"] += 1
+                self._dispose(entry)
+
+    def _dispose(self, entry):
+        """
+        Close and destroy a pooled dialog
+        """
+        if not _is_valid(entry.dialog):
+            return
+        try:
+            entry.widget.close()
+            entry.dialog.close()
+            entry.dialog.deleteLater()
+        except Exception, e:
+            self._logger.debug("Failed to destroy pooled dialog: %s" % e)
+
+    def _watch_first_paint(self, entry, kind, requested_at):
+        """
+        Record the time from the dialog being requested to its next paint event
+        """
+        def on_paint():
+            self._first_paint[kind].append(time.time() - requested_at)
+
+        if entry.paint_filter is None:
+            entry.paint_filter = _create_paint_filter(entry.dialog)
+        entry.paint_filter.on_next_paint = on_paint
+
+
+def _set_delete_on_close(dialog, delete):
+    from sgtk.platform.qt import QtCore
+    dialog.setAttribute(QtCore.Qt.WA_DeleteOnClose, delete)
+
+def _is_valid(widget):
+    """
+    :returns: False if the underlying Qt object has been deleted
+    """
+    try:
+        import shiboken
+    except ImportError:
+        return True
+    return shiboken.isValid(widget)
+
+def _create_paint_filter(dialog):
+    """
+    Install an event filter on the dialog that calls its on_next_paint function,
+    once, the next time the dialog is painted
+    """
+    from sgtk.platform.qt import QtCore
+
+    class PaintFilter(QtCore.QObject):
+        on_next_paint = None
+
+        def eventFilter(self, obj, event):
+            if event.type() == QtCore.QEvent.Paint and self.on_next_paint:
+                callback, self.on_next_paint = self.on_next_paint, None
+                callback()
+            return False
+
+    paint_filter = PaintFilter(dialog)
+    dialog.installEventFilter(paint_filter)
+    return paint_filter
@@ -0,0 +1,149 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Queue used to run app commands outside of the Softimage menu callback
+"""
+
+import time
+from collections import deque
+
+class CommandDispatcher(object):
+    """
+    Runs app commands requested from the Shotgun menu on the next event loop
+    iteration after the menu has closed.
+
+    If a command runs whilst the menu is still open and it triggers an engine
+    restart or menu teardown, Softimage will crash so commands are never run
+    directly from the menu callback.  Instead they are queued and the queue is
+    processed from the Shotgun Qt event loop timer, which Softimage doesn't
+    fire whilst one of its menus is open, and from a Qt timer as a fallback.
+    Qt timers can fire from any Windows message loop, including the one
+    running the menu, so the Qt timer is delayed by DISPATCH_DELAY to give
+    the menu time to close.
+
+    The dispatcher also:
+    - coalesces repeated requests for the same command (e.g. a double-click)
+    - serializes commands so that a command that runs a nested event loop
+      (e.g. a modal dialog) doesn't cause the next command to run inside it
+    - records the latency between a command being queued and it starting
+    """
+
+    # requests for the same command within this many seconds of it last
+    # being dispatched are treated as the same request:
+    COALESCE_INTERVAL = 0.5
+
+    # milliseconds before the queue is processed by the fallback Qt timer:
+    DISPATCH_DELAY = 100
+
+    def __init__(self, logger, profiler=None, watchdog=None, history_size=100):
+        """
+        :param logger: The logger to report command latency and errors to
+        :param profiler: Optional CommandProfiler used to run commands
+        :param watchdog: Optional HangWatchdog to report the running command to
+        :param history_size: The number of latencies to keep
+        """
+        self._logger = logger
+        self._profiler = profiler
+        self._watchdog = watchdog
+        self._queue = deque()
+        self._last_requested = {}
+        self._processing = False
+        self._latencies = deque(maxlen=history_size)
+        self._num_dispatched = 0
+        self._num_coalesced = 0
+
+    def submit(self, app_instance_name, command_name, callback):
+        """
+        Queue a command to be run once control returns to the event loop.
+
+        :param app_instance_name: Name of the app instance the command belongs to (or None)
+        :param command_name: Name of the command
+        :param callback: The command callback
+        :returns: False if the request was coalesced with a previous request, True otherwise
+        """
+        now = time.time()
+        key = (app_instance_name, command_name)
+        last_requested = self._last_requested.get(key)
+        if last_requested is not None and now - last_requested < self.COALESCE_INTERVAL:
+            # (the time isn't updated so that repeated requests can't keep the
+            # command from ever being dispatched again)
+            self._num_coalesced += 1
+            return False
+
+        self._last_requested[key] = now
+        self._queue.append((key, callback, now))
+
+        from sgtk.platform.qt import QtCore
+        QtCore.QTimer.singleShot(self.DISPATCH_DELAY, self.process)
+        return True
+
+    def process(self):
+        """
+        Run all queued commands.  If a command is already running (e.g. this was
+        called from a nested event loop started by the command) then this does
+        nothing and the queued commands will be run once it has finished.
+        """
+        if self._processing:
+            return
+
+        self._processing = True
+        try:
+            while self._queue:
+                (app_instance_name, command_name), callback, queued_at = self._queue.popleft()
+                latency = time.time() - queued_at
+                self._latencies.append(latency)
+                self._num_dispatched += 1
+                self._logger.debug("Running command '%s' after %.1fms in the dispatch queue"
+                                   % (command_name, latency * 1000.0))
+                try:
+                    if self._watchdog:
+                        with self._watchdog.phase("command '%s'" % command_name):
+                            self._run(app_instance_name, command_name, callback, queued_at)
+                    else:
+                        self._run(app_instance_name, command_name, callback, queued_at)
+                except Exception:
+                    self._logger.exception("Failed to run command '%s'" % command_name)
+        finally:
+            self._processing = False
+
+    def _run(self, app_instance_name, command_name, callback, queued_at):
+        if self._profiler:
+            self._profiler.run(app_instance_name, command_name, callback, queued_at)
+        else:
+            callback()
+
+    def clear(self):
+        """
+        Discard all queued commands
+        """
+        self._queue.clear()
+        self._last_requested = {}
+
+    @property
+    def pending(self):
+        """
+        The number of commands waiting to be run
+        """
+        return len(self._queue)
+
+    def get_stats(self):
+        """
+        :returns: Dictionary with the number of commands dispatched and coalesced
+                  and the mean and max queue-to-start latency in seconds
+        """
+        latencies = list(self._latencies)
+        return {
+            "dispatched": self._num_dispatched,
+            "coalesced": self._num_coalesced,
+            "pending": len(self._queue),
+            "mean_latency": (sum(latencies) / len(latencies)) if latencies else None,
+            "max_latency": max(latencies) if latencies else None,
+        }
@@ -0,0 +1,191 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Latency instrumentation for the Qt event loop pump run by the Shotgun Qt
+event loop plug-in
+"""
+
+import time
+from collections import deque
+
+# Qt only has a limited number of user event types so the sentinel event type
+# is registered once per Softimage session.  This module is imported again
+# each time the engine is started so the type is also stored on the
+# QApplication, which outlives the engine:
+_SENTINEL_EVENT_TYPE = None
+_SENTINEL_EVENT_PROPERTY = "tk_softimage_sentinel_event_type"
+
+def _summarise(values):
+    """
+    :returns: Dictionary with the count, mean, median, 95th percentile and max
+              of the values, or just the count if there are no values
+    """
+    values = sorted(values)
+    count = len(values)
+    if not count:
+        return {"count": 0}
+    return {
+        "count": count,
+        "mean": sum(values) / count,
+        "p50": values[count // 2],
+        "p95": values[min(count - 1, int(count * 0.95))],
+        "max": values[-1],
+    }
+
+
+class EventLoopMonitor(object):
+    """
+    Measures how well Qt events are being serviced in Softimage where Qt only
+    gets time when the Shotgun Qt event loop timer fires:
+
+    - timer jitter: how late each timer tick is compared to the registered interval
+    - pump duration: how long processing Qt events takes each tick
+    - dispatch latency: how long an event posted once a tick has finished waits
+      to be delivered, i.e. until the next tick has processed the events queued
+      before it, measured by posting a sentinel event at the end of each tick
+    """
+
+    def __init__(self, history_size=1000, metrics=None):
+        """
+        :param history_size: The number of measurements of each kind to keep
+        :param metrics: Optional MetricsRegistry to record the ticks and measurements in
+        """
+        self._tick_counter = self._pump_histogram = self._latency_histogram = None
+        if metrics:
+            self._tick_counter = metrics.counter("qt_pump_ticks", "Shotgun Qt event loop timer ticks.")
+            self._pump_histogram = metrics.histogram("qt_pump_seconds", "Time spent processing Qt events per tick.")
+            self._latency_histogram = metrics.histogram("qt_dispatch_latency_seconds",
+                                                        "Time posted Qt events wait to be delivered.")
+        self._jitter = deque(maxlen=history_size)
+        self._pump_durations = deque(maxlen=history_size)
+        self._dispatch_latencies = deque(maxlen=history_size)
+        self._last_tick = None
+        self._num_ticks = 0
+        self._started = time.time()
+        self._sentinel_receiver = None
+        self._sentinel_posted_at = None
+
+    def record_timer_tick(self, expected_interval):
+        """
+        Record that the timer has fired.
+
+        :param expected_interval: The interval in seconds the timer was registered with
+        """
+        now = time.time()
+        if self._last_tick is not None and expected_interval:
+            self._jitter.append((now - self._last_tick) - expected_interval)
+        self._last_tick = now
+        self._num_ticks += 1
+        if self._tick_counter:
+            self._tick_counter.inc()
+
+    def record_pump_duration(self, duration):
+        """
+        Record how long it took to process Qt events for a tick
+        """
+        self._pump_durations.append(duration)
+        if self._pump_histogram:
+            self._pump_histogram.observe(duration)
+
+    def post_sentinel(self):
+        """
+        Post a sentinel event to measure how long it takes for posted events to
+        be dispatched.  This should be called once Qt events have been processed
+        for a tick so that the sentinel is delivered by the next one.  Only one
+        sentinel is in flight at a time.
+        """
+        if self._sentinel_posted_at is not None:
+            return
+        from sgtk.platform.qt import QtCore, QtGui
+        if self._sentinel_receiver is None:
+            self._sentinel_receiver = _create_sentinel_receiver(QtCore, QtGui, self._on_sentinel)
+        self._sentinel_posted_at = time.time()
+        QtGui.QApplication.postEvent(self._sentinel_receiver,
+                                     QtCore.QEvent(self._sentinel_receiver.event_type))
+
+    def _on_sentinel(self):
+        if self._sentinel_posted_at is not None:
+            latency = time.time() - self._sentinel_posted_at
+            self._dispatch_latencies.append(latency)
+            if self._latency_histogram:
+                self._latency_histogram.observe(latency)
+            self._sentinel_posted_at = None
+
+    def get_summary(self):
+        """
+        :returns: Dictionary with the number of ticks, the session duration and summaries
+                  (count, mean, p50, p95, max in seconds) of the timer jitter, pump
+                  duration and dispatch latency
+        """
+        return {
+            "ticks": self._num_ticks,
+            "duration": time.time() - self._started,
+            "timer_jitter": _summarise(self._jitter),
+            "pump_duration": _summarise(self._pump_durations),
+            "dispatch_latency": _summarise(self._dispatch_latencies),
+        }
+
+    def format_summary(self):
+        """
+        :returns: The summary as a single line suitable for logging
+        """
+        summary = self.get_summary()
+        parts = ["%d Qt event loop ticks in %.0fs" % (summary["ticks"], summary["duration"])]
+        for name in ("timer_jitter", "pump_duration", "dispatch_latency"):
+            stats = summary[name]
+            if stats["count"]:
+                parts.append("%s mean %.1fms, p95 %.1fms, max %.1fms"
+                             % (name.replace("_", " "), stats["mean"] * 1000.0,
+                                stats["p95"] * 1000.0, stats["max"] * 1000.0))
+        return "; ".join(parts)
+
+    def close(self):
+        """
+        Release the Qt sentinel receiver
+        """
+        if self._sentinel_receiver is not None:
+            self._sentinel_receiver.deleteLater()
+            self._sentinel_receiver = None
+        self._sentinel_posted_at = None
+
+
+def _get_sentinel_event_type(QtCore, QtGui):
+    """
+    :returns: The Qt event type of the sentinel events, registering it if this
+              is the first time it's needed in this Softimage session
+    """
+    global _SENTINEL_EVENT_TYPE
+    if _SENTINEL_EVENT_TYPE is None:
+        app = QtGui.QApplication.instance()
+        value = app.property(_SENTINEL_EVENT_PROPERTY) if app else None
+        if not value:
+            value = QtCore.QEvent.registerEventType()
+            if app:
+                app.setProperty(_SENTINEL_EVENT_PROPERTY, value)
+        _SENTINEL_EVENT_TYPE = QtCore.QEvent.Type(value)
+    return _SENTINEL_EVENT_TYPE
+
+def _create_sentinel_receiver(QtCore, QtGui, callback):
+    """
+    Create a QObject that calls the callback whenever it receives a sentinel event
+    """
+    event_type = _get_sentinel_event_type(QtCore, QtGui)
+
+    class SentinelReceiver(QtCore.QObject):
+        def event(self, event):
+            if event.type() == event_type:
+                callback()
+                return True
+            return QtCore.QObject.event(self, event)
+
+    receiver = SentinelReceiver()
+    receiver.event_type = event_type
+    return receiver
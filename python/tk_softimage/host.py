@@ -0,0 +1,247 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Adapter around the Softimage Application object.
+
+Every attribute access on the Softimage Application is a late-bound COM call
+so all Toolkit code talks to Softimage through a single HostAdapter which
+memoizes values that can't change during a session, resolves the methods it
+needs once and counts the calls it makes so that the COM traffic of each
+engine operation can be inspected.
+"""
+
+import threading
+from contextlib import contextmanager
+
+# severities understood by HostAdapter.log_message
+LOG_INFO = "info"
+LOG_WARNING = "warning"
+LOG_ERROR = "error"
+LOG_VERBOSE = "verbose"
+
+class HostAdapter(object):
+    """
+    Wraps the Softimage Application object.  Use get_host() to get an instance.
+    """
+
+    def __init__(self, application, ui_toolkit, severities):
+        """
+        :param application: The Softimage Application object
+        :param ui_toolkit: The Softimage XSIUIToolkit object
+        :param severities: Dictionary mapping the LOG_* severities to Softimage
+                           siSeverity constants
+        """
+        self._application = application
+        self._ui_toolkit = ui_toolkit
+        self._severities = severities
+        self._invariants = {}
+
+        # method references resolved once rather than on every call:
+        self._log_message = application.LogMessage
+        self._load_plugin = application.LoadPlugin
+        self._unload_plugin = application.UnloadPlugin
+
+        self._counts_lock = threading.Lock()
+        self._call_counts = {}
+        self._operation_counts = {}
+        # (operations are tracked per thread as hosts calls are also made from workers)
+        self._local = threading.local()
+
+    @property
+    def application(self):
+        """
+        The wrapped Softimage Application object.  Prefer the methods on this class
+        where possible as calls made directly on the Application aren't counted.
+        """
+        return self._application
+
+    ##########################################################################################
+    # call counting
+
+    def _count(self, name):
+        with self._counts_lock:
+            self._call_counts[name] = self._call_counts.get(name, 0) + 1
+            operation = getattr(self._local, "operation", None)
+            if operation:
+                op_counts = self._operation_counts.setdefault(operation, {})
+                op_counts[name] = op_counts.get(name, 0) + 1
+
+    @contextmanager
+    def operation(self, name):
+        """
+        Context manager used to attribute the host calls made within it to the
+        named engine operation.  Operations can be nested, in which case calls are
+        attributed to the innermost operation.  Each thread has its own current
+        operation.
+        """
+        previous = getattr(self._local, "operation", None)
+        self._local.operation = name
+        try:
+            yield
+        finally:
+            self._local.operation = previous
+
+    def get_call_counts(self, operation=None):
+        """
+        :param operation: If specified, only return the calls made within this operation
+        :returns: Dictionary of host call name to the number of times it was made
+        """
+        with self._counts_lock:
+            if operation:
+                return dict(self._operation_counts.get(operation, {}))
+            return dict(self._call_counts)
+
+    def get_operation_call_counts(self):
+        """
+        :returns: Dictionary of operation name to the total number of host calls
+                  made within that operation
+        """
+        with self._counts_lock:
+            return dict((op, sum(counts.values())) for op, counts in self._operation_counts.items())
+
+    def reset_call_counts(self):
+        """
+        Reset all call counters
+        """
+        with self._counts_lock:
+            self._call_counts = {}
+            self._operation_counts = {}
+
+    ##########################################################################################
+    # session invariants
+
+    def _get_invariant(self, name, getter):
+        if name not in self._invariants:
+            self._count(name)
+            self._invariants[name] = getter()
+        return self._invariants[name]
+
+    @property
+    def interactive(self):
+        """
+        True if Softimage is running with a UI, False if in batch mode
+        """
+        return self._get_invariant("Interactive", lambda: bool(self._application.Interactive))
+
+    @property
+    def version(self):
+        """
+        The Softimage version string, e.g. '11.0.525.0'
+        """
+        return self._get_invariant("Version", lambda: self._application.Version())
+
+    @property
+    def name(self):
+        """
+        The application name
+        """
+        return self._get_invariant("Name", lambda: self._application.Name)
+
+    @property
+    def full_name(self):
+        """
+        The full path to the Softimage executable
+        """
+        return self._get_invariant("FullName", lambda: self._application.FullName)
+
+    ##########################################################################################
+    # host calls
+
+    def log_message(self, msg, severity=LOG_INFO):
+        """
+        Log a message to the Softimage script history
+        """
+        self._count("LogMessage")
+        self._log_message(msg, self._severities[severity])
+
+    def load_plugin(self, path):
+        self._count("LoadPlugin")
+        return self._load_plugin(path)
+
+    def unload_plugin(self, path):
+        self._count("UnloadPlugin")
+        return self._unload_plugin(path)
+
+    def redraw_ui(self):
+        self._count("RedrawUI")
+        self._application.Desktop.RedrawUI()
+
+    def msg_box(self, msg):
+        """
+        Show a message box using the Softimage UI toolkit
+        """
+        self._count("MsgBox")
+        return self._ui_toolkit.MsgBox(msg)
+
+    def get_layout_views(self):
+        """
+        :returns: The views of the active desktop layout
+        """
+        self._count("ActiveLayout.Views")
+        return self._application.Desktop.ActiveLayout.Views
+
+    def get_active_project_path(self):
+        self._count("ActiveProject.Path")
+        return self._application.ActiveProject.Path
+
+    def create_project(self, path):
+        self._count("CreateProject")
+        return self._application.CreateProject(path)
+
+    def set_active_project(self, path):
+        self._count("ActiveProject")
+        self._application.ActiveProject = path
+
+    def get_scene_name(self):
+        self._count("ActiveScene.Name")
+        return self._application.ActiveProject.ActiveScene.Name
+
+    def get_scene_path(self):
+        """
+        :returns: The path the active scene was saved to, or an empty string if it
+                  hasn't been saved
+        """
+        self._count("ActiveScene.Filename")
+        return self._application.ActiveProject.ActiveScene.Parameters("Filename").Value
+
+    def get_selection_names(self):
+        """
+        :returns: List of the full names of the selected objects
+        """
+        self._count("Selection")
+        return [item.FullName for item in self._application.Selection]
+
+
+class SoftimageHost(HostAdapter):
+    """
+    Host adapter for a running Softimage session
+    """
+
+    def __init__(self):
+        from win32com.client import Dispatch, constants
+        severities = {
+            LOG_INFO: constants.siInfo,
+            LOG_WARNING: constants.siWarning,
+            LOG_ERROR: constants.siError,
+            LOG_VERBOSE: constants.siVerbose,
+        }
+        super(SoftimageHost, self).__init__(Dispatch("XSI.Application").Application,
+                                            Dispatch("XSI.UIToolkit"),
+                                            severities)
+
+
+def get_host():
+    """
+    Create the host adapter for the current Softimage session
+
+    :returns: HostAdapter instance
+    """
+    return SoftimageHost()
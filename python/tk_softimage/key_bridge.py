@@ -0,0 +1,133 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Delivery of the key events forwarded from Softimage to the focused Qt widget
+"""
+
+import time
+
+class _PendingRepeat(object):
+    def __init__(self, key, modifiers, text):
+        self.key = key
+        self.modifiers = modifiers
+        self.text = text
+        self.count = 1
+
+
+class KeyEventBridge(object):
+    """
+    Sends the key events forwarded by the Qt events plug-in to Qt, marking
+    auto-repeats.
+
+    Softimage doesn't say whether a key down event is an auto-repeat, so a
+    key down for a key that is already down is treated as one.  Keys are
+    forgotten when released, or if nothing has been heard from them for
+    stale_timeout seconds in case their release went to Softimage.
+
+    If coalesce is set, consecutive auto-repeats of the same key are held
+    back and sent as a single key press with a count (and the repeated text)
+    when the Qt event loop is next processed, or sooner if another key event
+    arrives.  Widgets that only look at key() will then see one press rather
+    than several, so this is only suitable when that is acceptable, e.g. for
+    widgets that re-filter on every key press.
+    """
+
+    def __init__(self, send, coalesce=False, stale_timeout=1.0):
+        """
+        :param send: Function taking (pressed, key, modifiers, text, auto_repeat, count)
+                     that sends a key event to the focused widget
+        :param coalesce: Coalesce consecutive auto-repeats of the same key
+        :param stale_timeout: Seconds after which a key that is down is forgotten
+        """
+        self._send = send
+        self._coalesce = coalesce
+        self._stale_timeout = stale_timeout
+        self._down = {}
+        self._pending = None
+        self._flush_scheduled = False
+        self._stats = {"presses": 0, "repeats": 0, "coalesced": 0, "sent": 0}
+
+    def key_down(self, key, modifiers, text):
+        """
+        Handle a key down event from Softimage
+        """
+        now = time.time()
+        last_seen = self._down.get(key)
+        auto_repeat = last_seen is not None and now - last_seen < self._stale_timeout
+        self._down[key] = now
+        self._stats["repeats" if auto_repeat else "presses"] += 1
+
+        if auto_repeat and self._coalesce:
+            pending = self._pending
+            if pending and pending.key == key and pending.modifiers == modifiers:
+                pending.count += 1
+                pending.text += text
+                self._stats["coalesced"] += 1
+                return
+            self.flush()
+            self._pending = _PendingRepeat(key, modifiers, text)
+            self._schedule_flush()
+            return
+
+        self.flush()
+        self._deliver(True, key, modifiers, text, auto_repeat, 1)
+
+    def key_up(self, key, modifiers, text):
+        """
+        Handle a key up event from Softimage
+        """
+        self.flush()
+        self._down.pop(key, None)
+        self._deliver(False, key, modifiers, text, False, 1)
+
+    def forget(self, key):
+        """
+        Forget that a key is down without sending anything, e.g. when it was
+        released while Softimage had the focus
+        """
+        self._down.pop(key, None)
+
+    def flush(self):
+        """
+        Send any held back auto-repeats
+        """
+        pending, self._pending = self._pending, None
+        if pending:
+            self._deliver(True, pending.key, pending.modifiers, pending.text, True, pending.count)
+
+    def clear(self):
+        """
+        Drop any held back auto-repeats and forget the keys that are down
+        """
+        self._pending = None
+        self._down = {}
+
+    def get_stats(self):
+        """
+        :returns: Dictionary with the number of key presses, auto-repeats, auto-repeats
+                  coalesced into another event and key events sent to Qt
+        """
+        return dict(self._stats)
+
+    def _deliver(self, pressed, key, modifiers, text, auto_repeat, count):
+        self._stats["sent"] += 1
+        self._send(pressed, key, modifiers, text, auto_repeat, count)
+
+    def _schedule_flush(self):
+        if self._flush_scheduled:
+            return
+        self._flush_scheduled = True
+        from sgtk.platform.qt import QtCore
+        QtCore.QTimer.singleShot(0, self._on_flush_timer)
+
+    def _on_flush_timer(self):
+        self._flush_scheduled = False
+        self.flush()
@@ -0,0 +1,114 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Rate limiting of repeated warning and error messages sent to the Softimage
+script log
+"""
+
+import re
+import time
+import threading
+from collections import OrderedDict
+
+# numbers and addresses that vary between otherwise identical messages:
+_VARIABLE_RE = re.compile(r"0x[0-9a-fA-F]+|\d+(\.\d+)?")
+
+def fingerprint(severity, msg):
+    """
+    :returns: Key identifying messages that only differ by numbers or addresses
+    """
+    return (severity, _VARIABLE_RE.sub("#", msg))
+
+
+class _Entry(object):
+    def __init__(self, now):
+        self.window_start = now
+        self.count = 0
+        self.suppressed = 0
+        self.sample = None
+
+
+class LogLimiter(object):
+    """
+    Limits how often similar messages are logged.
+
+    Messages are grouped by their fingerprint.  At most max_messages of each
+    group are logged per period seconds and the rest are suppressed.  The
+    next message of the group to be logged is annotated with the number of
+    messages suppressed, and pop_suppressed() returns the groups that have
+    suppressed messages that haven't been reported yet.
+    """
+
+    def __init__(self, max_messages=5, period=60.0, max_fingerprints=1000):
+        """
+        :param max_messages: The number of similar messages to log per period
+        :param period: The length of the rate limiting period in seconds
+        :param max_fingerprints: The number of message groups to track
+        """
+        self._max_messages = max_messages
+        self._period = period
+        self._max_fingerprints = max_fingerprints
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"logged": 0, "suppressed": 0}
+
+    def check(self, severity, msg):
+        """
+        Check whether a message should be logged
+
+        :returns: None if the message should be suppressed, otherwise a string to
+                  append to the message - empty unless similar messages were suppressed
+        """
+        key = fingerprint(severity, msg)
+        now = time.time()
+        with self._lock:
+            entry = self._entries.pop(key, None) or _Entry(now)
+            # (most recently used last)
+            self._entries[key] = entry
+            if len(self._entries) > self._max_fingerprints:
+                self._entries.popitem(last=False)
+
+            if now - entry.window_start >= self._period:
+                entry.window_start = now
+                entry.count = 0
+            entry.count += 1
+            if entry.count > self._max_messages:
+                entry.suppressed += 1
+                entry.sample = msg
+                self._stats["suppressed"] += 1
+                return None
+
+            self._stats["logged"] += 1
+            if not entry.suppressed:
+                return ""
+            suppressed, entry.suppressed = entry.suppressed, 0
+            return " (%d similar messages suppressed)" % suppressed
+
+    def pop_suppressed(self):
+        """
+        :returns: List of (severity, most recent message, count) for the messages
+                  suppressed since each group was last logged
+        """
+        with self._lock:
+            suppressed = [(key[0], entry.sample, entry.suppressed)
+                          for key, entry in self._entries.items() if entry.suppressed]
+            for entry in self._entries.values():
+                entry.suppressed = 0
+        return suppressed
+
+    def get_stats(self):
+        """
+        :returns: Dictionary with the number of messages logged and suppressed
+        """
+        with self._lock:
+            stats = dict(self._stats)
+            stats["fingerprints"] = len(self._entries)
+        return stats
@@ -0,0 +1,212 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Cache of path and context lookups shared by all Softimage sessions on the machine
+"""
+
+import os
+import json
+import time
+import sqlite3
+import threading
+
+class LookupCache(object):
+    """
+    Caches the results of lookups such as paths_from_entity or resolving the
+    project template in a sqlite database so that they can be shared between
+    engine instances and Softimage sessions running on the same machine.
+
+    Values are stored as json, keyed on a namespace and a json-serializable key.
+    Entries expire after the ttl, or a shorter ttl for their namespace, and the
+    oldest entries are evicted once the database holds more than max_entries.  Values found are also held in memory
+    so that repeated lookups in the same session don't touch the database.
+
+    Any error accessing the database is treated as a cache miss so a broken or
+    locked cache can never stop a lookup from working.
+    """
+
+    # check whether entries need evicting after this many writes:
+    EVICTION_INTERVAL = 100
+
+    def __init__(self, path, ttl=3600, max_entries=10000, namespace_ttls=None):
+        """
+        :param path: Path to the sqlite database file.  This is created if needed.
+        :param ttl: The number of seconds entries remain valid for
+        :param max_entries: The maximum number of entries to keep in the database
+        :param namespace_ttls: Dictionary of namespace to the number of seconds its
+                               entries remain valid for, if not the ttl.  These
+                               should be shorter than the ttl.
+        """
+        self._path = path
+        self._ttl = ttl
+        self._namespace_ttls = namespace_ttls or {}
+        self._max_entries = max_entries
+        self._lock = threading.Lock()
+        self._connection = None
+        self._memory = {}
+        self._writes_since_eviction = 0
+        self._stats = {"hits": 0, "memory_hits": 0, "misses": 0, "evictions": 0, "errors": 0}
+
+    @property
+    def path(self):
+        return self._path
+
+    def get(self, namespace, key, default=None):
+        """
+        :returns: The cached value or the default if there isn't a valid one
+        """
+        found, value = self._get(namespace, self._encode_key(key))
+        return value if found else default
+
+    def set(self, namespace, key, value):
+        """
+        Store a value in the cache.  The value must be json-serializable.
+        """
+        self._set(namespace, self._encode_key(key), value)
+
+    def get_or_compute(self, namespace, key, compute):
+        """
+        Return the cached value, computing and storing it if it isn't cached.
+        Empty values (None, empty strings, lists and dictionaries) and errors
+        raised by compute aren't stored so that they are computed again next time.
+
+        :param namespace: The type of lookup, e.g. 'paths_from_entity'
+        :param key: json-serializable key for the lookup
+        :param compute: Function that computes the value
+        """
+        encoded_key = self._encode_key(key)
+        found, value = self._get(namespace, encoded_key)
+        if found:
+            return value
+        value = compute()
+        if value is not None and value != "" and value != [] and value != {}:
+            self._set(namespace, encoded_key, value)
+        return value
+
+    def clear(self):
+        """
+        Remove all entries from the cache
+        """
+        with self._lock:
+            self._memory = {}
+            try:
+                connection = self._get_connection()
+                with connection:
+                    connection.execute("DELETE FROM entries")
+            except (sqlite3.Error, OSError):
+                self._stats["errors"] += 1
+
+    def get_stats(self):
+        """
+        :returns: Dictionary with the number of hits (from the database and from memory),
+                  misses, evictions and errors, and the hit rate
+        """
+        stats = dict(self._stats)
+        lookups = stats["hits"] + stats["memory_hits"] + stats["misses"]
+        stats["hit_rate"] = (float(stats["hits"] + stats["memory_hits"]) / lookups) if lookups else None
+        return stats
+
+    def close(self):
+        """
+        Close the database connection
+        """
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+    def _encode_key(self, key):
+        return json.dumps(key, sort_keys=True)
+
+    def _get(self, namespace, encoded_key):
+        """
+        :returns: Tuple (found, value)
+        """
+        now = time.time()
+        ttl = self._namespace_ttls.get(namespace, self._ttl)
+        with self._lock:
+            memory_key = (namespace, encoded_key)
+            if memory_key in self._memory:
+                value, expires = self._memory[memory_key]
+                if expires > now:
+                    self._stats["memory_hits"] += 1
+                    return True, value
+                del self._memory[memory_key]
+
+            try:
+                row = self._get_connection().execute(
+                    "SELECT value, created FROM entries WHERE namespace = ? AND key = ?",
+                    (namespace, encoded_key)).fetchone()
+            except (sqlite3.Error, OSError):
+                self._stats["errors"] += 1
+                row = None
+
+            if row is None or row[1] + ttl <= now:
+                self._stats["misses"] += 1
+                return False, None
+
+            value = json.loads(row[0])
+            self._memory[memory_key] = (value, row[1] + ttl)
+            self._stats["hits"] += 1
+            return True, value
+
+    def _set(self, namespace, encoded_key, value):
+        now = time.time()
+        ttl = self._namespace_ttls.get(namespace, self._ttl)
+        with self._lock:
+            if len(self._memory) >= self._max_entries:
+                self._memory = {}
+            self._memory[(namespace, encoded_key)] = (value, now + ttl)
+            try:
+                connection = self._get_connection()
+                with connection:
+                    connection.execute("INSERT OR REPLACE INTO entries (namespace, key, value, created) "
+                                       "VALUES (?, ?, ?, ?)", (namespace, encoded_key, json.dumps(value), now))
+                self._writes_since_eviction += 1
+                if self._writes_since_eviction >= self.EVICTION_INTERVAL:
+                    self._evict(connection, now)
+            except (sqlite3.Error, OSError, TypeError, ValueError):
+                self._stats["errors"] += 1
+
+    def _evict(self, connection, now):
+        """
+        Remove expired entries and then the oldest entries above max_entries
+        """
+        self._writes_since_eviction = 0
+        with connection:
+            cursor = connection.execute("DELETE FROM entries WHERE created <= ?", (now - self._ttl,))
+            evicted = cursor.rowcount
+            cursor = connection.execute("DELETE FROM entries WHERE rowid NOT IN "
+                                        "(SELECT rowid FROM entries ORDER BY created DESC LIMIT ?)",
+                                        (self._max_entries,))
+            evicted += cursor.rowcount
+        self._stats["evictions"] += max(0, evicted)
+
+    def _get_connection(self):
+        """
+        Open the database the first time it is needed.  Must be called with the lock held.
+        """
+        if self._connection is None:
+            folder = os.path.dirname(self._path)
+            if folder and not os.path.exists(folder):
+                os.makedirs(folder)
+            # the connection is shared by all threads but is only ever used with the
+            # lock held.  Other processes are kept out by sqlite's own file locking:
+            connection = sqlite3.connect(self._path, timeout=5.0, check_same_thread=False)
+            try:
+                connection.execute("PRAGMA journal_mode=WAL")
+            except sqlite3.Error:
+                pass
+            with connection:
+                connection.execute("CREATE TABLE IF NOT EXISTS entries (namespace TEXT, key TEXT, value TEXT, "
+                                   "created REAL, PRIMARY KEY (namespace, key))")
+            self._connection = connection
+        return self._connection
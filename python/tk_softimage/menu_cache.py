@@ -0,0 +1,106 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+On-disk cache of the Shotgun menu layout so that the first menu open of a
+session doesn't have to evaluate every enable_callback and group every app
+"""
+
+import os
+import json
+import hashlib
+
+# bump this if the layout format changes:
+CACHE_VERSION = 2
+
+class MenuCache(object):
+    """
+    Stores the computed menu layout for a single pipeline configuration,
+    environment and context.
+
+    The layout is a dictionary containing the context name, the favourite,
+    context menu and per-app command names, and the enabled state of every
+    command the last time the menu was built.  It is discarded if the
+    configuration has changed since it was saved.
+    """
+
+    def __init__(self, cache_root, key, get_configuration_hash=None):
+        """
+        :param cache_root: Folder to store the cache file in
+        :param key: String identifying the pipeline configuration, environment and context
+        :param get_configuration_hash: Function returning the (hash, number of files) of
+                                       the configuration files, including those included
+                                       by the environment, used to invalidate the cache
+                                       (see hash_configuration).  It is passed wait=False
+                                       when the cache is loaded, and may return None if
+                                       the hash isn't ready yet, in which case the cache
+                                       isn't used.
+        """
+        file_name = "%s.json" % hashlib.sha1(key.encode("utf-8")).hexdigest()
+        self._path = os.path.join(cache_root, "menu_snapshots", file_name)
+        self._get_configuration_hash = get_configuration_hash
+
+    @property
+    def path(self):
+        return self._path
+
+    def _configuration_hash(self, wait):
+        """
+        :returns: The configuration hash, None if the cache doesn't depend on the
+                  configuration or False if the hash isn't ready yet
+        """
+        if self._get_configuration_hash is None:
+            return None
+        configuration_hash = self._get_configuration_hash(wait=wait)
+        return configuration_hash[0] if configuration_hash else False
+
+    def load(self):
+        """
+        :returns: The cached menu layout or None if there isn't a valid one
+        """
+        configuration_hash = self._configuration_hash(wait=False)
+        if configuration_hash is False:
+            return None
+        try:
+            with open(self._path) as fh:
+                data = json.load(fh)
+        except (IOError, OSError, ValueError):
+            return None
+
+        if data.get("version") != CACHE_VERSION:
+            return None
+        if data.get("configuration") != configuration_hash:
+            return None
+        return data.get("layout")
+
+    def save(self, layout):
+        """
+        Write the menu layout to disk.  Failures are ignored - the menu
+        will just be built from scratch next time.
+        """
+        data = {
+            "version": CACHE_VERSION,
+            "configuration": self._configuration_hash(wait=True),
+            "layout": layout,
+        }
+        tmp_path = "%s.%d.tmp" % (self._path, os.getpid())
+        try:
+            folder = os.path.dirname(self._path)
+            if not os.path.exists(folder):
+                os.makedirs(folder)
+            with open(tmp_path, "w") as fh:
+                json.dump(data, fh)
+            if os.path.exists(self._path):
+                # (os.rename won't replace an existing file on Windows)
+                os.remove(self._path)
+            os.rename(tmp_path, self._path)
+        except (IOError, OSError):
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
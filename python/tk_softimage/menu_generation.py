@@ -15,16 +15,143 @@ Menu handling for Softimage
 import platform
 import sys
 import os
+import threading
+import functools
 
 import sgtk
 
+class ContextSnapshot(object):
+    """
+    Precomputed, per-context information needed by the context menu.
+
+    Computing the display name of a context and the file system locations
+    for the context entity can be expensive so these, and the Shotgun detail
+    url, are resolved once per context and then served from this snapshot.
+    """
+
+    def __init__(self, engine, context):
+        self._engine = engine
+        self._context = context
+        self._values = {}
+        # one lock per value so that a slow lookup running in the background
+        # never blocks access to one of the other values:
+        self._locks = dict((name, threading.Lock()) for name in ("display_name", "shotgun_url", "fs_paths"))
+
+    @property
+    def context(self):
+        """
+        The context this snapshot was built for
+        """
+        return self._context
+
+    @property
+    def display_name(self):
+        """
+        The display name of the context, as used for the context menu label
+        """
+        return self._resolve("display_name", lambda: str(self._context))
+
+    @property
+    def shotgun_url(self):
+        """
+        The Shotgun detail page url for the context entity (or project)
+        """
+        def _build_url():
+            entity = self._context.entity or self._context.project
+            # (the site url is read from the configuration rather than the Shotgun
+            # connection, which is per thread, so no connection is made from workers)
+            return "%s/detail/%s/%d" % (self._engine.sgtk.shotgun_url, entity["type"], entity["id"])
+        return self._resolve("shotgun_url", _build_url)
+
+    @property
+    def fs_paths(self):
+        """
+        The list of file system locations for the context entity (or project)
+        """
+        def _find_paths():
+            entity = self._context.entity or self._context.project
+            return self._engine.cached_lookup("paths_from_entity", [entity["type"], entity["id"]],
+                                              lambda: self._engine.sgtk.paths_from_entity(entity["type"], entity["id"]))
+        return list(self._resolve("fs_paths", _find_paths))
+
+    def seed_display_name(self, display_name):
+        """
+        Use a previously computed display name (e.g. from the menu cache) until the
+        real one has been resolved.
+        """
+        with self._locks["display_name"]:
+            self._values.setdefault("display_name", display_name)
+
+    def _resolve(self, name, resolver):
+        """
+        Return the named value, resolving it with the resolver the first time
+        it is requested.
+        """
+        with self._locks[name]:
+            if name not in self._values:
+                self._values[name] = resolver()
+            return self._values[name]
+
+    def warm(self):
+        """
+        Resolve everything held by the snapshot.  Safe to call from a
+        background thread - any failures are logged and the value in question
+        will be resolved again on first use.
+        """
+        for name in ("display_name", "shotgun_url", "fs_paths"):
+            try:
+                getattr(self, name)
+            except Exception, e:
+                # (use the python logger as log_debug talks to Softimage which
+                # isn't safe to do from a background thread)
+                self._engine.logger.debug("Failed to precompute context %s: %s" % (name, e))
+
+
 class MenuGenerator(object):
     """
     Menu generation functionality for Softimage
     """
 
-    def __init__(self, engine):
+    def __init__(self, engine, menu_cache=None):
+        """
+        :param engine: The engine the menu is for
+        :param menu_cache: Optional MenuCache used to make the first menu open fast
+        """
         self._engine = engine
+        self._context_snapshot = None
+        self._snapshot_lock = threading.Lock()
+        self._menu_cache = menu_cache
+        self._cached_layout = None
+        self._menu_created = False
+        self._lazy_app_menus = engine.get_setting("lazy_app_menus", True)
+
+    ##########################################################################################
+    # context snapshot
+
+    def get_context_snapshot(self):
+        """
+        Return the snapshot for the current engine context, creating a new
+        one if the context has changed since the last one was built.
+
+        :returns: ContextSnapshot instance or None if the engine has no context
+        """
+        ctx = self._engine.context
+        if not ctx:
+            return None
+        with self._snapshot_lock:
+            if self._context_snapshot is None or self._context_snapshot.context is not ctx:
+                self._context_snapshot = ContextSnapshot(self._engine, ctx)
+            return self._context_snapshot
+
+    def warm_context_snapshot(self):
+        """
+        Precompute the context snapshot in a background thread so that the first
+        menu open and the first 'Jump to...' don't pay for it on the main thread.
+        """
+        snapshot = self.get_context_snapshot()
+        if not snapshot:
+            return
+        self._engine.submit_task(snapshot.warm)
 
     ##########################################################################################
     # public methods
@@ -37,102 +164,207 @@ class MenuGenerator(object):
 
         By passing the globals() dictionary from the Python Script running in Softimage, we can
         register the callbacks for each Menu handler in the local name space for the Self Installing Plugin
+
+        The first time the menu is opened, it is rendered from the layout cached on disk by a
+        previous session (if there is one) so that it opens instantly.  The live layout is then
+        computed once the menu has closed and is used from then on.
         """
         self._menu_handle = menu_handle
 
-        # add the context item on top of the main menu
-        if self._engine.context:
-            self._context_menu = self._add_context_menu()
-
         # enumerate all items and create menu objects for them
-        menu_items = []
-        for (cmd_name, cmd_details) in self._engine.commands.items():
-             menu_items.append( AppCommand(cmd_name, cmd_details))
+        commands = self._get_commands()
+
+        layout = None
+        if not self._menu_created and self._menu_cache:
+            layout = self._menu_cache.load()
+            if layout:
+                self._engine.log_debug("Building Shotgun menu from the cached layout in '%s'"
+                                       % self._menu_cache.path)
+                self._cached_layout = layout
+                # bring the cache up to date once the menu has closed:
+                self._engine.run_in_main_thread(self._reconcile_menu_cache)
+        if not layout:
+            layout = self._build_layout(commands)
+            self._update_menu_cache(layout)
+
+        self._menu_created = True
+        self._render_layout(layout, commands)
+
+    ##########################################################################################
+    # menu layout
+
+    def _build_layout(self, commands):
+        """
+        Compute the layout of the menu from the current commands.  The layout only contains
+        basic types so that it can be cached to disk.
+
+        :param commands: Dictionary of command name to AppCommand
+        :returns: Dictionary containing the context name, the names of the favourite and context
+                  menu commands, a list of (app name, command names) for each app in the order
+                  they should appear on the menu and the enabled state of each command
+        """
+        context_snapshot = self.get_context_snapshot()
+        layout = {
+            "context_name": context_snapshot.display_name if context_snapshot else None,
+            "favourites": [],
+            "context_commands": [],
+            "apps": [],
+            "enabled": {},
+        }
 
         # now add favourites
-        menu_has_favourites = False
         for fav in self._engine.get_setting("menu_favourites"):
             app_instance_name = fav["app_instance"]
             menu_name = fav["name"]
             # scan through all menu items
-            for cmd in menu_items:
-                 if cmd.get_app_instance_name() == app_instance_name and cmd.name == menu_name:
-                     if not menu_has_favourites:
-                         # add separator:
-                         self._menu_handle.AddSeparatorItem() 
-                         menu_has_favourites = True
-                     
-                     # found our match!
-                     cmd.add_command_to_menu(self._menu_handle)
-                     # mark as a favourite item
-                     cmd.favourite = True
+            for cmd in commands.values():
+                if cmd.get_app_instance_name() == app_instance_name and cmd.name == menu_name:
+                    # found our match!
+                    layout["favourites"].append(cmd.name)
 
         # now go through all of the menu items and
         # separate them out into various sections
         commands_by_app = {}
-        context_menu_has_commands = False
-        for cmd in menu_items:
+        for cmd in commands.values():
             if cmd.get_type() == "context_menu":
                 # add this command to the context menu
-                if not context_menu_has_commands:
-                    # add separator:
-                    self._context_menu.AddSeparatorItem()                    
-                    context_menu_has_commands = True
-                cmd.add_command_to_menu(self._context_menu)
+                layout["context_commands"].append(cmd.name)
             else:
                 # add to list for the main menu:
                 app_name = cmd.get_app_name() or "Other Items" # un-parented app 
                 if not app_name in commands_by_app:
                     commands_by_app[app_name] = []
-                commands_by_app[app_name].append(cmd)
+                commands_by_app[app_name].append(cmd.name)
+
+        layout["apps"] = [[app_name, commands_by_app[app_name]] for app_name in sorted(commands_by_app.keys())]
+
+        # evaluate the enable callbacks for the commands that are visible when the menu is
+        # opened.  Commands in app sub-menus are evaluated when the sub-menu is expanded
+        # unless sub-menus are populated up-front:
+        visible = set(layout["favourites"]) | set(layout["context_commands"])
+        for app_name, cmd_names in layout["apps"]:
+            if len(cmd_names) == 1 or not self._lazy_app_menus:
+                visible.update(cmd_names)
+        for cmd_name in visible:
+            layout["enabled"][cmd_name] = commands[cmd_name].is_enabled()
+        return layout
+
+    def _render_layout(self, layout, commands):
+        """
+        Add the items in the layout to the menu.
+
+        :param layout: Layout as returned by _build_layout
+        :param commands: Dictionary of command name to AppCommand
+        """
+        enabled = layout["enabled"]
+
+        # add the context item on top of the main menu
+        self._context_menu = None
+        context_snapshot = self.get_context_snapshot()
+        if context_snapshot:
+            if layout.get("context_name"):
+                context_snapshot.seed_display_name(layout["context_name"])
+            self._context_menu = self._add_context_menu(context_snapshot)
+
+        # now add favourites
+        menu_has_favourites = False
+        for cmd_name in layout["favourites"]:
+            cmd = commands.get(cmd_name)
+            if not cmd:
+                continue
+            if not menu_has_favourites:
+                # add separator:
+                self._menu_handle.AddSeparatorItem() 
+                menu_has_favourites = True
+            cmd.add_command_to_menu(self._menu_handle, enabled.get(cmd_name))
+            # mark as a favourite item
+            cmd.favourite = True
+
+        # add context menu commands
+        if self._context_menu:
+            context_menu_has_commands = False
+            for cmd_name in layout["context_commands"]:
+                cmd = commands.get(cmd_name)
+                if not cmd:
+                    continue
+                if not context_menu_has_commands:
+                    # add separator:
+                    self._context_menu.AddSeparatorItem()                    
+                    context_menu_has_commands = True
+                cmd.add_command_to_menu(self._context_menu, enabled.get(cmd_name))
+
+        commands_by_app = []
+        for app_name, cmd_names in layout["apps"]:
+            app_commands = [commands[cmd_name] for cmd_name in cmd_names if cmd_name in commands]
+            if app_commands:
+                commands_by_app.append((app_name, app_commands))
 
         if commands_by_app:
             # add separator:
             self._menu_handle.AddSeparatorItem()
             # now add all apps to main menu 
-            self._add_app_menu(commands_by_app)
+            self._add_app_menu(commands_by_app, enabled)
+
+    def _reconcile_menu_cache(self):
+        """
+        Recompute the menu layout from the live commands and update the cache
+        """
+        self._update_menu_cache(self._build_layout(self._get_commands()))
+
+    def _get_commands(self):
+        """
+        :returns: Dictionary of command name to AppCommand for all of the engine's commands
+        """
+        commands = {}
+        for (cmd_name, cmd_details) in self._engine.commands.items():
+            cmd = AppCommand(cmd_name, cmd_details, self._engine.command_dispatcher)
+            app_instance_name = cmd.get_app_instance_name()
+            if app_instance_name and self._engine.is_out_of_process_app(app_instance_name):
+                # run the command in a child process rather than in Softimage:
+                cmd.callback = functools.partial(self._engine.run_command_out_of_process,
+                                                 app_instance_name, cmd_name)
+            commands[cmd_name] = cmd
+        return commands
+
+    def _update_menu_cache(self, layout):
+        """
+        Write the layout to the menu cache in the background if it has changed
+        """
+        if not self._menu_cache or layout == self._cached_layout:
+            return
+        self._cached_layout = layout
+        self._engine.submit_task(self._menu_cache.save, layout)
 
     ##########################################################################################
     # context menu and UI
 
-    def _add_context_menu(self):
+    def _add_context_menu(self, context_snapshot):
         """
         Adds a context menu which displays the current context
         """
-        ctx = self._engine.context
-        ctx_name = str(ctx)
-
         # create the sub menu object
-        ctx_menu = self._menu_handle.AddSubMenu(ctx_name)
-        ctx_menu.AddCallbackItem("Jump to Shotgun", lambda: self._jump_to_sg(self._menu_handle))
-        ctx_menu.AddCallbackItem("Jump to File System", self._jump_to_fs)
+        ctx_menu = self._menu_handle.AddSubMenu(context_snapshot.display_name)
+        ctx_menu.AddCallbackItem("Jump to Shotgun", lambda: self._jump_to_sg(context_snapshot))
+        ctx_menu.AddCallbackItem("Jump to File System", lambda: self._jump_to_fs(context_snapshot))
+
+        if self._engine.command_profiler.enabled:
+            ctx_menu.AddSeparatorItem()
+            ctx_menu.AddCallbackItem("Write Command Profile Report", self._engine.dump_command_profile)
 
         return ctx_menu
 
-    def _jump_to_sg(self, ctx):
+    def _jump_to_sg(self, context_snapshot):
+        """
+        Jump from context to Shotgun
+        """
         import webbrowser
-        if self._engine.context.entity is None:
-            # project-only!
-            url = "%s/detail/%s/%d" % (self._engine.shotgun.base_url,
-                                       "Project",
-                                       self._engine.context.project["id"])
-        else:
-            # entity-based
-            url = "%s/detail/%s/%d" % (self._engine.shotgun.base_url,
-                                       self._engine.context.entity["type"],
-                                       self._engine.context.entity["id"])
-        webbrowser.open(url)
-
-    def _jump_to_fs(self):
+        webbrowser.open(context_snapshot.shotgun_url)
+
+    def _jump_to_fs(self, context_snapshot):
         """
         Jump from context to FS
         """
-        if self._engine.context.entity:
-            paths = self._engine.sgtk.paths_from_entity(self._engine.context.entity["type"],
-                                                     self._engine.context.entity["id"])
-        else:
-            paths = self._engine.sgtk.paths_from_entity(self._engine.context.project["type"],
-                                                     self._engine.context.project["id"])
+        paths = context_snapshot.fs_paths
 
         # launch one window for each location on disk
         # todo: can we do this in a more elegant way?
@@ -157,37 +389,58 @@ class MenuGenerator(object):
 
     ##########################################################################################
     # app menus
-    def _add_app_menu(self, commands_by_app):
+    def _add_app_menu(self, commands_by_app, enabled):
         """
         Add all apps to the main menu, process them one by one.
+
+        :param commands_by_app: List of (app name, list of AppCommand) in menu order
+        :param enabled: Dictionary of command name to enabled state
         """
-        for app_name in sorted(commands_by_app.keys()):
-            if len(commands_by_app[app_name]) > 1:
+        for app_name, app_commands in commands_by_app:
+            if len(app_commands) > 1:
                 # more than one menu entry for this app
                 # make a sub menu and put all items in the sub menu
-                sub_menu = self._menu_handle.AddSubMenu(app_name)
-                for cmd in commands_by_app[app_name]:
-                    cmd.add_command_to_menu(sub_menu)
+                if self._lazy_app_menus and hasattr(self._menu_handle, "AddDynamicSubMenu"):
+                    # only create the items when the sub-menu is expanded:
+                    num_enable_callbacks = len([cmd for cmd in app_commands if cmd.name not in enabled
+                                                and "enable_callback" in cmd.properties])
+                    self._menu_handle.AddDynamicSubMenu(app_name, self._make_app_menu_populator(app_commands),
+                                                        len(app_commands), num_enable_callbacks)
+                else:
+                    sub_menu = self._menu_handle.AddSubMenu(app_name)
+                    for cmd in app_commands:
+                        cmd.add_command_to_menu(sub_menu, enabled.get(cmd.name))
             else:
                 # this app only has a single entry.
                 # display that on the menu
                 # todo: Should this be labelled with the name of the app
                 # or the name of the menu item? Not sure.
-                cmd_obj = commands_by_app[app_name][0]
+                cmd_obj = app_commands[0]
                 if not cmd_obj.favourite:
                     # skip favourites since they are alreay on the menu
-                    cmd_obj.add_command_to_menu(self._menu_handle)
+                    cmd_obj.add_command_to_menu(self._menu_handle, enabled.get(cmd_obj.name))
+
+
+    def _make_app_menu_populator(self, app_commands):
+        """
+        :returns: Function that adds the commands to an app sub-menu when it is expanded
+        """
+        def populate(sub_menu):
+            for cmd in app_commands:
+                cmd.add_command_to_menu(sub_menu)
+        return populate
 
 
 class AppCommand(object):
     """
     Wraps around a single command that you get from engine.commands
     """
-    def __init__(self, name, command_dict):
+    def __init__(self, name, command_dict, dispatcher):
         self.name = name
         self.properties = command_dict["properties"]
         self.callback = command_dict["callback"]
         self.favourite = False
+        self._dispatcher = dispatcher
 
     def get_app_name(self):
         """
@@ -221,20 +474,36 @@ class AppCommand(object):
         """
         return self.properties.get("type", "default")
 
-    def add_command_to_menu(self, menu):
+    def is_enabled(self):
         """
-        Adds an app command to the menu
+        Returns the result of the command's enable_callback, or True if it doesn't have one
         """
-        enabled = True
-
         if "enable_callback" in self.properties:
-            enabled = self.properties["enable_callback"]()
+            return bool(self.properties["enable_callback"]())
+        return True
+
+    def add_command_to_menu(self, menu, enabled=None):
+        """
+        Adds an app command to the menu
+
+        :param menu: The menu to add the command to
+        :param enabled: Whether the menu item is enabled.  If not specified, this is
+                        determined by calling the command's enable_callback
+        """
+        if enabled is None:
+            enabled = self.is_enabled()
 
         # If the callback triggers an engine restart / menu teardown while the menu is still open
         # (or a Toolkit app returns from its execution and the menu has been deleted), Softimage will crash.
-        # Possible workaround is to use QTimer.singleShot, which requires PySide and a running Qt event loop.
-        # Using singleShot defers execution until events are processed again.  A modal dialog will block events
-        # and if the modal causes a menu teardown the crash ensues.
-        from sgtk.platform.qt import QtCore
-        menu_item = menu.AddCallbackItem(self.name, lambda: QtCore.QTimer.singleShot(100, self.callback))
+        # To avoid this, the command is queued with the engine's command dispatcher which runs it
+        # once control returns to the event loop after the menu has closed.  Commands run through
+        # the dispatcher are serialized so a modal dialog shown by one command can't cause another
+        # to run whilst it's open.
+        menu_item = menu.AddCallbackItem(self.name, self._on_menu_item_clicked)
         menu_item.Enabled = enabled
+
+    def _on_menu_item_clicked(self):
+        """
+        Queue the command to be run once the menu has closed
+        """
+        self._dispatcher.submit(self.get_app_instance_name(), self.name, self.callback)
@@ -0,0 +1,383 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Engine counters, gauges and histograms, and their export to an OpenMetrics
+text file or a statsd server
+"""
+
+import os
+import time
+import socket
+import bisect
+import thread
+from collections import deque
+
+# histogram buckets for durations in seconds:
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# the most histogram observations sent to statsd per export:
+_MAX_STATSD_SAMPLES = 100
+
+# keep statsd packets small enough not to be fragmented:
+_MAX_STATSD_PACKET = 512
+
+
+class Counter(object):
+    """
+    A value that only goes up
+    """
+    __slots__ = ("name", "help", "value")
+    kind = "counter"
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def inc(self, amount=1):
+        self.value += amount
+
+
+class Gauge(object):
+    """
+    A value that can go up and down
+    """
+    __slots__ = ("name", "help", "value")
+    kind = "gauge"
+
+    def __init__(self, name, help):
+        self.name = name
+        self.help = help
+        self.value = 0
+
+    def set(self, value):
+        self.value = value
+
+    def inc(self, amount=1):
+        self.value += amount
+
+    def dec(self, amount=1):
+        self.value -= amount
+
+
+class Histogram(object):
+    """
+    Counts of observed values in fixed buckets, with their sum.  The most
+    recent observations are also kept if samples is set, for exporters that
+    need them.
+    """
+    __slots__ = ("name", "help", "buckets", "counts", "sum", "count", "samples")
+    kind = "histogram"
+
+    def __init__(self, name, help, buckets=DURATION_BUCKETS, samples=0):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(sorted(buckets))
+        # (the last count is for values above the largest bucket)
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+        self.samples = deque(maxlen=samples) if samples else None
+
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+        if self.samples is not None:
+            self.samples.append(value)
+
+    def time(self):
+        """
+        :returns: Context manager that observes the time taken by its block
+        """
+        return _Timer(self)
+
+
+class _Timer(object):
+    __slots__ = ("_histogram", "_start")
+
+    def __init__(self, histogram):
+        self._histogram = histogram
+
+    def __enter__(self):
+        self._start = time.time()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._histogram.observe(time.time() - self._start)
+        return False
+
+
+class _Collected(object):
+    """
+    A counter or gauge whose value is read from a function when the metrics are collected
+    """
+    __slots__ = ("name", "help", "kind", "read")
+
+    def __init__(self, name, help, kind, read):
+        self.name = name
+        self.help = help
+        self.kind = kind
+        self.read = read
+
+    @property
+    def value(self):
+        return self.read()
+
+
+class MetricsRegistry(object):
+    """
+    The engine's metrics.
+
+    Updating a metric is a plain attribute update so that the main thread
+    can be instrumented permanently.  Metrics are not locked, so they
+    should only be updated from the main thread; stats kept elsewhere (e.g.
+    by other threads) can be exposed with add_collected, which reads them
+    whenever the metrics are collected.
+    """
+
+    def __init__(self, prefix="tk_softimage", keep_samples=0):
+        """
+        :param prefix: Prefix for the metric names
+        :param keep_samples: The number of recent observations each histogram keeps
+        """
+        self._prefix = prefix
+        self._keep_samples = keep_samples
+        self._metrics = {}
+
+    def counter(self, name, help=""):
+        """
+        :returns: The Counter with the name, creating it if needed
+        """
+        return self._metrics.get(name) or self._add(name, Counter(self._full_name(name), help))
+
+    def gauge(self, name, help=""):
+        """
+        :returns: The Gauge with the name, creating it if needed
+        """
+        return self._metrics.get(name) or self._add(name, Gauge(self._full_name(name), help))
+
+    def histogram(self, name, help="", buckets=DURATION_BUCKETS):
+        """
+        :returns: The Histogram with the name, creating it if needed
+        """
+        return self._metrics.get(name) or self._add(name, Histogram(self._full_name(name), help, buckets,
+                                                                    self._keep_samples))
+
+    def add_collected(self, name, kind, read, help=""):
+        """
+        Add a counter or gauge whose value is read from a function when the
+        metrics are collected
+
+        :param kind: "counter" or "gauge"
+        :param read: Function returning the current value.  Errors are ignored.
+        """
+        self._add(name, _Collected(self._full_name(name), help, kind, read))
+
+    def collect(self, clear_samples=False):
+        """
+        :param clear_samples: Clear the observations kept by the histograms
+        :returns: List of (metric, value) sorted by name, where value is the counter or
+                  gauge value or a (bucket counts, sum, count, samples) tuple for histograms
+        """
+        collected = []
+        for _, metric in sorted(self._metrics.items()):
+            if metric.kind == "histogram":
+                samples = list(metric.samples) if metric.samples is not None else []
+                if clear_samples and metric.samples is not None:
+                    metric.samples.clear()
+                collected.append((metric, (list(metric.counts), metric.sum, metric.count, samples)))
+                continue
+            try:
+                value = metric.value
+            except Exception:
+                continue
+            if value is not None:
+                collected.append((metric, value))
+        return collected
+
+    def get_values(self):
+        """
+        :returns: Dictionary of metric name to the counter or gauge value or, for
+                  histograms, a dictionary with the count and sum
+        """
+        values = {}
+        for metric, value in self.collect():
+            if metric.kind == "histogram":
+                value = {"count": value[2], "sum": value[1]}
+            values[metric.name] = value
+        return values
+
+    def _full_name(self, name):
+        return "%s_%s" % (self._prefix, name)
+
+    def _add(self, name, metric):
+        self._metrics[name] = metric
+        return metric
+
+
+def _format_value(value):
+    if isinstance(value, float):
+        return repr(value)
+    return str(value)
+
+def format_openmetrics(collected):
+    """
+    :param collected: Metrics as returned by MetricsRegistry.collect()
+    :returns: The metrics in the OpenMetrics text format
+    """
+    lines = []
+    for metric, value in collected:
+        lines.append("# TYPE %s %s" % (metric.name, metric.kind))
+        if metric.help:
+            lines.append("# HELP %s %s" % (metric.name, metric.help.replace("\\", "\\\\").replace("\n", "\\n")))
+        if metric.kind == "counter":
+            lines.append("%s_total %s" % (metric.name, _format_value(value)))
+        elif metric.kind == "gauge":
+            lines.append("%s %s" % (metric.name, _format_value(value)))
+        else:
+            counts, total, count, _ = value
+            cumulative = 0
+            for bound, bucket_count in zip(metric.buckets + ("+Inf",), counts):
+                cumulative += bucket_count
+                lines.append('%s_bucket{le="%s"} %d' % (metric.name, bound, cumulative))
+            lines.append("%s_sum %s" % (metric.name, _format_value(total)))
+            lines.append("%s_count %d" % (metric.name, count))
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+def format_statsd(collected, previous):
+    """
+    :param collected: Metrics as returned by MetricsRegistry.collect()
+    :param previous: Dictionary of counter name to the value last sent, updated in place
+    :returns: List of statsd lines.  Counters are sent as the change since they were
+              last sent and histograms as timings in milliseconds, sampled if there
+              were too many observations.
+    """
+    lines = []
+    for metric, value in collected:
+        if metric.kind == "counter":
+            delta = value - previous.get(metric.name, 0)
+            previous[metric.name] = value
+            if delta:
+                lines.append("%s:%s|c" % (metric.name, _format_value(delta)))
+        elif metric.kind == "gauge":
+            lines.append("%s:%s|g" % (metric.name, _format_value(value)))
+        else:
+            counts, total, count, samples = value
+            delta = count - previous.get(metric.name, 0)
+            previous[metric.name] = count
+            if not delta or not samples:
+                continue
+            samples = samples[-min(delta, _MAX_STATSD_SAMPLES):]
+            rate = "" if len(samples) >= delta else "|@%.4f" % (float(len(samples)) / delta)
+            for sample in samples:
+                lines.append("%s:%.3f|ms%s" % (metric.name, sample * 1000.0, rate))
+    return lines
+
+
+class MetricsExporter(object):
+    """
+    Periodically exports the metrics in a registry to an OpenMetrics text
+    file and/or a statsd server.
+
+    The metrics are collected on the calling thread, which should be the
+    thread that updates them.  The file is written, and the statsd packets
+    sent, by the submit function so that this can be done in the background.
+    """
+
+    def __init__(self, registry, path=None, statsd_address=None, interval=10.0, submit=None):
+        """
+        :param registry: The MetricsRegistry to export
+        :param path: The OpenMetrics file to write, or None
+        :param statsd_address: (host, port) of the statsd server, or None
+        :param interval: Seconds between exports
+        :param submit: Function taking a function and its arguments to run it,
+                       defaults to running it immediately
+        """
+        self._registry = registry
+        self._path = path
+        self._statsd_address = statsd_address
+        self._interval = interval
+        self._submit = submit or (lambda fn, *args: fn(*args))
+        self._socket = None
+        self._previous = {}
+        self._last_export = time.time()
+        self._stats = {"exports": 0, "errors": 0, "packets": 0}
+
+    def maybe_export(self):
+        """
+        Export the metrics if the export interval has passed since they were last exported
+        """
+        if time.time() - self._last_export >= self._interval:
+            self.export()
+
+    def export(self, wait=False):
+        """
+        Export the metrics now
+
+        :param wait: Write the file and send the packets on this thread
+        """
+        self._last_export = time.time()
+        collected = self._registry.collect(clear_samples=True)
+        submit = (lambda fn, *args: fn(*args)) if wait else self._submit
+        if self._path:
+            submit(self._write_file, format_openmetrics(collected))
+        if self._statsd_address:
+            submit(self._send_statsd, format_statsd(collected, self._previous))
+        self._stats["exports"] += 1
+
+    def close(self):
+        """
+        Close the statsd socket
+        """
+        if self._socket:
+            self._socket.close()
+            self._socket = None
+
+    def get_stats(self):
+        """
+        :returns: Dictionary with the number of exports, export errors and statsd packets sent
+        """
+        return dict(self._stats)
+
+    def _write_file(self, text):
+        try:
+            folder = os.path.dirname(self._path)
+            if folder and not os.path.isdir(folder):
+                os.makedirs(folder)
+            # (the final export may be written whilst a background one is still running)
+            temp_path = "%s.tmp%d.%d" % (self._path, os.getpid(), thread.get_ident())
+            with open(temp_path, "wt") as f:
+                f.write(text)
+            if os.path.exists(self._path):
+                # (rename doesn't replace existing files on Windows)
+                os.remove(self._path)
+            os.rename(temp_path, self._path)
+        except (IOError, OSError):
+            self._stats["errors"] += 1
+
+    def _send_statsd(self, lines):
+        try:
+            if self._socket is None:
+                self._socket = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            packet = []
+            size = 0
+            for line in lines + [None]:
+                if packet and (line is None or size + len(line) + 1 > _MAX_STATSD_PACKET):
+                    self._socket.sendto("\n".join(packet), self._statsd_address)
+                    self._stats["packets"] += 1
+                    packet, size = [], 0
+                if line is not None:
+                    packet.append(line)
+                    size += len(line) + 1
+        except (socket.error, OSError):
+            self._stats["errors"] += 1
@@ -0,0 +1,212 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Per-command execution profiling for app commands run from the Shotgun menu
+"""
+
+import os
+import csv
+import json
+import time
+import threading
+from collections import deque, namedtuple
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+if hasattr(time, "process_time"):
+    _cpu_time = time.process_time
+else:
+    def _cpu_time():
+        # user + system time for this process
+        times = os.times()
+        return times[0] + times[1]
+
+# A single profiled invocation of a command.  Times are in seconds, peak_alloc
+# is in bytes and will be None if tracemalloc isn't available (it isn't part of
+# the Python 2.7 shipped with Softimage, which needs the pytracemalloc patches).
+CommandSample = namedtuple("CommandSample", ["started", "wall_time", "cpu_time", "deferral", "peak_alloc", "failed"])
+
+# columns of a profile report in the order they are written out
+REPORT_COLUMNS = ("app_instance", "command", "count", "failures",
+                  "total_wall", "mean_wall", "max_wall", "mean_cpu",
+                  "mean_deferral", "max_deferral", "max_peak_alloc")
+
+class CommandProfiler(object):
+    """
+    Records wall time, cpu time, the time a command spent waiting to be run
+    and, where tracemalloc is available, peak Python allocations for every
+    command invocation, keeping a rolling history per app instance and command.
+
+    When disabled, running a command through the profiler costs no more than
+    a single attribute check.
+    """
+
+    def __init__(self, history_size=50, enabled=False):
+        self._history_size = max(1, history_size)
+        self._history = {}
+        self._lock = threading.Lock()
+        self._enabled = False
+        self._started_tracemalloc = False
+        self.enabled = enabled
+
+    def _get_enabled(self):
+        return self._enabled
+
+    def _set_enabled(self, enabled):
+        enabled = bool(enabled)
+        if enabled == self._enabled:
+            return
+        if tracemalloc:
+            if enabled and not tracemalloc.is_tracing():
+                tracemalloc.start()
+                self._started_tracemalloc = True
+            elif not enabled and self._started_tracemalloc:
+                tracemalloc.stop()
+                self._started_tracemalloc = False
+        self._enabled = enabled
+
+    enabled = property(_get_enabled, _set_enabled, doc="Whether commands are being profiled")
+
+    def run(self, app_instance_name, command_name, callback, queued_at=None):
+        """
+        Run the callback, profiling it if profiling is enabled.
+
+        :param app_instance_name: Name of the app instance the command belongs to (or None)
+        :param command_name: Name of the command
+        :param callback: The command callback to run
+        :param queued_at: time.time() at which the command was requested, used to measure
+                          how long the command was deferred before running
+        :returns: Whatever the callback returns
+        """
+        if not self._enabled:
+            return callback()
+
+        track_alloc = tracemalloc is not None and tracemalloc.is_tracing()
+        if track_alloc:
+            if hasattr(tracemalloc, "reset_peak"):
+                tracemalloc.reset_peak()
+                alloc_before = tracemalloc.get_traced_memory()[0]
+            elif self._started_tracemalloc:
+                # before Python 3.9 (and with pytracemalloc) the peak can only be reset
+                # by clearing the traces, which is only done if tracing was started here:
+                tracemalloc.clear_traces()
+                alloc_before = 0
+            else:
+                track_alloc = False
+
+        failed = True
+        started = time.time()
+        cpu_start = _cpu_time()
+        try:
+            ret = callback()
+            failed = False
+            return ret
+        finally:
+            wall_time = time.time() - started
+            cpu_time = _cpu_time() - cpu_start
+            peak_alloc = None
+            if track_alloc:
+                peak_alloc = max(0, tracemalloc.get_traced_memory()[1] - alloc_before)
+            deferral = (started - queued_at) if queued_at is not None else None
+            self.add_sample(app_instance_name, command_name,
+                            CommandSample(started, wall_time, cpu_time, deferral, peak_alloc, failed))
+
+    def add_sample(self, app_instance_name, command_name, sample):
+        """
+        Add a sample to the history for the specified command
+        """
+        key = (app_instance_name, command_name)
+        with self._lock:
+            history = self._history.get(key)
+            if history is None:
+                history = deque(maxlen=self._history_size)
+                self._history[key] = history
+            history.append(sample)
+
+    def get_history(self, app_instance_name, command_name):
+        """
+        :returns: List of CommandSample instances for the command, oldest first
+        """
+        with self._lock:
+            return list(self._history.get((app_instance_name, command_name), []))
+
+    def clear(self):
+        """
+        Discard all recorded samples
+        """
+        with self._lock:
+            self._history = {}
+
+    def get_report(self, sort_by="total_wall"):
+        """
+        Summarise the recorded history for every command.
+
+        :param sort_by: The report column to sort by, largest first
+        :returns: List of dictionaries keyed by REPORT_COLUMNS
+        """
+        with self._lock:
+            histories = [(key, list(samples)) for key, samples in self._history.items()]
+
+        report = []
+        for (app_instance_name, command_name), samples in histories:
+            if not samples:
+                continue
+            count = len(samples)
+            wall_times = [s.wall_time for s in samples]
+            deferrals = [s.deferral for s in samples if s.deferral is not None]
+            allocs = [s.peak_alloc for s in samples if s.peak_alloc is not None]
+            report.append({
+                "app_instance": app_instance_name or "",
+                "command": command_name,
+                "count": count,
+                "failures": len([s for s in samples if s.failed]),
+                "total_wall": sum(wall_times),
+                "mean_wall": sum(wall_times) / count,
+                "max_wall": max(wall_times),
+                "mean_cpu": sum([s.cpu_time for s in samples]) / count,
+                "mean_deferral": (sum(deferrals) / len(deferrals)) if deferrals else None,
+                "max_deferral": max(deferrals) if deferrals else None,
+                "max_peak_alloc": max(allocs) if allocs else None,
+            })
+
+        # (rows without a value for the column sort last)
+        report.sort(key=lambda row: (row.get(sort_by) is not None, row.get(sort_by)), reverse=True)
+        return report
+
+    def write_report(self, path, format=None, sort_by="total_wall"):
+        """
+        Write the profile report to disk.
+
+        :param path: The file to write
+        :param format: 'csv' or 'json'.  If not specified, this is determined from
+                       the file extension, defaulting to json.
+        :param sort_by: The report column to sort by, largest first
+        """
+        if format is None:
+            format = "csv" if path.lower().endswith(".csv") else "json"
+        if format not in ("csv", "json"):
+            raise ValueError("Unsupported profile report format '%s'" % format)
+
+        report = self.get_report(sort_by)
+        if format == "csv":
+            # (the csv module wants binary files on Python 2 and no newline
+            # translation on Python 3)
+            with (open(path, "wb") if str is bytes else open(path, "w", newline="")) as fh:
+                writer = csv.DictWriter(fh, fieldnames=REPORT_COLUMNS)
+                writer.writeheader()
+                for row in report:
+                    writer.writerow(row)
+        else:
+            with open(path, "w") as fh:
+                json.dump(report, fh, indent=2)
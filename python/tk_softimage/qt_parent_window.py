@@ -14,9 +14,6 @@ Implement a proxy parent window for all other Qt windows
 
 import sys
 
-import win32com.client
-Application = win32com.client.Dispatch('XSI.Application').Application
-
 _QT_PARENT_TITLE = "Shotgun Pipeline Toolkit Qt Parent Window"
 
 def get_qt_parent_window():
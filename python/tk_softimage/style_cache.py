@@ -0,0 +1,107 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Cache of the bundle stylesheets and icons used by the engine's dialogs
+"""
+
+import os
+import re
+
+_COMMENT_RE = re.compile(r"/\*.*?\*/", re.DOTALL)
+_SPACE_RE = re.compile(r"\s+")
+_PUNCTUATION_SPACE_RE = re.compile(r"\s*([{}:;,>])\s*")
+
+def minify_stylesheet(stylesheet):
+    """
+    Remove comments and redundant whitespace from a Qt stylesheet
+    """
+    stylesheet = _COMMENT_RE.sub("", stylesheet)
+    stylesheet = _SPACE_RE.sub(" ", stylesheet)
+    stylesheet = _PUNCTUATION_SPACE_RE.sub(r"\1", stylesheet)
+    return stylesheet.replace(";}", "}").strip()
+
+
+class StyleCache(object):
+    """
+    Reads each bundle's stylesheet and decodes each icon once and shares the
+    result between dialogs.
+
+    Bundle stylesheets are re-read if the file changes on disk.  Icons are
+    decoded the first time they're asked for and kept in the QPixmapCache
+    under keys of their own, so only icons fetched through get_pixmap and
+    get_icon are shared.
+    """
+
+    def __init__(self, minify=False):
+        """
+        :param minify: Strip comments and whitespace from bundle stylesheets
+        """
+        self._minify = minify
+        self._stylesheets = {}
+        self._stats = {"stylesheet_hits": 0, "stylesheet_misses": 0, "icon_hits": 0, "icon_misses": 0}
+
+    def get_stylesheet(self, path, resolve=None):
+        """
+        Get the contents of a stylesheet file
+
+        :param path: Path to the stylesheet
+        :param resolve: Function applied to the stylesheet when it's read, e.g. to
+                        replace tokens
+        :returns: The stylesheet, or None if the file doesn't exist
+        """
+        try:
+            mtime = os.path.getmtime(path)
+        except OSError:
+            return None
+
+        cached = self._stylesheets.get(path)
+        if cached and cached[0] == mtime:
+            self._stats["stylesheet_hits"] += 1
+            return cached[1]
+
+        self._stats["stylesheet_misses"] += 1
+        with open(path, "rt") as f:
+            stylesheet = f.read()
+        if resolve:
+            stylesheet = resolve(stylesheet)
+        if self._minify:
+            stylesheet = minify_stylesheet(stylesheet)
+        self._stylesheets[path] = (mtime, stylesheet)
+        return stylesheet
+
+    def get_pixmap(self, path):
+        """
+        Get the decoded pixmap for an image file from the QPixmapCache,
+        decoding it if it isn't there
+        """
+        from sgtk.platform.qt import QtGui
+        key = "tk-softimage:%s" % path
+        pixmap = QtGui.QPixmap()
+        if QtGui.QPixmapCache.find(key, pixmap):
+            self._stats["icon_hits"] += 1
+            return pixmap
+        self._stats["icon_misses"] += 1
+        pixmap = QtGui.QPixmap(path)
+        QtGui.QPixmapCache.insert(key, pixmap)
+        return pixmap
+
+    def get_icon(self, path):
+        """
+        :returns: QIcon for an image file, using the decoded pixmap from the QPixmapCache
+        """
+        from sgtk.platform.qt import QtGui
+        return QtGui.QIcon(self.get_pixmap(path))
+
+    def get_stats(self):
+        """
+        :returns: Dictionary with the number of stylesheet and icon cache hits and misses
+        """
+        return dict(self._stats)
@@ -0,0 +1,323 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Background worker pool for running work off the Softimage main thread
+"""
+
+import sys
+import time
+import threading
+from collections import deque
+
+try:
+    import Queue as queue
+except ImportError:
+    import queue
+
+class TaskCancelledError(Exception):
+    """
+    Raised when retrieving the result of a task that was cancelled
+    """
+
+class TaskFuture(object):
+    """
+    The pending result of a task submitted to the WorkerPool.
+
+    Callbacks added with add_done_callback are always run on the Softimage
+    main thread, regardless of which thread the task ran in.
+    """
+
+    PENDING, RUNNING, FINISHED, CANCELLED = range(4)
+
+    def __init__(self, pool):
+        self._pool = pool
+        self._state = TaskFuture.PENDING
+        self._result = None
+        self._exc_info = None
+        self._callbacks = []
+        self._condition = threading.Condition()
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+
+    def cancel(self):
+        """
+        Cancel the task if it hasn't started running yet.
+
+        :returns: True if the task is cancelled
+        """
+        with self._condition:
+            if self._state == TaskFuture.RUNNING or self._state == TaskFuture.FINISHED:
+                return False
+            if self._state == TaskFuture.PENDING:
+                self._state = TaskFuture.CANCELLED
+                self._condition.notify_all()
+        self._schedule_callbacks()
+        return True
+
+    def cancelled(self):
+        return self._state == TaskFuture.CANCELLED
+
+    def running(self):
+        return self._state == TaskFuture.RUNNING
+
+    def done(self):
+        return self._state in (TaskFuture.FINISHED, TaskFuture.CANCELLED)
+
+    def result(self, timeout=None):
+        """
+        Wait for and return the result of the task, re-raising any exception
+        raised by it.  Note that waiting on the main thread will block Softimage!
+
+        :param timeout: Maximum number of seconds to wait
+        """
+        self._wait(timeout)
+        if self._state == TaskFuture.CANCELLED:
+            raise TaskCancelledError()
+        if self._exc_info:
+            _reraise(self._exc_info)
+        return self._result
+
+    def exception(self, timeout=None):
+        """
+        Wait for the task and return the exception it raised, or None
+        """
+        self._wait(timeout)
+        if self._state == TaskFuture.CANCELLED:
+            raise TaskCancelledError()
+        return self._exc_info[1] if self._exc_info else None
+
+    def add_done_callback(self, callback):
+        """
+        Add a callback to be run on the main thread once the task is done.
+        The callback is passed this future.
+        """
+        with self._condition:
+            self._callbacks.append(callback)
+            is_done = self.done()
+        if is_done:
+            self._schedule_callbacks()
+
+    def set_result(self, result, run_callbacks=False):
+        """
+        Set the result of a future that isn't run by the pool, e.g. one for
+        a dialog that hasn't been closed yet.
+
+        :param run_callbacks: Run the done callbacks now rather than queueing them,
+                              e.g. when the main-thread queue won't be processed
+                              again.  Must only be set on the main thread.
+        :returns: False if the future was already done
+        """
+        with self._condition:
+            if self.done():
+                return False
+        self._set_finished(result, None, run_callbacks)
+        return True
+
+    def _wait(self, timeout):
+        with self._condition:
+            if not self.done():
+                self._condition.wait(timeout)
+            if not self.done():
+                raise RuntimeError("Timed out waiting for task to complete")
+
+    def _set_running(self):
+        with self._condition:
+            if self._state != TaskFuture.PENDING:
+                return False
+            self._state = TaskFuture.RUNNING
+            self.started_at = time.time()
+            return True
+
+    def _set_finished(self, result, exc_info, run_callbacks=False):
+        with self._condition:
+            self._result = result
+            self._exc_info = exc_info
+            self._state = TaskFuture.FINISHED
+            self.finished_at = time.time()
+            self._condition.notify_all()
+        self._schedule_callbacks(run_callbacks)
+
+    def _schedule_callbacks(self, run_now=False):
+        with self._condition:
+            callbacks = self._callbacks
+            self._callbacks = []
+        for callback in callbacks:
+            if run_now:
+                self._pool._run_main_thread_call(callback, (self,), {})
+            else:
+                self._pool.run_in_main_thread(callback, self)
+
+
+class WorkerPool(object):
+    """
+    A pool of background threads that apps can use to run I/O or Shotgun
+    queries without blocking Softimage.
+
+    Only the main thread may talk to Softimage or Qt so results are posted
+    back to a main-thread queue which is drained regularly by the Shotgun
+    Qt event loop plug-in.
+    """
+
+    # the maximum amount of time spent running main-thread callbacks each
+    # time the main-thread queue is processed:
+    MAIN_THREAD_TIME_BUDGET = 0.05
+
+    def __init__(self, logger, num_workers=2, history_size=100):
+        """
+        :param logger: The logger to report task errors to
+        :param num_workers: The number of worker threads to run tasks in
+        :param history_size: The number of task timings to keep for metrics
+        """
+        self._logger = logger
+        self._num_workers = max(1, num_workers)
+        self._tasks = queue.Queue()
+        self._main_thread_calls = deque()
+        self._workers = []
+        self._workers_lock = threading.Lock()
+        self._shut_down = False
+        self._wait_times = deque(maxlen=history_size)
+        self._run_times = deque(maxlen=history_size)
+        self._callback_latencies = deque(maxlen=history_size)
+        self._num_completed = 0
+
+    @property
+    def num_workers(self):
+        return self._num_workers
+
+    def submit(self, fn, *args, **kwargs):
+        """
+        Run the function in a background thread.
+
+        :returns: TaskFuture for the result of the function
+        """
+        if self._shut_down:
+            raise RuntimeError("Cannot submit a task to a worker pool that has been shut down")
+
+        future = TaskFuture(self)
+        self._ensure_workers()
+        self._tasks.put((future, fn, args, kwargs))
+        return future
+
+    def run_in_main_thread(self, fn, *args, **kwargs):
+        """
+        Queue the function to be run on the main thread the next time the
+        main-thread queue is processed.  Safe to call from any thread.
+        """
+        if self._shut_down:
+            return
+        # (deque.append is thread safe)
+        self._main_thread_calls.append((fn, args, kwargs, time.time()))
+
+    def process_main_thread_queue(self):
+        """
+        Run queued main-thread calls.  Must only be called from the main thread.
+        """
+        end_time = time.time() + self.MAIN_THREAD_TIME_BUDGET
+        while self._main_thread_calls and time.time() < end_time:
+            try:
+                fn, args, kwargs, queued_at = self._main_thread_calls.popleft()
+            except IndexError:
+                break
+            self._callback_latencies.append(time.time() - queued_at)
+            self._run_main_thread_call(fn, args, kwargs)
+
+    def _run_main_thread_call(self, fn, args, kwargs):
+        try:
+            fn(*args, **kwargs)
+        except Exception:
+            self._logger.exception("Error running task callback %s" % fn)
+
+    def shutdown(self):
+        """
+        Cancel all pending tasks and stop the worker threads.  Tasks that are
+        already running will complete but none of their callbacks will be run.
+        """
+        self._shut_down = True
+        while True:
+            try:
+                future, _, _, _ = self._tasks.get_nowait()
+            except queue.Empty:
+                break
+            future.cancel()
+        self._main_thread_calls.clear()
+
+        with self._workers_lock:
+            for _ in self._workers:
+                self._tasks.put(None)
+            self._workers = []
+
+    def get_stats(self):
+        """
+        :returns: Dictionary containing the task and main-thread queue depths, the
+                  number of completed tasks and the mean/max times in seconds that
+                  tasks waited to start, took to run and results waited to be
+                  delivered on the main thread.
+        """
+        stats = {
+            "workers": self._num_workers,
+            "queue_depth": self._tasks.qsize(),
+            "main_thread_queue_depth": len(self._main_thread_calls),
+            "completed": self._num_completed,
+        }
+        for name, values in (("wait", self._wait_times),
+                             ("run", self._run_times),
+                             ("callback_latency", self._callback_latencies)):
+            values = list(values)
+            stats["mean_%s" % name] = (sum(values) / len(values)) if values else None
+            stats["max_%s" % name] = max(values) if values else None
+        return stats
+
+    def _ensure_workers(self):
+        """
+        Start the worker threads the first time they are needed
+        """
+        with self._workers_lock:
+            while len(self._workers) < self._num_workers:
+                worker = threading.Thread(target=self._worker_loop,
+                                          name="tk-softimage worker %d" % len(self._workers))
+                worker.daemon = True
+                worker.start()
+                self._workers.append(worker)
+
+    def _worker_loop(self):
+        while True:
+            item = self._tasks.get()
+            if item is None:
+                return
+            future, fn, args, kwargs = item
+            if not future._set_running():
+                # cancelled before it started
+                continue
+
+            result = None
+            exc_info = None
+            try:
+                result = fn(*args, **kwargs)
+            except Exception:
+                exc_info = sys.exc_info()
+            future._set_finished(result, exc_info)
+
+            self._num_completed += 1
+            self._wait_times.append(future.started_at - future.submitted_at)
+            self._run_times.append(future.finished_at - future.started_at)
+
+            # don't keep the task alive whilst waiting for the next one:
+            item = future = fn = args = kwargs = result = exc_info = None
+
+
+def _reraise(exc_info):
+    """
+    Re-raise an exception captured with sys.exc_info(), preserving its traceback
+    """
+    if sys.version_info[0] >= 3:
+        raise exc_info[1].with_traceback(exc_info[2])
+    exec("raise exc_info[0], exc_info[1], exc_info[2]")
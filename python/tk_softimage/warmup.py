@@ -0,0 +1,168 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Warm-up run once the engine has started
+"""
+
+import time
+import socket
+import urlparse
+import threading
+import importlib
+
+class WarmUp(object):
+    """
+    A list of steps that are run in order to get slow, one-off work (imports,
+    connecting to Shotgun, etc.) out of the way before the user does
+    anything that needs it.
+
+    The steps are run one at a time, each queued once the previous one has
+    finished so that Softimage stays responsive between them.  Imports are run
+    on the main thread as, in Python 2, an import on a worker thread holds the
+    import lock and blocks any import on the main thread.  Background steps,
+    e.g. those that wait on the network, are run in a worker thread.
+
+    A step that fails is logged and the remaining steps still run.
+    """
+
+    def __init__(self, logger):
+        """
+        :param logger: The logger to write progress and timings to
+        """
+        self._logger = logger
+        self._schedule = None
+        self._submit = None
+        self._steps = []
+        self._timings = []
+        self._finished = threading.Event()
+        self._started_at = None
+        self._duration = None
+
+    def add_step(self, name, fn, *args, **kwargs):
+        """
+        Add a step to the warm-up that is run on the main thread
+        """
+        self._steps.append((name, fn, args, kwargs, False))
+
+    def add_background_step(self, name, fn, *args, **kwargs):
+        """
+        Add a step to the warm-up that is run in a worker thread.  The function
+        must not talk to Softimage or Qt.
+        """
+        self._steps.append((name, fn, args, kwargs, True))
+
+    def add_import_step(self, module_name):
+        """
+        Add a step that imports the named module
+        """
+        self.add_step("import %s" % module_name, importlib.import_module, module_name)
+
+    def add_connect_step(self, url, timeout=10.0):
+        """
+        Add a background step that resolves the host of the url and opens (then
+        closes) a connection to it, so that the name lookup and the route to the
+        server are cached before the first request.  The Shotgun connection
+        itself can't be opened here as it belongs to the thread that opens it.
+        """
+        self.add_background_step("connect to %s" % url, _open_connection, url, timeout)
+
+    @property
+    def finished(self):
+        return self._finished.is_set()
+
+    def wait(self, timeout=None):
+        """
+        Wait for the warm-up to finish.  Don't call this on the main thread!
+
+        :returns: True if the warm-up has finished
+        """
+        self._finished.wait(timeout)
+        return self._finished.is_set()
+
+    def start(self, schedule, submit=None):
+        """
+        Start running the steps
+
+        :param schedule: Function that queues a function to be run on the main
+                         thread, e.g. the engine's run_in_main_thread
+        :param submit: Function that runs a function in a worker thread and returns
+                       a TaskFuture, e.g. the engine's submit_task.  Required if
+                       any background steps have been added.
+        """
+        self._schedule = schedule
+        self._submit = submit
+        self._started_at = time.time()
+        self._logger.debug("Warm-up: starting %d steps" % len(self._steps))
+        schedule(self._run_next_step)
+
+    def _run_next_step(self):
+        if not self._steps:
+            self._duration = time.time() - self._started_at
+            self._logger.debug("Warm-up: finished in %.1fms" % (self._duration * 1000.0))
+            self._finished.set()
+            return
+
+        name, fn, args, kwargs, background = self._steps.pop(0)
+        start = time.time()
+        if background:
+            future = self._submit(fn, *args, **kwargs)
+            future.add_done_callback(lambda f: self._finish_step(name, start, _get_exception(f)))
+            return
+
+        error = None
+        try:
+            fn(*args, **kwargs)
+        except Exception, e:
+            error = e
+        self._finish_step(name, start, error)
+
+    def _finish_step(self, name, start, error):
+        duration = time.time() - start
+        if error is not None:
+            error = str(error) or error.__class__.__name__
+        self._timings.append((name, duration, error))
+        if error:
+            self._logger.debug("Warm-up: %s failed after %.1fms: %s" % (name, duration * 1000.0, error))
+        else:
+            self._logger.debug("Warm-up: %s took %.1fms" % (name, duration * 1000.0))
+        self._schedule(self._run_next_step)
+
+    def get_timings(self):
+        """
+        :returns: List of (step name, duration in seconds, error message or None)
+                  for the steps that have run so far
+        """
+        return list(self._timings)
+
+    @property
+    def duration(self):
+        """
+        The total time taken by the warm-up in seconds, or None if it hasn't finished
+        """
+        return self._duration
+
+
+def _get_exception(future):
+    """
+    :returns: The exception raised by the task of a finished future, or None
+    """
+    try:
+        return future.exception()
+    except Exception, e:
+        return e
+
+def _open_connection(url, timeout):
+    """
+    Resolve the host of the url and open, then close, a connection to it
+    """
+    parsed = urlparse.urlparse(url)
+    port = parsed.port or (443 if parsed.scheme == "https" else 80)
+    socket.create_connection((parsed.hostname, port), timeout).close()
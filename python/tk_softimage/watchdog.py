@@ -0,0 +1,154 @@
+# Copyright (c) 2013 Shotgun Software Inc.
+#
+# CONFIDENTIAL AND PROPRIETARY
+#
+# This work is provided "AS IS" and subject to the Shotgun Pipeline Toolkit
+# Source Code License included in this distribution package. See LICENSE.
+# By accessing, using, copying or modifying this work you indicate your
+# agreement to the Shotgun Pipeline Toolkit Source Code License. All rights
+# not expressly granted therein are reserved by Shotgun Software Inc.
+
+"""
+Watchdog that reports when the Softimage main thread stops responding
+"""
+
+import sys
+import time
+import threading
+import traceback
+from collections import deque, namedtuple
+from contextlib import contextmanager
+
+# A stall of the main thread - when it started (time.time()), how long it lasted
+# in seconds and the engine phase the main thread was in
+Stall = namedtuple("Stall", ["started", "duration", "phase"])
+
+class HangWatchdog(object):
+    """
+    Background thread that watches for heartbeats from the main thread.
+
+    The Shotgun Qt event loop timer and key event handlers send a heartbeat each
+    time they run.  If no heartbeat is received for longer than the threshold, the
+    stacks of all Python threads and the current engine phase are written to the
+    Toolkit log.  Once heartbeats resume, the duration of the stall is recorded.
+
+    Sending a heartbeat is a single assignment so the watchdog is cheap enough to
+    leave running all the time.
+    """
+
+    def __init__(self, logger, threshold=5.0, history_size=50):
+        """
+        :param logger: The logger to write stall reports to.  This is called from
+                       the watchdog thread so must not talk to Softimage!
+        :param threshold: The number of seconds without a heartbeat after which the
+                          main thread is considered stalled
+        :param history_size: The number of stalls to keep
+        """
+        self._logger = logger
+        self._threshold = max(0.1, threshold)
+        self._stalls = deque(maxlen=history_size)
+        self._last_heartbeat = time.time()
+        self._phase = "idle"
+        self._suspended = 0
+        self._stall_started = None
+        self._stall_phase = None
+        self._main_thread_id = None
+        self._stop_event = threading.Event()
+        self._thread = None
+
+    @property
+    def threshold(self):
+        return self._threshold
+
+    def start(self):
+        """
+        Start watching.  Must be called from the main thread.
+        """
+        if self._thread:
+            return
+        self._main_thread_id = threading.current_thread().ident
+        self._last_heartbeat = time.time()
+        # (a new event so that a thread from an earlier start that is still waiting stays stopped)
+        self._stop_event = threading.Event()
+        self._thread = threading.Thread(target=self._watch, args=(self._stop_event,),
+                                        name="tk-softimage watchdog")
+        self._thread.daemon = True
+        self._thread.start()
+
+    def stop(self):
+        """
+        Stop watching
+        """
+        self._stop_event.set()
+        self._thread = None
+
+    def heartbeat(self):
+        """
+        Tell the watchdog that the main thread is responsive
+        """
+        self._last_heartbeat = time.time()
+
+    @contextmanager
+    def phase(self, name):
+        """
+        Context manager used to record what the engine is doing on the main thread
+        """
+        previous = self._phase
+        self._phase = name
+        try:
+            yield
+        finally:
+            self._phase = previous
+            self.heartbeat()
+
+    @contextmanager
+    def suspended(self, name):
+        """
+        Context manager used to stop the watchdog reporting stalls whilst the main thread
+        runs a nested event loop that doesn't send heartbeats (e.g. a modal dialog).
+        """
+        self._suspended += 1
+        try:
+            with self.phase(name):
+                yield
+        finally:
+            self._suspended -= 1
+            self.heartbeat()
+
+    def get_stalls(self):
+        """
+        :returns: List of Stall instances for the most recent stalls, oldest first
+        """
+        return list(self._stalls)
+
+    def _watch(self, stop_event):
+        interval = min(1.0, self._threshold / 4.0)
+        while not stop_event.wait(interval):
+            since_heartbeat = time.time() - self._last_heartbeat
+            if self._stall_started is None:
+                if since_heartbeat > self._threshold and not self._suspended:
+                    self._stall_started = self._last_heartbeat
+                    self._stall_phase = self._phase
+                    self._report_stall(since_heartbeat)
+            elif self._last_heartbeat > self._stall_started:
+                # the main thread has recovered:
+                duration = self._last_heartbeat - self._stall_started
+                self._stalls.append(Stall(self._stall_started, duration, self._stall_phase))
+                self._logger.warning("Softimage main thread recovered after %.1fs (phase: %s)"
+                                     % (duration, self._stall_phase))
+                self._stall_started = None
+
+    def _report_stall(self, since_heartbeat):
+        """
+        Write the stacks of all threads to the log
+        """
+        lines = ["Softimage main thread has not responded for %.1fs (phase: %s)"
+                 % (since_heartbeat, self._stall_phase)]
+        names = dict((thread.ident, thread.name) for thread in threading.enumerate())
+        for thread_id, frame in sys._current_frames().items():
+            if thread_id == threading.current_thread().ident:
+                continue
+            label = "main thread" if thread_id == self._main_thread_id else names.get(thread_id, thread_id)
+            lines.append("Stack of %s:" % label)
+            lines.append("".join(traceback.format_stack(frame)).rstrip())
+        self._logger.warning("\n".join(lines))